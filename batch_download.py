@@ -0,0 +1,322 @@
+import os
+import time
+import argparse
+import logging
+from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from bybit_api import kline_arrays_to_df
+from candle_store import CandleStore
+from interval_rollup import fill_from_finer_intervals
+from kline_downloader import (
+    WINDOW_FAILED, WINDOW_PENDING, IncompleteDownloadError, KlineAccumulator, fetch_kline_window,
+    plan_kline_windows
+)
+from indicators import (
+    DEFAULT_BB_STD_DEV, DEFAULT_BB_WINDOWS, DEFAULT_MA_WINDOWS, DEFAULT_RSI_WINDOWS,
+    Indicator, indicators_for_groups, parse_windows
+)
+from parallel_indicators import calculate_indicators_parallel
+from rate_limiter import RateLimiter, AdaptiveRateLimiter, DEFAULT_REQUESTS_PER_SECOND
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - [Batch Download] %(message)s')
+
+DEFAULT_BATCH_WORKERS = 16
+
+
+@dataclass
+class BatchJob:
+    """Одне завдання пакетного завантаження: символ × інтервал × діапазон."""
+    symbol: str
+    interval: str
+    start_time_ms: int
+    end_time_ms: int
+    category: str = "linear"
+
+    @property
+    def name(self) -> str:
+        return f"{self.category}:{self.symbol}:{self.interval}"
+
+
+@dataclass
+class BatchJobResult:
+    """Результат завдання пакетного завантаження."""
+    job: BatchJob
+    candles: int = 0
+    output_path: Optional[str] = None
+    error: Optional[str] = None
+    # Вікна, що не завантажились після всіх повторів; решта збережена у сховищі
+    failed_windows: int = 0
+
+
+@dataclass
+class _JobState:
+    job: BatchJob
+    windows: List[Tuple[int, int]]
+    accumulator: KlineAccumulator
+    window_counts: List[int] = field(default_factory=list)
+    completed: int = 0
+    error: Optional[str] = None
+
+
+def make_batch_jobs(symbols: List[str], intervals: List[str], start_time_ms: int, end_time_ms: int,
+                    category: str = "linear") -> List[BatchJob]:
+    """
+    Будує декартів добуток символів та інтервалів для одного діапазону дат.
+    """
+    return [
+        BatchJob(symbol=symbol.upper(), interval=interval, start_time_ms=start_time_ms,
+                 end_time_ms=end_time_ms, category=category)
+        for symbol in symbols for interval in intervals
+    ]
+
+
+def run_batch_download(
+    jobs: List[BatchJob],
+    max_workers: int = DEFAULT_BATCH_WORKERS,
+    rate_limiter: Optional[RateLimiter] = None,
+    store: Optional[CandleStore] = None,
+    output_dir: Optional[str] = None,
+    limit: int = 1000,
+    job_progress_callback: Optional[Callable[[BatchJob, int], None]] = None,
+    job_finished_callback: Optional[Callable[[BatchJobResult], None]] = None,
+    should_stop: Optional[Callable[[], bool]] = None,
+    indicators: Optional[Sequence[Indicator]] = None,
+    indicator_workers: Optional[int] = None,
+    compact: bool = False
+) -> List[BatchJobResult]:
+    """
+    Завантажує всі завдання через спільний пул потоків під одним глобальним
+    бюджетом запитів. Вікна всіх завдань потрапляють в одну чергу, тож пул
+    не простоює між символами. Результати записуються у сховище та/або
+    CSV-файли в output_dir.
+
+    Якщо задано indicators (разом з output_dir), індикатори для всіх завдань
+    рахуються після завантаження в пулі з indicator_workers процесів, а CSV
+    записуються вже з колонками індикаторів.
+
+    compact=True — свічки та індикатори тримаються у float32 (див. bybit_api.COMPACT_DTYPE).
+    """
+    if rate_limiter is None:
+        rate_limiter = AdaptiveRateLimiter(DEFAULT_REQUESTS_PER_SECOND)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    states: List[_JobState] = []
+    for job in jobs:
+        if store is not None:
+            fill_from_finer_intervals(store, job.category, job.symbol, job.interval,
+                                      job.start_time_ms, job.end_time_ms)
+            gaps = store.missing_ranges(job.category, job.symbol, job.interval, job.start_time_ms, job.end_time_ms)
+        else:
+            gaps = [(job.start_time_ms, job.end_time_ms)]
+        windows = [window for gap_start, gap_end in gaps
+                   for window in plan_kline_windows(gap_start, gap_end, job.interval, limit)]
+        # Без попереднього виділення під весь діапазон: пам'ять росте лише під реально отримані свічки
+        states.append(_JobState(job=job, windows=windows, accumulator=KlineAccumulator(),
+                                window_counts=[WINDOW_PENDING] * len(windows)))
+
+    total_windows = sum(len(state.windows) for state in states)
+    logging.info(f"run_batch_download: {len(jobs)} завдань, {total_windows} запитів, {max_workers} потоків, "
+                 f"бюджет {rate_limiter.requests_per_second:.0f} запитів/с.")
+
+    results: Dict[int, BatchJobResult] = {}
+    export_indicators = bool(indicators) and bool(output_dir)
+    # Завдання, чиї CSV чекають на розрахунок індикаторів
+    deferred_frames: Dict[int, pd.DataFrame] = {}
+
+    def finish_job(job_index: int):
+        state = states[job_index]
+        result, df = _finalize_job(state, store, None if export_indicators else output_dir,
+                                   keep_frame=export_indicators, compact=compact)
+        results[job_index] = result
+        if job_progress_callback is not None and result.error is None:
+            job_progress_callback(state.job, 100)
+        if df is not None:
+            deferred_frames[job_index] = df
+        elif job_finished_callback is not None:
+            job_finished_callback(result)
+
+    executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="batch-window")
+    try:
+        futures = {}
+        for job_index, state in enumerate(states):
+            if not state.windows:
+                continue
+            for window_index, (window_start, window_end) in enumerate(state.windows):
+                future = executor.submit(
+                    fetch_kline_window, state.job.category, state.job.symbol, state.job.interval,
+                    window_start, window_end, limit, rate_limiter
+                )
+                futures[future] = (job_index, window_index)
+
+        # Завдання, які повністю є у сховищі, завершуються одразу
+        for job_index, state in enumerate(states):
+            if not state.windows:
+                finish_job(job_index)
+
+        for future in as_completed(futures):
+            if should_stop is not None and should_stop():
+                logging.info("run_batch_download: Отримано запит на зупинку, скасовую решту запитів.")
+                break
+
+            job_index, window_index = futures[future]
+            state = states[job_index]
+            try:
+                page = future.result()
+                state.accumulator.append(page)
+                state.window_counts[window_index] = len(page)
+            except Exception as e:
+                state.window_counts[window_index] = WINDOW_FAILED
+                if state.error is None:
+                    logging.error(f"run_batch_download: Помилка у завданні {state.job.name}: {e}", exc_info=True)
+                state.error = str(e)
+
+            state.completed += 1
+            if job_progress_callback is not None:
+                job_progress_callback(state.job, int(state.completed * 100 / len(state.windows)))
+            if state.completed == len(state.windows):
+                finish_job(job_index)
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+    if deferred_frames:
+        job_indexes = list(deferred_frames)
+        logging.info(f"run_batch_download: Розрахунок індикаторів для {len(job_indexes)} завдань у пулі процесів.")
+        frames = calculate_indicators_parallel([deferred_frames.pop(index) for index in job_indexes],
+                                               indicators, indicator_workers)
+        for job_index, df in zip(job_indexes, frames):
+            result = results[job_index]
+            try:
+                result.output_path = _export_path(output_dir, result.job)
+                df.to_csv(result.output_path)
+            except Exception as e:
+                result.output_path = None
+                result.error = str(e)
+                logging.error(f"run_batch_download: Не вдалося зберегти {result.job.name}: {e}", exc_info=True)
+            if job_finished_callback is not None:
+                job_finished_callback(result)
+
+    return [results.get(index, BatchJobResult(job=state.job, error="Завдання скасовано"))
+            for index, state in enumerate(states)]
+
+
+def _export_path(output_dir: str, job: BatchJob) -> str:
+    return os.path.join(output_dir, f"{job.symbol}_{job.interval}.csv")
+
+
+def _finalize_job(state: _JobState, store: Optional[CandleStore], output_dir: Optional[str],
+                  keep_frame: bool = False, compact: bool = False) -> Tuple[BatchJobResult, Optional[pd.DataFrame]]:
+    """
+    Зберігає результат завдання; keep_frame — повернути DataFrame свічок для подальшої обробки.
+    Якщо частина вікон не завантажилась, завершені вікна все одно зберігаються у сховищі
+    (як у download_kline_range_with_store), а результат містить помилку та кількість
+    невдалих вікон (failed_windows); CSV для такого завдання не записується.
+    """
+    job = state.job
+    result = BatchJobResult(job=job)
+    df = None
+    try:
+        timestamps, values = state.accumulator.finalize()
+        if store is not None:
+            # Порожні успішні вікна теж покриті (свічок там немає); відкриту свічку save_candles не позначає
+            covered = [window for window, count in zip(state.windows, state.window_counts) if count >= 0]
+            if len(timestamps) or covered:
+                store.save_candles(job.category, job.symbol, job.interval, timestamps, values, covered)
+
+        if state.error is not None:
+            result.failed_windows = state.window_counts.count(WINDOW_FAILED)
+            result.candles = len(timestamps)
+            saved = "Отримані свічки збережено у сховищі, повторний запуск дозавантажить решту. " if store is not None else ""
+            result.error = str(IncompleteDownloadError(result.failed_windows, len(state.windows),
+                                                       f"{saved}Остання помилка: {state.error}"))
+            return result, None
+
+        if store is not None:
+            timestamps, values = store.load_candles(job.category, job.symbol, job.interval,
+                                                    job.start_time_ms, job.end_time_ms)
+
+        result.candles = len(timestamps)
+        if (output_dir or keep_frame) and len(timestamps):
+            df = kline_arrays_to_df(timestamps, values, compact=compact)
+            if output_dir:
+                result.output_path = _export_path(output_dir, job)
+                df.to_csv(result.output_path)
+    except Exception as e:
+        result.error = str(e)
+        df = None
+        logging.error(f"run_batch_download: Не вдалося зберегти {job.name}: {e}", exc_info=True)
+
+    return result, df if keep_frame else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Пакетне завантаження свічок Bybit для багатьох символів та інтервалів")
+    parser.add_argument("--symbols", help="Символи через кому, наприклад BTCUSDT,ETHUSDT")
+    parser.add_argument("--symbols-file", help="Файл зі списком символів, по одному в рядку")
+    parser.add_argument("--intervals", default="60", help="Інтервали через кому, наприклад 1,60,D")
+    parser.add_argument("--days", type=int, default=7, help="Кількість днів історії")
+    parser.add_argument("--category", default="linear")
+    parser.add_argument("--workers", type=int, default=DEFAULT_BATCH_WORKERS, help="Розмір спільного пулу потоків")
+    parser.add_argument("--rate", type=float, default=DEFAULT_REQUESTS_PER_SECOND, help="Глобальний бюджет, запитів/с")
+    parser.add_argument("--output-dir", help="Каталог для CSV-файлів")
+    parser.add_argument("--no-store", action="store_true", help="Не використовувати локальне сховище свічок")
+    parser.add_argument("--ma", action="store_true", help="Додати в CSV ковзні середні (SMA/EMA)")
+    parser.add_argument("--bb", action="store_true", help="Додати в CSV смуги Боллінджера")
+    parser.add_argument("--rsi", action="store_true", help="Додати в CSV RSI")
+    parser.add_argument("--ma-windows", type=parse_windows, default=DEFAULT_MA_WINDOWS)
+    parser.add_argument("--bb-windows", type=parse_windows, default=DEFAULT_BB_WINDOWS)
+    parser.add_argument("--bb-std", type=float, default=DEFAULT_BB_STD_DEV)
+    parser.add_argument("--rsi-windows", type=parse_windows, default=DEFAULT_RSI_WINDOWS)
+    parser.add_argument("--indicator-workers", type=int,
+                        help="Кількість процесів для розрахунку індикаторів (за замовчуванням — кількість ядер)")
+    parser.add_argument("--compact", action="store_true", help="Зберігати свічки та індикатори у float32")
+    args = parser.parse_args()
+
+    symbols = []
+    if args.symbols:
+        symbols.extend(symbol.strip() for symbol in args.symbols.split(",") if symbol.strip())
+    if args.symbols_file:
+        with open(args.symbols_file, encoding="utf-8") as symbols_file:
+            symbols.extend(line.strip() for line in symbols_file if line.strip() and not line.startswith("#"))
+    if not symbols:
+        parser.error("Потрібно вказати --symbols або --symbols-file")
+    indicators = indicators_for_groups(args.ma, args.bb, args.rsi, ma_windows=args.ma_windows,
+                                       bb_windows=args.bb_windows, bb_std_dev=args.bb_std,
+                                       rsi_windows=args.rsi_windows)
+    if indicators and not args.output_dir:
+        parser.error("Індикатори записуються лише в CSV: вкажіть --output-dir")
+
+    end_time_ms = int(time.time() * 1000)
+    start_time_ms = end_time_ms - args.days * 24 * 60 * 60 * 1000
+    jobs = make_batch_jobs(symbols, [interval.strip() for interval in args.intervals.split(",")],
+                           start_time_ms, end_time_ms, args.category)
+
+    def report(result: BatchJobResult):
+        if result.error:
+            print(f"[ПОМИЛКА] {result.job.name}: {result.error}")
+        else:
+            print(f"[OK] {result.job.name}: {result.candles} свічок" +
+                  (f" -> {result.output_path}" if result.output_path else ""))
+
+    results = run_batch_download(
+        jobs,
+        max_workers=args.workers,
+        rate_limiter=AdaptiveRateLimiter(args.rate),
+        store=None if args.no_store else CandleStore(),
+        output_dir=args.output_dir,
+        job_finished_callback=report,
+        indicators=indicators,
+        indicator_workers=args.indicator_workers,
+        compact=args.compact
+    )
+    failed = sum(1 for result in results if result.error)
+    print(f"Завершено: {len(results) - failed}/{len(results)} завдань успішно.")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
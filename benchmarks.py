@@ -0,0 +1,650 @@
+"""
+Порівняльні заміри продуктивності.
+
+Запуск: python benchmarks.py parser --candles 500000
+        python benchmarks.py download --days 30 --workers 1,4,16 --latency-ms 40
+        python benchmarks.py indicators --candles 1000000 --ma-windows 20,50,200 --rsi-windows 7,14
+        python benchmarks.py indicators-parallel --symbols 32 --candles 250000 --workers 1,2,4,8
+        python benchmarks.py pipeline --candles 1000000
+        python benchmarks.py compact --candles 1000000   (код виходу 1, якщо похибка перевищує оцінку)
+        python benchmarks.py resample --rows 1000000,10000000 --max-candles 200 --bucket 60
+        python benchmarks.py pyramid --rows 1000000,10000000
+        QT_QPA_PLATFORM=offscreen python benchmarks.py viewport --rows 1000000
+        python benchmarks.py charts --symbols 20 --candles 50000
+        python benchmarks.py export --candles 1000000
+        python benchmarks.py store --candles 525600
+"""
+import os
+import argparse
+import logging
+import time
+import tracemalloc
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+import bybit_api
+from bybit_api import COMPACT_RELATIVE_ERROR, parse_kline_data_to_df
+from fake_bybit_server import FakeBybitServer
+from indicators import calculate_indicators, indicators_for_groups, parse_indicator_columns, parse_windows
+from parallel_indicators import ParallelIndicatorCalculator
+from data_filters import filter_incomplete_indicator_data
+from data_processing import OHLCPyramid, resample_by_time, resample_dataframe
+from data_export import export_dataframe, read_columnar
+from kline_downloader import download_kline_range
+from rate_limiter import AdaptiveRateLimiter
+
+logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - [Benchmarks] %(message)s')
+
+
+def _time_call(func: Callable, repeats: int) -> float:
+    """Повертає найкращий час виконання func серед repeats запусків, у секундах."""
+    best = float('inf')
+    for _ in range(repeats):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def _synthetic_candles(candles: int, interval_ms: int = 60_000, seed: int = 42) -> tuple:
+    """Випадкове блукання цін: мітки часу (мс) та колонки open, high, low, close, volume, turnover."""
+    rng = np.random.default_rng(seed)
+    timestamps = 1_700_000_000_000 + np.arange(candles, dtype=np.int64) * interval_ms
+    close = 30_000 + np.cumsum(rng.normal(0, 25, candles))
+    open_ = np.concatenate((close[:1], close[:-1]))
+    high = np.maximum(open_, close) + rng.uniform(0, 20, candles)
+    low = np.minimum(open_, close) - rng.uniform(0, 20, candles)
+    volume = rng.uniform(1, 500, candles)
+    turnover = volume * close
+    return timestamps, (open_, high, low, close, volume, turnover)
+
+
+def make_raw_klines(candles: int, interval_ms: int = 60_000, seed: int = 42) -> list:
+    """
+    Генерує сирі свічки у форматі відповіді Bybit (рядки, від найновішої до найстарішої).
+    """
+    timestamps, (open_, high, low, close, volume, turnover) = _synthetic_candles(candles, interval_ms, seed)
+    raw = [
+        [str(ts), f"{o:.1f}", f"{h:.1f}", f"{l:.1f}", f"{c:.1f}", f"{v:.3f}", f"{t:.4f}"]
+        for ts, o, h, l, c, v, t in zip(timestamps.tolist(), open_, high, low, close, volume, turnover)
+    ]
+    raw.reverse()
+    return raw
+
+
+def legacy_parse_kline_data_to_df(kline_data_raw: list) -> pd.DataFrame:
+    """
+    Попередня реалізація parse_kline_data_to_df — еталон для порівняння.
+    Час явно переводиться в int64, бо нові версії pandas не приймають рядки з unit='ms'.
+    """
+    df = pd.DataFrame(kline_data_raw, columns=[
+        'timestamp', 'open', 'high', 'low', 'close', 'volume', 'turnover'
+    ])
+    df['timestamp'] = pd.to_datetime(df['timestamp'].astype('int64'), unit='ms')
+    df.set_index('timestamp', inplace=True)
+    for col in ['open', 'high', 'low', 'close', 'volume', 'turnover']:
+        df[col] = pd.to_numeric(df[col], errors='coerce')
+    df.sort_index(inplace=True)
+    return df
+
+
+def bench_parser(candles: int, repeats: int):
+    raw = make_raw_klines(candles)
+
+    legacy_df = legacy_parse_kline_data_to_df(raw)
+    new_df = parse_kline_data_to_df(raw)
+    pd.testing.assert_frame_equal(legacy_df, new_df, check_names=False)
+
+    legacy_time = _time_call(lambda: legacy_parse_kline_data_to_df(raw), repeats)
+    new_time = _time_call(lambda: parse_kline_data_to_df(raw), repeats)
+    print(f"parse_kline_data_to_df, {candles} свічок:")
+    print(f"  попередня реалізація: {legacy_time:.3f} с")
+    print(f"  векторизований парсер: {new_time:.3f} с ({legacy_time / new_time:.1f}x)")
+
+
+def make_kline_df(candles: int, seed: int = 42) -> pd.DataFrame:
+    """DataFrame свічок у форматі kline_arrays_to_df без проміжного парсингу рядків."""
+    raw = np.array(make_raw_klines(candles, seed=seed)[::-1], dtype=np.float64)
+    index = pd.DatetimeIndex(pd.to_datetime(raw[:, 0].astype(np.int64), unit='ms'), name='timestamp')
+    return pd.DataFrame(raw[:, 1:], index=index, columns=['open', 'high', 'low', 'close', 'volume', 'turnover'])
+
+
+def legacy_calculate_indicators(df: pd.DataFrame, ma_windows, bb_windows, bb_std_dev, rsi_windows) -> pd.DataFrame:
+    """
+    Попередній підхід (окремий rolling-прохід на кожну колонку) для довільних вікон — еталон для порівняння.
+    """
+    df_copy = df.copy()
+    close = df_copy['close']
+    for window in ma_windows:
+        df_copy[f'SMA_{window}'] = close.rolling(window=window).mean()
+        df_copy[f'EMA_{window}'] = close.ewm(span=window, adjust=False).mean()
+    for window in bb_windows:
+        middle = close.rolling(window=window).mean()
+        rolling_std = close.rolling(window=window).std()
+        df_copy[f'BBM_{window}_{bb_std_dev}'] = middle
+        df_copy[f'BBU_{window}_{bb_std_dev}'] = middle + rolling_std * bb_std_dev
+        df_copy[f'BBL_{window}_{bb_std_dev}'] = middle - rolling_std * bb_std_dev
+    for window in rsi_windows:
+        delta = close.diff(1)
+        gain = delta.where(delta > 0, 0)
+        loss = -delta.where(delta < 0, 0)
+        rs = gain.ewm(span=window, adjust=False).mean() / loss.ewm(span=window, adjust=False).mean()
+        df_copy[f'RSI_{window}'] = 100 - (100 / (1 + rs))
+    return df_copy
+
+
+def _peak_memory(func: Callable) -> int:
+    """Пікове виділення пам'яті (байт) під час виклику func за tracemalloc."""
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def bench_indicators(candles: int, repeats: int, ma_windows: tuple, bb_windows: tuple,
+                     bb_std_dev: float, rsi_windows: tuple):
+    """
+    Повний розрахунок індикаторів: спільні проміжні ряди проти окремих проходів на кожну колонку.
+    """
+    df = make_kline_df(candles)
+    indicators = indicators_for_groups(True, True, True, ma_windows=ma_windows, bb_windows=bb_windows,
+                                       bb_std_dev=bb_std_dev, rsi_windows=rsi_windows)
+
+    def legacy():
+        return legacy_calculate_indicators(df, ma_windows, bb_windows, bb_std_dev, rsi_windows)
+
+    def shared():
+        return calculate_indicators(df, indicators)
+
+    legacy_df, new_df = legacy(), shared()
+    max_relative_error = 0.0
+    for column in legacy_df.columns:
+        expected, actual = legacy_df[column].to_numpy(), new_df[column].to_numpy()
+        assert np.array_equal(np.isnan(expected), np.isnan(actual)), column
+        valid = ~np.isnan(expected)
+        scale = np.maximum(np.abs(expected[valid]), 1.0)
+        max_relative_error = max(max_relative_error, float(np.max(np.abs(actual[valid] - expected[valid]) / scale, initial=0.0)))
+
+    legacy_time = _time_call(legacy, repeats)
+    new_time = _time_call(shared, repeats)
+    legacy_peak = _peak_memory(legacy)
+    new_peak = _peak_memory(shared)
+    print(f"calculate_indicators, {candles} свічок, {len(new_df.columns) - len(df.columns)} колонок:")
+    print(f"  окремі проходи:      {legacy_time:.3f} с, пік пам'яті {legacy_peak / 2**20:.1f} МіБ")
+    print(f"  спільні проміжні:    {new_time:.3f} с ({legacy_time / new_time:.1f}x), "
+          f"пік пам'яті {new_peak / 2**20:.1f} МіБ")
+    print(f"  макс. відносна розбіжність: {max_relative_error:.1e}")
+
+
+def bench_indicators_parallel(symbols: int, candles: int, workers_list: list, repeats: int):
+    """
+    Індикатори для набору символів: послідовно в одному процесі проти пулу процесів зі спільною пам'яттю.
+    """
+    frames = [make_kline_df(candles, seed=seed) for seed in range(symbols)]
+    indicators = indicators_for_groups(True, True, True, ma_windows=(20, 50, 200), bb_windows=(20,),
+                                       rsi_windows=(14,))
+    sequential_time = _time_call(lambda: [calculate_indicators(df, indicators) for df in frames], repeats)
+    print(f"Індикатори для {symbols} символів × {candles} свічок (ядер: {os.cpu_count()}):")
+    print(f"  послідовно:        {sequential_time:.3f} с")
+
+    for workers in workers_list:
+        with ParallelIndicatorCalculator(max_workers=workers) as calculator:
+            calculator.calculate(frames[:2], indicators)  # запуск процесів пулу не входить у замір
+            elapsed = _time_call(lambda: calculator.calculate(frames, indicators), repeats)
+        print(f"  {workers:>3} процесів:     {elapsed:.3f} с ({sequential_time / elapsed:.1f}x), "
+              f"{symbols * candles / elapsed:,.0f} свічок/с")
+
+
+def make_synthetic_kline_df(candles: int, seed: int = 42) -> pd.DataFrame:
+    """Те саме блукання, що й make_kline_df, але без рядкового проміжного кроку — придатне для 10M+ свічок."""
+    timestamps, values = _synthetic_candles(candles, seed=seed)
+    index = pd.DatetimeIndex(timestamps.astype('datetime64[ms]'), name='timestamp')
+    return pd.DataFrame(dict(zip(['open', 'high', 'low', 'close', 'volume', 'turnover'], values)), index=index)
+
+
+def legacy_resample_dataframe(df: pd.DataFrame, max_candles: int = 200) -> pd.DataFrame:
+    """Попередній resample_dataframe (reset_index + groupby().agg) — еталон для порівняння."""
+    if len(df) <= max_candles:
+        return df
+    resample_factor = np.ceil(len(df) / max_candles).astype(int)
+    df_temp = df.reset_index()
+    df_temp['group_id'] = df_temp.index // resample_factor
+    agg_dict = {'timestamp': 'first', 'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'}
+    if 'turnover' in df_temp.columns:
+        agg_dict['turnover'] = 'sum'
+    for column in df_temp.columns:
+        if column not in agg_dict and column != 'group_id':
+            agg_dict[column] = 'last'
+    resampled_df = df_temp.groupby('group_id').agg(**{k: (k, v) for k, v in agg_dict.items()})
+    resampled_df.set_index('timestamp', inplace=True)
+    resampled_df.sort_index(inplace=True)
+    return resampled_df
+
+
+def bench_resample(rows_list: list, max_candles: int, bucket: str, repeats: int):
+    """
+    Агрегація свічок для графіка: groupby-підхід проти сегментних редукцій
+    (за кількістю рядків) і календарних сегментів за часом.
+    """
+    indicators = indicators_for_groups(True, False, True)
+    for rows in rows_list:
+        df = calculate_indicators(make_synthetic_kline_df(rows), indicators)
+        expected = legacy_resample_dataframe(df, max_candles)
+        pd.testing.assert_frame_equal(resample_dataframe(df, max_candles), expected, check_freq=False)
+
+        legacy_time = _time_call(lambda: legacy_resample_dataframe(df, max_candles), repeats)
+        count_time = _time_call(lambda: resample_dataframe(df, max_candles), repeats)
+        time_time = _time_call(lambda: resample_by_time(df, bucket), repeats)
+        legacy_peak = _peak_memory(lambda: legacy_resample_dataframe(df, max_candles))
+        count_peak = _peak_memory(lambda: resample_dataframe(df, max_candles))
+        print(f"Агрегація {rows} свічок ({len(df.columns)} колонок) до {len(expected)}:")
+        print(f"  groupby().agg:           {legacy_time:.3f} с, пік {legacy_peak / 2**20:.1f} МіБ")
+        print(f"  reduceat за кількістю:   {count_time:.3f} с ({legacy_time / count_time:.1f}x), "
+              f"пік {count_peak / 2**20:.1f} МіБ")
+        print(f"  reduceat за часом ({bucket}): {time_time:.3f} с, "
+              f"{len(resample_by_time(df, bucket))} сегментів")
+        del df, expected
+
+
+def bench_pyramid(rows_list: list, max_candles_list: list, repeats: int):
+    """
+    Повторне відображення: агрегація всієї історії на кожен рендер проти зрізу піраміди.
+    """
+    indicators = indicators_for_groups(True, False, True)
+    for rows in rows_list:
+        df = calculate_indicators(make_synthetic_kline_df(rows), indicators)
+        started = time.perf_counter()
+        pyramid = OHLCPyramid(df)
+        build_time = time.perf_counter() - started
+        extra_bytes = sum(level.memory_usage(index=True).sum() for level in pyramid.levels[1:])
+        print(f"Піраміда для {rows} свічок: побудова {build_time:.3f} с, рівні "
+              f"{[len(level) for level in pyramid.levels]}, додатково "
+              f"{extra_bytes / df.memory_usage(index=True).sum():.0%} пам'яті даних")
+        for max_candles in max_candles_list:
+            full_time = _time_call(lambda: resample_dataframe(df, max_candles), repeats)
+            view_time = _time_call(lambda: pyramid.view(max_candles), repeats)
+            zoom_time = _time_call(lambda: pyramid.view(max_candles, rows // 2, rows // 2 + rows // 100), repeats)
+            print(f"  {max_candles:>5} свічок: resample_dataframe {full_time * 1e3:.1f} мс, "
+                  f"зріз піраміди {view_time * 1e3:.2f} мс ({len(pyramid.view(max_candles))} свічок), "
+                  f"1% історії {zoom_time * 1e3:.2f} мс")
+        del df, pyramid
+
+
+# Діапазон масштабів у bench_viewport: від усієї історії до її 1/ZOOM_LEVELS
+ZOOM_LEVELS = 10_000
+
+
+def bench_viewport(rows: int, max_candles: int, frames: int):
+    """
+    Кадри інтерактивного графіка: зміна видимого вікна (масштаб і зсув) з повним малюванням
+    та кадри жесту перетягування, що відновлюють кешований фон і малюють лише змінні артисти.
+    Потребує PyQt6 (для headless-запуску — QT_QPA_PLATFORM=offscreen).
+    """
+    from PyQt6.QtWidgets import QApplication
+    from viewport_chart import ViewportChartCanvas
+
+    app = QApplication.instance() or QApplication([])
+    df = calculate_indicators(make_synthetic_kline_df(rows), indicators_for_groups(True, True, True))
+    pyramid = OHLCPyramid(df)
+    canvas = ViewportChartCanvas(max_candles, include_rsi=True)
+    canvas.resize(1200, 800)
+    canvas.set_pyramid(pyramid, title="BENCH")
+    canvas.draw()
+
+    rng = np.random.default_rng(0)
+    viewport_times, frame_times = [], []
+    for _ in range(frames):
+        span = int(rows / ZOOM_LEVELS ** rng.uniform(0, 1))
+        start = int(rng.integers(0, rows - span + 1))
+        started = time.perf_counter()
+        canvas.set_viewport(start, start + span)
+        viewport_times.append(time.perf_counter() - started)
+        canvas.draw()
+        frame_times.append(time.perf_counter() - started)
+    viewport_ms, frame_ms = np.median(viewport_times) * 1e3, np.median(frame_times) * 1e3
+
+    # Перетягування: зсув вікна на кілька свічок за кадр, фон кешується на початку жесту
+    span = rows // ZOOM_LEVELS
+    start = rows // 2
+    canvas.set_viewport(start, start + span)
+    canvas.draw()
+    started = time.perf_counter()
+    canvas._begin_interaction()
+    begin_ms = (time.perf_counter() - started) * 1e3
+    drag_times = []
+    for step in range(frames):
+        started = time.perf_counter()
+        canvas._blit_viewport(start - step * span // 100, start - step * span // 100 + span)
+        app.processEvents()
+        drag_times.append(time.perf_counter() - started)
+    canvas._end_interaction()
+    drag_ms = np.median(drag_times) * 1e3
+
+    print(f"Інтерактивний графік, {rows} свічок, до {max_candles} на екрані, {frames} кадрів:")
+    print(f"  оновлення даних вікна: {viewport_ms:.1f} мс, кадр з малюванням: {frame_ms:.1f} мс "
+          f"({1000 / frame_ms:.0f} кадрів/с)")
+    print(f"  перетягування: кадр {drag_ms:.1f} мс ({1000 / drag_ms:.0f} кадрів/с), "
+          f"кешування фону на початку жесту: {begin_ms:.1f} мс")
+    del app
+
+
+def bench_charts(symbols: int, candles: int, max_candles: int, output_dir: str):
+    """
+    Пакетний експорт PNG в одному процесі: нові стиль і фігура на кожен символ
+    проти перевикористаної ChartFigureTemplate з chart_rendering.
+    """
+    import matplotlib
+    matplotlib.use('Agg', force=True)
+    import matplotlib.pyplot as plt
+    from chart_rendering import DEFAULT_CHART_DPI, ChartFigureTemplate, chart_style, render_chart_file
+
+    os.makedirs(output_dir, exist_ok=True)
+    groups = ['BB', 'MA', 'RSI']
+    frames = [calculate_indicators(make_synthetic_kline_df(candles, seed=seed), indicators_for_groups(True, True, True))
+              for seed in range(symbols)]
+
+    def legacy():
+        for number, df in enumerate(frames):
+            chart_style.cache_clear()
+            template = ChartFigureTemplate(include_oscillators=True)
+            template.render(resample_dataframe(df, max_candles), groups, f"SYM{number}")
+            template.figure.savefig(os.path.join(output_dir, f"legacy_{number}.png"), dpi=DEFAULT_CHART_DPI,
+                                    facecolor=template.figure.get_facecolor())
+            plt.close(template.figure)
+
+    def templated():
+        for number, df in enumerate(frames):
+            render_chart_file(df, groups, f"SYM{number}", os.path.join(output_dir, f"chart_{number}.png"), max_candles)
+
+    templated()  # перший виклик створює стиль і фігуру
+    legacy_seconds = _time_call(legacy, 1)
+    templated_seconds = _time_call(templated, 1)
+    print(f"Експорт {symbols} графіків PNG ({candles} свічок, до {max_candles} на графіку), один процес:")
+    print(f"  нова фігура на символ:    {legacy_seconds / symbols * 1e3:.0f} мс/графік")
+    print(f"  шаблон фігури (процесу):  {templated_seconds / symbols * 1e3:.0f} мс/графік")
+    print("  У render_chart_pack процеси працюють паралельно, тож пропускна здатність масштабується з ядрами.")
+
+
+def bench_store(candles: int, store_path: str):
+    """
+    Повторне завантаження діапазону з локального сховища свічок (помісячні BLOB-партиції).
+    """
+    from candle_store import CandleStore
+
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(store_path + suffix):
+            os.remove(store_path + suffix)
+    store = CandleStore(store_path)
+    timestamps, columns = _synthetic_candles(candles)
+    values = np.column_stack(columns)
+    covered = [(int(timestamps[0]), int(timestamps[-1]))]
+    save_seconds = _time_call(lambda: store.save_candles("linear", "BENCH", "1", timestamps, values, covered), 1)
+    load_seconds = _time_call(lambda: store.load_candles("linear", "BENCH", "1", *covered[0]), 5)
+    print(f"Сховище свічок, {candles} свічок 1m:")
+    print(f"  запис: {save_seconds:.2f} с, повторне завантаження: {load_seconds * 1e3:.1f} мс")
+
+
+def bench_export(candles: int, output_dir: str):
+    """
+    Експорт вибраних колонок у CSV, Parquet і Feather: час запису, розмір файлу та
+    час читання двох колонок за 1% історії.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    df = calculate_indicators(make_kline_df(candles), indicators_for_groups(True, True, True))
+    columns = [column for column in df.columns if column != 'turnover']
+    timestamps = df.index.as_unit('ms').asi8
+    start_ms, end_ms = int(timestamps[candles // 2]), int(timestamps[candles // 2 + candles // 100])
+
+    print(f"Експорт {candles} свічок, {len(columns)} колонок:")
+    for name, file_name, compression in (("CSV", "export.csv", None), ("Parquet zstd", "export.parquet", "zstd"),
+                                         ("Parquet snappy", "export_snappy.parquet", "snappy"),
+                                         ("Feather zstd", "export.feather", "zstd"),
+                                         ("Feather без стиснення", "export_raw.arrow", "none")):
+        path = os.path.join(output_dir, file_name)
+        write_seconds = _time_call(lambda: export_dataframe(df, path, columns, compression=compression), 1)
+        if name == "CSV":
+            read_seconds = _time_call(lambda: pd.read_csv(path, usecols=['timestamp', 'close', 'RSI_14']), 1)
+        else:
+            read_seconds = _time_call(lambda: read_columnar(path, ['close', 'RSI_14'], start_ms, end_ms), 3)
+        print(f"  {name:<22} запис {write_seconds:6.2f} с, {os.path.getsize(path) / 2**20:7.1f} МБ, "
+              f"читання 2 колонок за 1% часу {read_seconds * 1e3:8.1f} мс")
+
+
+def legacy_pipeline(df: pd.DataFrame, columns: list) -> pd.DataFrame:
+    """Попередній шлях від завантаження до експорту: копія на кожному кроці."""
+    full_df = df.copy()  # on_data_downloaded
+    with_indicators = legacy_calculate_indicators(full_df.copy(), (20,), (20,), 2.0, (14,))
+    filtered = with_indicators.copy()
+    filtered.dropna(subset=[column for column in columns if column not in full_df.columns], inplace=True)
+    return filtered[columns].copy()
+
+
+def bench_pipeline(candles: int, export_path: str):
+    """
+    Пікова пам'ять шляху свічки → індикатори → фільтр → фрейм для експорту відносно
+    розміру даних. Сам запис CSV однаковий для обох шляхів і під tracemalloc дуже
+    повільний, тому виконується окремо лише для перевірки однакового результату.
+    """
+    df = make_kline_df(candles)
+    indicators = indicators_for_groups(True, True, True)
+    columns = list(df.columns) + [column for indicator in indicators for column in indicator.columns]
+    data_bytes = df.memory_usage(index=True).sum()
+    new_bytes = len(df) * 8 * (len(columns) - len(df.columns))
+
+    def current() -> pd.DataFrame:
+        with_indicators = calculate_indicators(df, indicators)
+        return filter_incomplete_indicator_data(with_indicators, {'MA': True, 'BB': True, 'RSI': True})
+
+    pd.testing.assert_frame_equal(current()[columns], legacy_pipeline(df, columns), rtol=1e-9)
+    export_dataframe(current(), export_path, columns)
+
+    legacy_peak = _peak_memory(lambda: legacy_pipeline(df, columns))
+    current_peak = _peak_memory(current)
+    print(f"Конвеєр до експорту, {candles} свічок: дані {data_bytes / 2**20:.1f} МіБ, нові колонки {new_bytes / 2**20:.1f} МіБ")
+    print(f"  з копіями на кожному кроці: пік {legacy_peak / 2**20:.1f} МіБ ({legacy_peak / data_bytes:.1f}× даних)")
+    print(f"  без копій:                  пік {current_peak / 2**20:.1f} МіБ ({current_peak / data_bytes:.1f}× даних)")
+
+
+def compact_error_bounds(df: pd.DataFrame) -> dict:
+    """
+    Оцінки похибки компактного режиму для кожної колонки (див. compute_indicator_columns).
+    Рахуються з точних float64 даних df з уже розрахованими індикаторами.
+    """
+    u = COMPACT_RELATIVE_ERROR
+    close = df['close'].to_numpy()
+    # Найбільше |close| в історії до кожної свічки; невелика частка — запас на округлення float64
+    running_max = np.maximum.accumulate(np.abs(close))
+    slack = running_max * 1e-12
+    bounds = {column: u * np.abs(df[column].to_numpy()) for column in ('open', 'high', 'low', 'close', 'volume', 'turnover')}
+    for indicator in parse_indicator_columns(df.columns):
+        if indicator.kind in ('SMA', 'EMA'):
+            bounds[indicator.columns[0]] = 2 * u * running_max + slack
+        elif indicator.kind == 'BB':
+            n, k = indicator.window, indicator.std_dev
+            for column in indicator.columns:
+                spread = 2 * u * running_max if column.startswith('BBM') else \
+                    (1 + k * np.sqrt(n / (n - 1))) * u * running_max + u * np.abs(df[column].to_numpy())
+                bounds[column] = spread + slack
+        elif indicator.kind == 'RSI':
+            delta = pd.Series(close).diff()
+            avg_gain = delta.clip(lower=0).ewm(span=indicator.window, adjust=False).mean().to_numpy()
+            avg_loss = (-delta).clip(lower=0).ewm(span=indicator.window, adjust=False).mean().to_numpy()
+            with np.errstate(divide='ignore'):
+                bounds[indicator.columns[0]] = 200 * u * running_max / (avg_gain + avg_loss) + 100 * u + 1e-9
+    return bounds
+
+
+def bench_compact(candles: int, ma_windows: tuple, bb_windows: tuple, bb_std_dev: float, rsi_windows: tuple) -> list:
+    """
+    Пам'ять і похибка компактного (float32) режиму проти float64 на тих самих свічках.
+    Кожна колонка перевіряється на задокументовану оцінку похибки; повертає колонки,
+    що її перевищують (main тоді завершується з кодом 1).
+    """
+    raw = make_raw_klines(candles)
+    indicators = indicators_for_groups(True, True, True, ma_windows=ma_windows, bb_windows=bb_windows,
+                                       bb_std_dev=bb_std_dev, rsi_windows=rsi_windows)
+    full = calculate_indicators(parse_kline_data_to_df(raw), indicators)
+    compact = calculate_indicators(parse_kline_data_to_df(raw, compact=True), indicators)
+    del raw
+
+    full_bytes = full.memory_usage(index=True).sum()
+    compact_bytes = compact.memory_usage(index=True).sum()
+    print(f"Компактний режим, {candles} свічок, {len(full.columns)} колонок:")
+    print(f"  float64: {full_bytes / 2**20:.1f} МіБ, float32: {compact_bytes / 2**20:.1f} МіБ "
+          f"({compact_bytes / full_bytes:.0%} пам'яті, індекс datetime64 не змінюється)")
+
+    bounds = compact_error_bounds(full)
+    violations = []
+    print(f"  {'колонка':<14} {'макс. |Δ|':>12} {'макс. |Δ|/оцінка':>18}")
+    for column in full.columns:
+        error = np.abs(compact[column].to_numpy(dtype=np.float64) - full[column].to_numpy())
+        valid = ~np.isnan(error)
+        ratio = np.max(error[valid] / bounds[column][valid], initial=0.0)
+        print(f"  {column:<14} {np.max(error[valid], initial=0.0):>12.3g} {ratio:>18.3f}")
+        if ratio > 1:
+            violations.append(column)
+    if violations:
+        print(f"  ПОМИЛКА: похибка перевищує оцінку для колонок: {', '.join(violations)}")
+    else:
+        print("  Усі колонки в межах задокументованих оцінок.")
+    return violations
+
+
+def bench_download(days: int, interval: str, workers_list: list, latency_ms: float,
+                   error_rate: float, server_rate_limit: float):
+    """
+    Пропускна здатність усього шляху завантаження проти локального замінника API.
+    """
+    with FakeBybitServer(latency_ms=latency_ms, error_rate=error_rate,
+                         rate_limit_per_second=server_rate_limit) as server:
+        bybit_api.set_base_url(server.base_url)
+        try:
+            end_time_ms = 1_760_000_000_000
+            start_time_ms = end_time_ms - days * 24 * 60 * 60 * 1000
+            print(f"download_kline_range, {days} днів ({interval}), затримка {latency_ms} мс:")
+            for workers in workers_list:
+                requests_before = server.requests_served
+                started = time.perf_counter()
+                timestamps, _ = download_kline_range(
+                    "linear", "BTCUSDT", interval, start_time_ms, end_time_ms,
+                    max_workers=workers, rate_limiter=AdaptiveRateLimiter(10_000)
+                )
+                elapsed = time.perf_counter() - started
+                requests_made = server.requests_served - requests_before
+                print(f"  {workers:>3} потоків: {elapsed:.2f} с, {len(timestamps) / elapsed:,.0f} свічок/с, "
+                      f"{requests_made / elapsed:.1f} запитів/с")
+        finally:
+            bybit_api.set_base_url(None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Заміри продуктивності конвеєра свічок")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    parser_bench = subparsers.add_parser("parser", help="Парсинг сирих свічок у DataFrame")
+    parser_bench.add_argument("--candles", type=int, default=500_000)
+    parser_bench.add_argument("--repeats", type=int, default=3)
+
+    download_bench = subparsers.add_parser("download", help="Завантаження через локальний замінник API")
+    download_bench.add_argument("--days", type=int, default=30)
+    download_bench.add_argument("--interval", default="1")
+    download_bench.add_argument("--workers", default="1,2,4,8,16", help="Кількість потоків через кому")
+    download_bench.add_argument("--latency-ms", type=float, default=40.0)
+    download_bench.add_argument("--error-rate", type=float, default=0.0)
+    download_bench.add_argument("--server-rate-limit", type=float, help="Ліміт запитів/с на боці сервера")
+
+    indicators_bench = subparsers.add_parser("indicators", help="Розрахунок індикаторів для кількох вікон")
+    indicators_bench.add_argument("--candles", type=int, default=1_000_000)
+    indicators_bench.add_argument("--repeats", type=int, default=3)
+    indicators_bench.add_argument("--ma-windows", type=parse_windows, default=(20, 50, 200))
+    indicators_bench.add_argument("--bb-windows", type=parse_windows, default=(20, 50))
+    indicators_bench.add_argument("--bb-std", type=float, default=2.0)
+    indicators_bench.add_argument("--rsi-windows", type=parse_windows, default=(7, 14))
+
+    parallel_bench = subparsers.add_parser("indicators-parallel", help="Індикатори для багатьох символів у пулі процесів")
+    parallel_bench.add_argument("--symbols", type=int, default=32)
+    parallel_bench.add_argument("--candles", type=int, default=250_000)
+    parallel_bench.add_argument("--workers", default="1,2,4,8", help="Кількість процесів через кому")
+    parallel_bench.add_argument("--repeats", type=int, default=3)
+
+    pipeline_bench = subparsers.add_parser("pipeline", help="Пікова пам'ять конвеєра до CSV")
+    pipeline_bench.add_argument("--candles", type=int, default=1_000_000)
+    pipeline_bench.add_argument("--export-path", default=os.devnull)
+
+    compact_bench = subparsers.add_parser("compact", help="Пам'ять і похибка компактного режиму float32")
+    compact_bench.add_argument("--candles", type=int, default=1_000_000)
+    compact_bench.add_argument("--ma-windows", type=parse_windows, default=(20, 50, 200))
+    compact_bench.add_argument("--bb-windows", type=parse_windows, default=(20, 50))
+    compact_bench.add_argument("--bb-std", type=float, default=2.0)
+    compact_bench.add_argument("--rsi-windows", type=parse_windows, default=(7, 14))
+
+    resample_bench = subparsers.add_parser("resample", help="Агрегація свічок для графіка")
+    resample_bench.add_argument("--rows", default="1000000,10000000", help="Кількість свічок через кому")
+    resample_bench.add_argument("--max-candles", type=int, default=200)
+    resample_bench.add_argument("--bucket", default="60", help="Інтервал Bybit для календарних сегментів")
+    resample_bench.add_argument("--repeats", type=int, default=3)
+
+    pyramid_bench = subparsers.add_parser("pyramid", help="Піраміда деталізації для повторних рендерів")
+    pyramid_bench.add_argument("--rows", default="1000000,10000000", help="Кількість свічок через кому")
+    pyramid_bench.add_argument("--max-candles", default="50,200,1000", help="Кількість свічок на графіку через кому")
+    pyramid_bench.add_argument("--repeats", type=int, default=5)
+
+    viewport_bench = subparsers.add_parser("viewport", help="Кадри інтерактивного графіка (потрібен PyQt6)")
+    viewport_bench.add_argument("--rows", type=int, default=1_000_000)
+    viewport_bench.add_argument("--max-candles", type=int, default=200)
+    viewport_bench.add_argument("--frames", type=int, default=50)
+
+    charts_bench = subparsers.add_parser("charts", help="Пакетний експорт графіків PNG")
+    charts_bench.add_argument("--symbols", type=int, default=20)
+    charts_bench.add_argument("--candles", type=int, default=50_000)
+    charts_bench.add_argument("--max-candles", type=int, default=200)
+    charts_bench.add_argument("--output-dir", default="bench_charts")
+
+    store_bench = subparsers.add_parser("store", help="Повторне завантаження зі сховища свічок")
+    store_bench.add_argument("--candles", type=int, default=525_600)
+    store_bench.add_argument("--store-path", default="bench_store.sqlite")
+
+    export_bench = subparsers.add_parser("export", help="Експорт у CSV, Parquet і Feather")
+    export_bench.add_argument("--candles", type=int, default=1_000_000)
+    export_bench.add_argument("--output-dir", default="bench_export")
+
+    args = parser.parse_args()
+    # Модулі конвеєра налаштовують логування на INFO — під час замірів воно лише заважає
+    logging.getLogger().setLevel(logging.WARNING)
+    if args.benchmark == "parser":
+        bench_parser(args.candles, args.repeats)
+    elif args.benchmark == "download":
+        bench_download(args.days, args.interval, [int(w) for w in args.workers.split(",")],
+                       args.latency_ms, args.error_rate, args.server_rate_limit)
+    elif args.benchmark == "indicators":
+        bench_indicators(args.candles, args.repeats, args.ma_windows, args.bb_windows,
+                         args.bb_std, args.rsi_windows)
+    elif args.benchmark == "pipeline":
+        bench_pipeline(args.candles, args.export_path)
+    elif args.benchmark == "resample":
+        bench_resample([int(rows) for rows in args.rows.split(",")], args.max_candles, args.bucket, args.repeats)
+    elif args.benchmark == "pyramid":
+        bench_pyramid([int(rows) for rows in args.rows.split(",")],
+                      [int(candles) for candles in args.max_candles.split(",")], args.repeats)
+    elif args.benchmark == "viewport":
+        bench_viewport(args.rows, args.max_candles, args.frames)
+    elif args.benchmark == "store":
+        bench_store(args.candles, args.store_path)
+    elif args.benchmark == "export":
+        bench_export(args.candles, args.output_dir)
+    elif args.benchmark == "charts":
+        bench_charts(args.symbols, args.candles, args.max_candles, args.output_dir)
+    elif args.benchmark == "compact":
+        if bench_compact(args.candles, args.ma_windows, args.bb_windows, args.bb_std, args.rsi_windows):
+            return 1
+    elif args.benchmark == "indicators-parallel":
+        bench_indicators_parallel(args.symbols, args.candles, [int(w) for w in args.workers.split(",")], args.repeats)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -1,11 +1,174 @@
+import os
 import requests
+import threading
 import time
+import bisect
+import numpy as np
 import pandas as pd
 from datetime import datetime
 import logging
+from typing import Dict, Optional
+from requests.adapters import HTTPAdapter
+
+from rate_limiter import (
+    RateLimiter, AdaptiveRateLimiter, get_shared_rate_limiter,
+    RATE_LIMIT_RET_CODES, RATE_LIMIT_HTTP_STATUSES
+)
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - [Bybit API] %(message)s')
 
+# Тривалість інтервалів Bybit у мілісекундах. Для 'M' береться верхня межа (31 день),
+# щоб вікно з limit свічок гарантовано не перевищувало ліміт API.
+INTERVAL_MS = {
+    '1': 60_000,
+    '3': 3 * 60_000,
+    '5': 5 * 60_000,
+    '15': 15 * 60_000,
+    '30': 30 * 60_000,
+    '60': 60 * 60_000,
+    '120': 120 * 60_000,
+    '240': 240 * 60_000,
+    '360': 360 * 60_000,
+    '720': 720 * 60_000,
+    'D': 24 * 60 * 60_000,
+    'W': 7 * 24 * 60 * 60_000,
+    'M': 31 * 24 * 60 * 60_000,
+}
+
+
+def interval_to_ms(interval: str) -> int:
+    """
+    Повертає тривалість інтервалу Bybit у мілісекундах.
+    """
+    try:
+        return INTERVAL_MS[interval]
+    except KeyError:
+        raise ValueError(f"Невідомий інтервал Bybit: {interval}")
+
+
+KLINE_VALUE_COLUMNS = ['open', 'high', 'low', 'close', 'volume', 'turnover']
+
+# Компактний режим: значення свічок і індикаторів зберігаються у float32 (удвічі менше пам'яті).
+# Відносна похибка кожного збереженого значення не перевищує COMPACT_RELATIVE_ERROR (2**-24 ≈ 6e-8):
+# для ціни 100 000 це до 0.006, тобто менше за крок ціни. Оцінки для індикаторів — у indicators.py.
+COMPACT_DTYPE = np.float32
+COMPACT_RELATIVE_ERROR = float(np.finfo(COMPACT_DTYPE).eps) / 2
+
+DEFAULT_POOL_SIZE = 16
+
+
+class KlineRequestError(RuntimeError):
+    """Запит свічок не вдався після всіх повторів (див. raise_on_failure)."""
+
+DEFAULT_BASE_URL = "https://api.bybit.com"
+# Базову адресу можна перевизначити, наприклад для локального сервера-замінника
+_base_url = os.environ.get("BYBIT_BASE_URL", DEFAULT_BASE_URL).rstrip("/")
+
+
+def set_base_url(base_url: Optional[str] = None):
+    """
+    Перемикає клієнт на іншу базову адресу API; None — повернення до api.bybit.com.
+    """
+    global _base_url
+    _base_url = (base_url or DEFAULT_BASE_URL).rstrip("/")
+    logging.info(f"[Bybit API] Базова адреса API: {_base_url}")
+
+
+def get_base_url() -> str:
+    return _base_url
+
+
+class LatencyHistogram:
+    """
+    Потокобезпечна гістограма затримок HTTP-запитів (межі кошиків у мілісекундах).
+    """
+
+    DEFAULT_BOUNDS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+    def __init__(self, bounds_ms: tuple = DEFAULT_BOUNDS_MS):
+        self.bounds_ms = tuple(bounds_ms)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._counts = [0] * (len(self.bounds_ms) + 1)
+            self._total_ms = 0.0
+            self._max_ms = 0.0
+
+    def record(self, latency_ms: float):
+        bucket = bisect.bisect_left(self.bounds_ms, latency_ms)
+        with self._lock:
+            self._counts[bucket] += 1
+            self._total_ms += latency_ms
+            self._max_ms = max(self._max_ms, latency_ms)
+
+    @property
+    def count(self) -> int:
+        with self._lock:
+            return sum(self._counts)
+
+    def snapshot(self) -> Dict[str, int]:
+        """
+        Повертає кількість запитів у кожному кошику, наприклад {'<=50ms': 3, '>10000ms': 0}.
+        """
+        with self._lock:
+            counts = list(self._counts)
+        labels = [f"<={bound}ms" for bound in self.bounds_ms] + [f">{self.bounds_ms[-1]}ms"]
+        return dict(zip(labels, counts))
+
+    def summary(self) -> str:
+        with self._lock:
+            total = sum(self._counts)
+            mean_ms = self._total_ms / total if total else 0.0
+            max_ms = self._max_ms
+        buckets = ", ".join(f"{label}: {count}" for label, count in self.snapshot().items() if count)
+        return f"запитів: {total}, середня: {mean_ms:.1f} мс, макс.: {max_ms:.1f} мс [{buckets}]"
+
+
+_session_lock = threading.Lock()
+_http_session: Optional[requests.Session] = None
+_latency_histogram = LatencyHistogram()
+
+
+def configure_http_session(pool_size: int = DEFAULT_POOL_SIZE) -> requests.Session:
+    """
+    Створює (або перестворює) спільну HTTP-сесію з пулом keep-alive з'єднань.
+    """
+    global _http_session
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({
+        "Accept-Encoding": "gzip, deflate",
+        "Connection": "keep-alive",
+    })
+
+    with _session_lock:
+        previous_session, _http_session = _http_session, session
+    if previous_session is not None:
+        previous_session.close()
+
+    logging.info(f"[Bybit API] Створено HTTP-сесію з пулом на {pool_size} з'єднань.")
+    return session
+
+
+def get_http_session() -> requests.Session:
+    """
+    Повертає спільну HTTP-сесію модуля, створюючи її за потреби.
+    """
+    with _session_lock:
+        session = _http_session
+    if session is None:
+        session = configure_http_session()
+    return session
+
+
+def get_request_latency_histogram() -> LatencyHistogram:
+    return _latency_histogram
+
+
 def get_bybit_kline_data_raw(
     category: str,
     symbol: str,
@@ -15,12 +178,24 @@ def get_bybit_kline_data_raw(
     limit: int = 1000,
     max_retries: int = 3,
     delay_between_retries: float = 0.05,
-    request_timeout: int = 15
+    request_timeout: int = 15,
+    session: Optional[requests.Session] = None,
+    rate_limiter: Optional[RateLimiter] = None,
+    max_rate_limit_retries: int = 8,
+    raise_on_failure: bool = False
 ) -> list:
     """
     Отримує сирі дані свічок (kline) з Bybit API.
+    Темп запитів задає rate_limiter (за замовчуванням спільний адаптивний лімітер).
+    Відповіді про перевищення ліміту не витрачають спроби max_retries,
+    але обмежені max_rate_limit_retries.
+    Якщо всі спроби невдалі, повертає порожній список, а з raise_on_failure=True
+    кидає KlineRequestError, щоб збій не виглядав як вікно без торгів.
     """
-    base_url = "https://api.bybit.com/v5/market/kline"
+    base_url = f"{get_base_url()}/v5/market/kline"
+    http_session = session if session is not None else get_http_session()
+    limiter = rate_limiter if rate_limiter is not None else get_shared_rate_limiter()
+    adaptive = isinstance(limiter, AdaptiveRateLimiter)
     
     params = {
         "category": category,
@@ -33,58 +208,136 @@ def get_bybit_kline_data_raw(
     if end_timestamp is not None:
         params["end"] = end_timestamp
 
-    for attempt in range(max_retries):
+    def wait_before_retry(attempt: int):
+        if attempt < max_retries - 1:
+            delay = limiter.backoff_delay(attempt) if adaptive else delay_between_retries
+            time.sleep(max(delay, delay_between_retries))
+
+    attempt = 0
+    rate_limit_hits = 0
+    last_error = "невідома помилка"
+    while attempt < max_retries:
         try:
+            limiter.acquire()
             logging.info(f"[Bybit API] Спроба {attempt + 1}/{max_retries}: Запит до {base_url} з параметрами {params}")
-            response = requests.get(base_url, params=params, timeout=request_timeout) 
-            response.raise_for_status()
-            data = response.json()
+            request_started = time.perf_counter()
+            response = http_session.get(base_url, params=params, timeout=request_timeout)
+            _latency_histogram.record((time.perf_counter() - request_started) * 1000)
+            if adaptive:
+                limiter.update_from_headers(response.headers)
+
+            rate_limited = response.status_code in RATE_LIMIT_HTTP_STATUSES
+            data = None
+            if not rate_limited:
+                response.raise_for_status()
+                data = response.json()
+                rate_limited = data["retCode"] in RATE_LIMIT_RET_CODES
+
+            if rate_limited:
+                rate_limit_hits += 1
+                logging.warning(f"[Bybit API] Перевищено ліміт запитів (HTTP {response.status_code}"
+                                f"{', retCode ' + str(data['retCode']) if data else ''}). "
+                                f"Повтор {rate_limit_hits}/{max_rate_limit_retries}.")
+                if rate_limit_hits > max_rate_limit_retries:
+                    break
+                if adaptive:
+                    retry_after = response.headers.get("Retry-After")
+                    limiter.on_rate_limited(float(retry_after) if retry_after and retry_after.isdigit() else None)
+                else:
+                    time.sleep(delay_between_retries * (2 ** rate_limit_hits))
+                continue
 
             if data["retCode"] == 0:
+                if adaptive:
+                    limiter.on_success()
                 logging.info(f"[Bybit API] Успішно отримано {len(data['result']['list'])} свічок.")
                 return data["result"]["list"]
             else:
                 logging.error(f"[Bybit API] Помилка Bybit API (retCode: {data['retCode']}): {data['retMsg']}")
+                last_error = f"retCode {data['retCode']}: {data['retMsg']}"
                 if attempt < max_retries - 1:
-                    time.sleep(delay_between_retries)
+                    wait_before_retry(attempt)
                 else:
-                    return []
+                    break
 
         except requests.exceptions.Timeout as e:
             logging.error(f"[Bybit API] Помилка таймауту запиту: {e}. Спроба {attempt + 1}/{max_retries}")
-            if attempt < max_retries - 1:
-                time.sleep(delay_between_retries)
+            last_error = f"таймаут: {e}"
+            wait_before_retry(attempt)
         except requests.exceptions.RequestException as e:
             logging.error(f"[Bybit API] Мережева помилка запиту: {e}. Спроба {attempt + 1}/{max_retries}")
-            if attempt < max_retries - 1:
-                time.sleep(delay_between_retries)
+            last_error = f"мережева помилка: {e}"
+            wait_before_retry(attempt)
         except Exception as e:
             logging.error(f"[Bybit API] Невідома помилка під час запиту: {e}. Спроба {attempt + 1}/{max_retries}", exc_info=True)
-            if attempt < max_retries - 1:
-                time.sleep(delay_between_retries)
-    
+            last_error = str(e)
+            wait_before_retry(attempt)
+        attempt += 1
+
+    if rate_limit_hits > max_rate_limit_retries:
+        last_error = f"перевищено ліміт запитів {rate_limit_hits} разів"
+    if raise_on_failure:
+        raise KlineRequestError(f"Всі спроби запиту {symbol} ({interval}) {start_timestamp}–{end_timestamp} невдалі: {last_error}")
     logging.error("[Bybit API] Всі спроби запиту до Bybit API невдалі. Повертаю порожній список.")
     return []
 
-def parse_kline_data_to_df(kline_data_raw: list) -> pd.DataFrame:
+def kline_page_to_array(kline_page: list) -> np.ndarray:
+    """
+    Перетворює сторінку сирих свічок на числовий масив float64 форми (n, 7).
+    Час у мілісекундах представляється у float64 без втрати точності.
+    """
+    if not kline_page:
+        return np.empty((0, 7), dtype=np.float64)
+    try:
+        return np.array(kline_page, dtype=np.float64)
+    except ValueError:
+        # Некоректні значення перетворюються на NaN, як у pd.to_numeric(errors='coerce')
+        logging.warning("[Bybit API] Сторінка містить нечислові значення, використовую повільний парсинг.")
+        page_df = pd.DataFrame(kline_page)
+        return page_df.apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float64)
+
+
+def kline_arrays_to_df(timestamps: np.ndarray, values: np.ndarray, compact: bool = False) -> pd.DataFrame:
+    """
+    Будує DataFrame свічок з масиву часу (int64, мс) та значень (n, 6) без копіювання значень.
+    Найкраще передавати values у колонковому розміщенні (транспонований масив (6, n)).
+    compact=True зберігає значення у float32 (одне перетворення з тим самим розміщенням).
+    """
+    if len(timestamps) == 0:
+        logging.warning("[Bybit API] Порожні дані для побудови DataFrame.")
+        return pd.DataFrame()
+
+    if compact:
+        values = values.astype(COMPACT_DTYPE, order='K')
+
+    index = pd.DatetimeIndex(pd.to_datetime(timestamps, unit='ms'), name='timestamp')
+    df = pd.DataFrame(values, index=index, columns=KLINE_VALUE_COLUMNS, copy=False)
+    logging.info(f"[Bybit API] Побудовано DataFrame з {len(df)} свічок.")
+    return df
+
+
+def parse_kline_data_to_df(kline_data_raw: list, compact: bool = False) -> pd.DataFrame:
     """
     Парсить сирі дані kline у Pandas DataFrame.
+    Усі рядки перетворюються на float64 одним векторизованим проходом,
+    після чого колонки впорядковуються за часом однією операцією.
+    compact=True — значення зберігаються у float32 (див. COMPACT_DTYPE).
     """
     if not kline_data_raw:
         logging.warning("[Bybit API] Порожні сирі дані для парсингу.")
         return pd.DataFrame()
 
-    df = pd.DataFrame(kline_data_raw, columns=[
-        'timestamp', 'open', 'high', 'low', 'close', 'volume', 'turnover'
-    ])
-    df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-    df.set_index('timestamp', inplace=True)
-    
-    numeric_cols = ['open', 'high', 'low', 'close', 'volume', 'turnover']
-    for col in numeric_cols:
-        df[col] = pd.to_numeric(df[col], errors='coerce')
-    
-    df.sort_index(inplace=True)
-    
+    candles = kline_page_to_array(kline_data_raw)
+    timestamps = candles[:, 0]
+
+    # API віддає свічки від найновішої до найстарішої — зазвичай достатньо розвернути
+    if len(timestamps) < 2 or np.all(timestamps[1:] >= timestamps[:-1]):
+        columns = np.ascontiguousarray(candles.T)
+    elif np.all(timestamps[1:] <= timestamps[:-1]):
+        columns = np.ascontiguousarray(candles[::-1].T)
+    else:
+        columns = np.take(candles.T, np.argsort(timestamps, kind='stable'), axis=1)
+
+    df = kline_arrays_to_df(columns[0].astype(np.int64), columns[1:].T, compact=compact)
     logging.info(f"[Bybit API] Успішно розпарсено {len(df)} свічок у DataFrame.")
-    return df
\ No newline at end of file
+    return df
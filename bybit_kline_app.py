@@ -1,5 +1,6 @@
 import time
 from datetime import datetime
+from typing import List, NamedTuple, Optional
 import pandas as pd
 import logging
 import matplotlib.pyplot as plt
@@ -12,21 +13,45 @@ from PyQt6.QtGui import QIntValidator
 from PyQt6.QtCore import Qt, pyqtSignal
 
 from qfluentwidgets import (
-    LineEdit, PrimaryPushButton, CheckBox, ComboBox,
+    LineEdit, PrimaryPushButton, PushButton, CheckBox, ComboBox,
     BodyLabel, MessageBox, ProgressBar
 )
 from qfluentwidgets.components.widgets.card_widget import CardWidget
 
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.figure import Figure
-import mplfinance as mpf
 
 from bybit_api import parse_kline_data_to_df
-from data_processing import resample_dataframe
-from threads import DownloadThread, IndicatorsCalculationThread, ChartRenderThread
+from data_processing import OHLCPyramid
+from threads import (
+    DownloadThread, StreamingDownloadThread, LiveKlineThread, IndicatorsCalculationThread
+)
+from candle_store import CandleStore
+from indicator_cache import DataFingerprint, IndicatorCache
+from live_chart import CandleChartCanvas
+from viewport_chart import ViewportChartCanvas
+from indicators import (
+    DEFAULT_BB_STD_DEV, DEFAULT_BB_WINDOWS, DEFAULT_MA_WINDOWS, DEFAULT_RSI_WINDOWS,
+    Indicator, indicators_for_groups, parse_windows
+)
+from live_stream import LiveKlineFrame
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - [Bybit API] %(message)s')
 
+MAX_DAYS = 365
+# У потоковому режимі дані не тримаються в пам'яті, тож ліміт лише захищає від помилок вводу
+MAX_STREAMING_DAYS = 36500
+# Кеш індикаторів між повторними запусками: ліміт пам'яті та політика витіснення ('lru' або 'fifo')
+INDICATOR_CACHE_MAX_BYTES = 512 * 1024 * 1024
+INDICATOR_CACHE_POLICY = 'lru'
+
+
+class LoadedRequest(NamedTuple):
+    """Параметри завантаження, з якими отримано поточні дані (для live-режиму та заголовків)."""
+    category: str
+    symbol: str
+    interval: str
+    indicators: List[Indicator]
+    max_display_candles: int
+
 
 class BybitKlineApp(QWidget):
     data_loaded_signal = pyqtSignal(pd.DataFrame)
@@ -34,14 +59,25 @@ class BybitKlineApp(QWidget):
     def __init__(self, parent=None):
         super().__init__(parent=parent)
         self.full_data_df = pd.DataFrame()
+        # Піраміда деталізації full_data_df: будується раз при завантаженні, графіки беруть з неї зрізи
+        self.data_pyramid: Optional[OHLCPyramid] = None
+        self.candle_store = CandleStore()
+        self.indicator_cache = IndicatorCache(max_bytes=INDICATOR_CACHE_MAX_BYTES, policy=INDICATOR_CACHE_POLICY)
+        # Параметри останнього успішного завантаження для live-режиму
+        self.loaded_request: Optional[LoadedRequest] = None
+        self.live_frame = None
+        self.live_chart = None
+        # Інтерактивний графік завантажених даних; перевикористовується між завантаженнями
+        self.viewport_chart = None
         self.price_chart_layout = QVBoxLayout()
         self.rsi_chart_layout = QVBoxLayout()
         self.setObjectName("Bybit-Kline-App-Interface")
         self.initUI()
 
         self.download_thread = None
+        self.streaming_thread = None
         self.calc_indicators_thread = None 
-        self.render_charts_thread = None
+        self.live_thread = None
         logging.info("BybitKlineApp: Ініціалізація інтерфейсу користувача.")
 
 
@@ -71,10 +107,11 @@ class BybitKlineApp(QWidget):
         self.interval_combo.setCurrentText('60')
         request_layout.addWidget(self.interval_combo, 1, 1)
 
-        request_layout.addWidget(BodyLabel("Кількість днів (макс. 365):", parent=self), 2, 0, alignment=Qt.AlignmentFlag.AlignRight)
+        self.days_label = BodyLabel(f"Кількість днів (макс. {MAX_DAYS}):", parent=self)
+        request_layout.addWidget(self.days_label, 2, 0, alignment=Qt.AlignmentFlag.AlignRight)
         self.days_input = LineEdit(parent=self)
         self.days_input.setText("7")
-        self.days_input.setValidator(QIntValidator(1, 365))
+        self.days_input.setValidator(QIntValidator(1, MAX_DAYS))
         request_layout.addWidget(self.days_input, 2, 1)
 
         request_layout.addWidget(BodyLabel("Макс. свічок на графіку:", parent=self), 3, 0, alignment=Qt.AlignmentFlag.AlignRight)
@@ -83,6 +120,14 @@ class BybitKlineApp(QWidget):
         self.max_candles_input.setValidator(QIntValidator(50, 1000)) 
         request_layout.addWidget(self.max_candles_input, 3, 1)
 
+        self.checkbox_stream = CheckBox("Потокове завантаження у Parquet (без ліміту днів)", parent=self)
+        self.checkbox_stream.toggled.connect(self.on_stream_mode_changed)
+        request_layout.addWidget(self.checkbox_stream, 4, 0, 1, 2)
+
+        # Компактний режим: float32 замість float64 для свічок та індикаторів
+        self.checkbox_compact = CheckBox("Компактне зберігання (float32, удвічі менше пам'яті)", parent=self)
+        request_layout.addWidget(self.checkbox_compact, 5, 0, 1, 2)
+
         request_card_container.addWidget(request_card)
         control_panel_layout.addLayout(request_card_container)
 
@@ -91,15 +136,35 @@ class BybitKlineApp(QWidget):
         indicators_card_container.setAlignment(Qt.AlignmentFlag.AlignTop)
 
         indicators_card = CardWidget(parent=self)
-        indicators_layout = QVBoxLayout()
+        indicators_layout = QGridLayout()
         indicators_card.setLayout(indicators_layout)
 
         self.checkbox_ma = CheckBox("Ковзна середня (SMA/EMA)", parent=self)
         self.checkbox_bb = CheckBox("Смуги Боллінджера", parent=self)
         self.checkbox_rsi = CheckBox("RSI", parent=self)
-        indicators_layout.addWidget(self.checkbox_ma)
-        indicators_layout.addWidget(self.checkbox_bb)
-        indicators_layout.addWidget(self.checkbox_rsi)
+
+        # Періоди через кому: кожен період дає окрему колонку індикатора
+        self.ma_windows_input = LineEdit(parent=self)
+        self.ma_windows_input.setText(", ".join(map(str, DEFAULT_MA_WINDOWS)))
+        self.ma_windows_input.setPlaceholderText("Періоди, напр. 20, 50")
+        self.bb_windows_input = LineEdit(parent=self)
+        self.bb_windows_input.setText(", ".join(map(str, DEFAULT_BB_WINDOWS)))
+        self.bb_windows_input.setPlaceholderText("Періоди, напр. 20")
+        self.bb_std_input = LineEdit(parent=self)
+        self.bb_std_input.setText(str(DEFAULT_BB_STD_DEV))
+        self.bb_std_input.setPlaceholderText("σ")
+        self.bb_std_input.setFixedWidth(70)
+        self.rsi_windows_input = LineEdit(parent=self)
+        self.rsi_windows_input.setText(", ".join(map(str, DEFAULT_RSI_WINDOWS)))
+        self.rsi_windows_input.setPlaceholderText("Періоди, напр. 14")
+
+        indicators_layout.addWidget(self.checkbox_ma, 0, 0)
+        indicators_layout.addWidget(self.ma_windows_input, 0, 1, 1, 2)
+        indicators_layout.addWidget(self.checkbox_bb, 1, 0)
+        indicators_layout.addWidget(self.bb_windows_input, 1, 1)
+        indicators_layout.addWidget(self.bb_std_input, 1, 2)
+        indicators_layout.addWidget(self.checkbox_rsi, 2, 0)
+        indicators_layout.addWidget(self.rsi_windows_input, 2, 1, 1, 2)
 
         indicators_card_container.addWidget(indicators_card)
         control_panel_layout.addLayout(indicators_card_container)
@@ -108,6 +173,11 @@ class BybitKlineApp(QWidget):
         control_panel_layout.addWidget(self.download_button)
         self.download_button.clicked.connect(self.start_processing_pipeline)
 
+        self.live_button = PushButton("Live-оновлення", parent=self)
+        self.live_button.setEnabled(False)
+        control_panel_layout.addWidget(self.live_button)
+        self.live_button.clicked.connect(self.toggle_live_mode)
+
         self.progress_bar = ProgressBar(self)
         self.progress_bar.setRange(0, 100)
         self.progress_bar.setValue(0)
@@ -134,18 +204,27 @@ class BybitKlineApp(QWidget):
 
         main_layout.addLayout(chart_panel_layout, 7)
 
-        self.update_charts_ui(None, None) 
+        self.update_charts_ui(None)
+
+    def on_stream_mode_changed(self, checked: bool):
+        max_days = MAX_STREAMING_DAYS if checked else MAX_DAYS
+        self.days_input.setValidator(QIntValidator(1, max_days))
+        self.days_label.setText(f"Кількість днів (макс. {max_days}):")
 
     def start_processing_pipeline(self):
         logging.info("start_processing_pipeline: Функція була викликана.")
+        self.stop_live_mode()
+        self.live_button.setEnabled(False)
         symbol = self.symbol_input.text().upper()
         interval = self.interval_combo.currentText()
+        streaming_mode = self.checkbox_stream.isChecked()
+        max_days = MAX_STREAMING_DAYS if streaming_mode else MAX_DAYS
         try:
             days_to_download = int(self.days_input.text())
-            if not (1 <= days_to_download <= 365):
+            if not (1 <= days_to_download <= max_days):
                 w = MessageBox(
                     "Помилка вводу",
-                    "Кількість днів має бути від 1 до 365.",
+                    f"Кількість днів має бути від 1 до {max_days}.",
                     self.window()
                 )
                 w.exec()
@@ -170,6 +249,10 @@ class BybitKlineApp(QWidget):
             w.exec()
             return
 
+        if streaming_mode:
+            self.start_streaming_download(symbol, interval, days_to_download)
+            return
+
         if interval in ['1', '3', '5']:
             if days_to_download > 90:
                 w = MessageBox(
@@ -184,9 +267,20 @@ class BybitKlineApp(QWidget):
         end_time_ms = int(time.time() * 1000)
         start_time_ms = end_time_ms - (days_to_download * 24 * 60 * 60 * 1000)
 
-        include_ma = self.checkbox_ma.isChecked()
-        include_bb = self.checkbox_bb.isChecked()
-        include_rsi = self.checkbox_rsi.isChecked()
+        try:
+            indicators = indicators_for_groups(
+                self.checkbox_ma.isChecked(),
+                self.checkbox_bb.isChecked(),
+                self.checkbox_rsi.isChecked(),
+                ma_windows=parse_windows(self.ma_windows_input.text()) if self.checkbox_ma.isChecked() else DEFAULT_MA_WINDOWS,
+                bb_windows=parse_windows(self.bb_windows_input.text()) if self.checkbox_bb.isChecked() else DEFAULT_BB_WINDOWS,
+                bb_std_dev=float(self.bb_std_input.text()) if self.checkbox_bb.isChecked() else DEFAULT_BB_STD_DEV,
+                rsi_windows=parse_windows(self.rsi_windows_input.text()) if self.checkbox_rsi.isChecked() else DEFAULT_RSI_WINDOWS,
+            )
+        except ValueError as e:
+            w = MessageBox("Помилка вводу", f"Некоректні параметри індикаторів: {e}", self.window())
+            w.exec()
+            return
 
         self.download_button.setEnabled(False)
         self.progress_bar.setValue(0)
@@ -195,16 +289,20 @@ class BybitKlineApp(QWidget):
         QApplication.instance().setOverrideCursor(Qt.CursorShape.WaitCursor)
         logging.info("start_processing_pipeline: Запускаю потік для завантаження даних.")
         
+        # Параметри фіксуються на старт завантаження: зміни полів після нього не впливають на дані
+        request = LoadedRequest("linear", symbol, interval, indicators, max_display_candles)
         self.download_thread = DownloadThread( 
-            category="linear", 
+            category=request.category, 
             symbol=symbol,
             interval=interval,
             start_time_ms=start_time_ms,
-            end_time_ms=end_time_ms
+            end_time_ms=end_time_ms,
+            store=self.candle_store,
+            compact=self.checkbox_compact.isChecked()
         )
 
         self.download_thread.finished.connect(
-            lambda df: self.on_data_downloaded(df, include_ma, include_bb, include_rsi, symbol, max_display_candles)
+            lambda df: self.on_data_downloaded(df, request)
         )
         self.download_thread.error.connect(self.on_processing_error)
         self.download_thread.progress.connect(self.progress_bar.setValue)
@@ -216,8 +314,55 @@ class BybitKlineApp(QWidget):
         self.download_thread.start()
         logging.info("start_processing_pipeline: download_thread.start() викликано.")
 
-    def on_data_downloaded(self, df: pd.DataFrame, include_ma: bool, include_bb: bool, include_rsi: bool, symbol: str, max_display_candles: int):
-        self.full_data_df = df.copy()
+    def start_streaming_download(self, symbol: str, interval: str, days_to_download: int):
+        file_path, _ = QFileDialog.getSaveFileName(
+            self, "Зберегти свічки як", f"{symbol}_{interval}.parquet", "Parquet Files (*.parquet)"
+        )
+        if not file_path:
+            return
+
+        end_time_ms = int(time.time() * 1000)
+        start_time_ms = end_time_ms - (days_to_download * 24 * 60 * 60 * 1000)
+
+        self.download_button.setEnabled(False)
+        self.progress_bar.setValue(0)
+        self.progress_bar.show()
+        self.status_label.setText("Потокове завантаження даних...")
+        QApplication.instance().setOverrideCursor(Qt.CursorShape.WaitCursor)
+        logging.info("start_streaming_download: Запускаю потік потокового завантаження.")
+
+        self.streaming_thread = StreamingDownloadThread(
+            category="linear",
+            symbol=symbol,
+            interval=interval,
+            start_time_ms=start_time_ms,
+            end_time_ms=end_time_ms,
+            output_path=file_path
+        )
+        self.streaming_thread.finished.connect(self.on_streaming_finished)
+        self.streaming_thread.error.connect(self.on_processing_error)
+        self.streaming_thread.progress.connect(self.progress_bar.setValue)
+        self.streaming_thread.message.connect(self.status_label.setText)
+
+        self.streaming_thread.finished.connect(self.streaming_thread.quit)
+        self.streaming_thread.finished.connect(self.streaming_thread.deleteLater)
+        self.streaming_thread.start()
+
+    def on_streaming_finished(self, file_path: str, rows_written: int):
+        self.download_button.setEnabled(True)
+        self.progress_bar.hide()
+        self.status_label.setText("Готовий")
+        QApplication.instance().restoreOverrideCursor()
+        w = MessageBox(
+            "Потокове завантаження завершено",
+            f"Записано {rows_written} свічок у {file_path}.",
+            self.window()
+        )
+        w.exec()
+
+    def on_data_downloaded(self, df: pd.DataFrame, request: LoadedRequest):
+        # Свічки не змінюються на місці: індикатори додаються новим фреймом зі спільними колонками
+        self.full_data_df = df
         if self.full_data_df.empty:
             self.on_processing_error("Дані не були завантажені або отримано порожній набір даних.")
             self.data_loaded_signal.emit(self.full_data_df)
@@ -228,13 +373,13 @@ class BybitKlineApp(QWidget):
 
         self.calc_indicators_thread = IndicatorsCalculationThread(
             df=self.full_data_df,
-            include_ma=include_ma,
-            include_bb=include_bb,
-            include_rsi=include_rsi
+            indicators=request.indicators,
+            cache=self.indicator_cache,
+            fingerprint=DataFingerprint.from_frame(self.full_data_df, request.symbol, request.interval)
         )
 
         self.calc_indicators_thread.finished.connect(
-            lambda df_with_indicators: self.on_indicators_calculated(df_with_indicators, include_ma, include_bb, include_rsi, symbol, max_display_candles)
+            lambda df_with_indicators, pyramid: self.on_indicators_calculated(df_with_indicators, pyramid, request)
         )
         self.calc_indicators_thread.error.connect(self.on_processing_error)
         self.calc_indicators_thread.message.connect(self.status_label.setText) 
@@ -244,47 +389,115 @@ class BybitKlineApp(QWidget):
         
         self.calc_indicators_thread.start()
 
-    def on_indicators_calculated(self, df_with_indicators: pd.DataFrame, include_ma: bool, include_bb: bool, include_rsi: bool, symbol: str, max_display_candles: int):
+    def on_indicators_calculated(self, df_with_indicators: pd.DataFrame, pyramid: OHLCPyramid, request: LoadedRequest):
         self.full_data_df = df_with_indicators
+        self.data_pyramid = pyramid
         self.data_loaded_signal.emit(self.full_data_df)
+        self.loaded_request = request
 
         self.status_label.setText("Побудова графіків...")
-        self.progress_bar.setValue(0) 
-
-        self.render_charts_thread = ChartRenderThread(
-            df_with_indicators=self.full_data_df,
-            include_ma=include_ma,
-            include_bb=include_bb,
-            include_rsi=include_rsi,
-            symbol_text=symbol,
-            max_display_candles=max_display_candles
-        )
-
-        self.render_charts_thread.finished.connect(self.on_charts_rendered)
-        self.render_charts_thread.error.connect(self.on_processing_error)
-        self.render_charts_thread.message.connect(self.status_label.setText) 
-
-        self.render_charts_thread.finished.connect(self.render_charts_thread.quit)
-        self.render_charts_thread.finished.connect(self.render_charts_thread.deleteLater)
-
-        self.render_charts_thread.start()
-
-    def on_charts_rendered(self, fig_mpf: Figure, fig_rsi: Figure):
-        self.update_charts_ui(fig_mpf, fig_rsi)
+        include_rsi = any(indicator.definition.panel == 'oscillator' for indicator in request.indicators)
+        self.update_charts_ui(pyramid, include_rsi, request.max_display_candles,
+                              f"{request.symbol} ({request.interval})")
+        self.on_charts_rendered()
 
+    def on_charts_rendered(self):
         self.download_button.setEnabled(True)
+        self.live_button.setEnabled(not self.full_data_df.empty)
         self.progress_bar.hide()
         self.status_label.setText("Готовий")
         QApplication.instance().restoreOverrideCursor()
-        actual_displayed_candles = len(resample_dataframe(self.full_data_df, int(self.max_candles_input.text())))
+        actual_displayed_candles = len(self.data_pyramid.view(self.loaded_request.max_display_candles)) if self.data_pyramid else 0
         w = MessageBox(
             "Обробка завершена",
             f"Успішно завантажено {len(self.full_data_df)} свічок. "
-            f"Відображено {actual_displayed_candles} свічок (після агрегації).",
+            f"Відображено {actual_displayed_candles} свічок (після агрегації). "
+            "Коліщатко миші змінює масштаб, перетягування — зсуває графік.",
             self.window()
         )
         w.exec()
 
+    def toggle_live_mode(self):
+        if self.live_thread is not None:
+            self.stop_live_mode()
+        else:
+            self.start_live_mode()
+
+    def start_live_mode(self):
+        if self.loaded_request is None or self.full_data_df.empty:
+            return
+        # Live-потік підписується на інтервал завантажених даних, а не на поточний вибір у полі
+        category, symbol, interval, indicators, max_display_candles = self.loaded_request
+        include_rsi = any(indicator.definition.panel == 'oscillator' for indicator in indicators)
+
+        self.live_frame = LiveKlineFrame(self.full_data_df, indicators)
+        self._clear_layout(self.price_chart_layout)
+        self._clear_layout(self.rsi_chart_layout)
+        self.viewport_chart = None
+        self.live_chart = CandleChartCanvas(max_display_candles, include_rsi, f"{symbol} ({interval}) — live", parent=self)
+        self.price_chart_layout.addWidget(self.live_chart)
+        rsi_text = "RSI відображається на live-графіку" if include_rsi else "RSI не обрано"
+        rsi_label = BodyLabel(rsi_text, parent=self)
+        rsi_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.rsi_chart_layout.addWidget(rsi_label)
+        self.live_chart.set_frame(self.live_frame)
+
+        self.download_button.setEnabled(False)
+        self.live_button.setText("Зупинити live-оновлення")
+        logging.info(f"start_live_mode: Запускаю live-потік для {symbol} ({interval}).")
+
+        self.live_thread = LiveKlineThread(category=category, symbol=symbol, interval=interval)
+        self.live_thread.updates.connect(self.on_live_updates)
+        self.live_thread.message.connect(self.status_label.setText)
+        self.live_thread.error.connect(self.on_live_error)
+        self.live_thread.start()
+
+    def on_live_updates(self, updates: list):
+        if self.live_frame is None or self.live_chart is None:
+            return
+        results = [self.live_frame.apply(update) for update in updates]
+        if any(results):
+            self.live_chart.set_frame(self.live_frame)
+        elif False in results:
+            self.live_chart.update_last(self.live_frame)
+        last = updates[-1]
+        self.status_label.setText(f"Live: {len(self.live_frame)} свічок, остання ціна {last.close:g}")
+
+    def stop_live_mode(self):
+        if self.live_thread is None:
+            return
+        self.live_thread.stop()
+        self.live_thread.wait()
+        self.live_thread.deleteLater()
+        self.live_thread = None
+        # Експорт бачитиме свічки, що надійшли під час live-режиму
+        self.full_data_df = self.live_frame.to_dataframe()
+        self.data_pyramid = OHLCPyramid(self.full_data_df)
+        self.data_loaded_signal.emit(self.full_data_df)
+        self.live_button.setText("Live-оновлення")
+        self.download_button.setEnabled(True)
+        self.status_label.setText("Готовий")
+        logging.info("stop_live_mode: Live-потік зупинено.")
+
+    def stop_background_threads(self):
+        """
+        Зупиняє фонові завантаження так, щоб завершені вікна встигли записатися на диск.
+        """
+        self.stop_live_mode()
+        for thread in (self.download_thread, self.streaming_thread):
+            try:
+                if thread is not None and thread.isRunning():
+                    thread.stop()
+                    thread.wait()
+            except RuntimeError:
+                # Qt-об'єкт потоку вже видалено після завершення
+                pass
+
+    def on_live_error(self, message: str):
+        self.stop_live_mode()
+        w = MessageBox("Помилка live-режиму", message, self.window())
+        w.exec()
+
     def on_processing_error(self, message: str):
         self.download_button.setEnabled(True)
         self.progress_bar.hide()
@@ -297,6 +510,7 @@ class BybitKlineApp(QWidget):
         )
         w.exec()
         self.full_data_df = pd.DataFrame()
+        self.data_pyramid = None
         self.data_loaded_signal.emit(self.full_data_df)
 
     def _clear_layout(self, layout):
@@ -310,25 +524,31 @@ class BybitKlineApp(QWidget):
                     self._clear_layout(item.layout())
             plt.close('all')
 
-    def update_charts_ui(self, fig_mpf, fig_rsi):
-        self._clear_layout(self.price_chart_layout)
-        self._clear_layout(self.rsi_chart_layout)
-
-        if fig_mpf:
-            canvas_price_new = FigureCanvas(fig_mpf)
-            self.price_chart_layout.addWidget(canvas_price_new)
-        else:
+    def update_charts_ui(self, pyramid: Optional[OHLCPyramid] = None, include_rsi: bool = False,
+                         max_display_candles: int = 200, title: str = ""):
+        """
+        Показує дані в інтерактивному графіку. Графік створюється лише коли його ще немає
+        або змінився набір панелей; інакше перевикористовується з усіма своїми artists.
+        """
+        if pyramid is None or not len(pyramid):
+            self._clear_layout(self.price_chart_layout)
+            self._clear_layout(self.rsi_chart_layout)
+            self.viewport_chart = None
             empty_label_price = BodyLabel("Немає даних для відображення", parent=self)
             empty_label_price.setAlignment(Qt.AlignmentFlag.AlignCenter)
             self.price_chart_layout.addWidget(empty_label_price)
-
-        if fig_rsi:
-            canvas_rsi_new = FigureCanvas(fig_rsi)
-            self.rsi_chart_layout.addWidget(canvas_rsi_new)
-        else:
-            if self.checkbox_rsi.isChecked() and not self.full_data_df.empty:
-                 empty_label_rsi = BodyLabel("Недостатньо даних для RSI або RSI не обраховано", parent=self)
-            else:
-                empty_label_rsi = BodyLabel("RSI не обрано", parent=self)
+            empty_label_rsi = BodyLabel("RSI не обрано", parent=self)
             empty_label_rsi.setAlignment(Qt.AlignmentFlag.AlignCenter)
-            self.rsi_chart_layout.addWidget(empty_label_rsi)
\ No newline at end of file
+            self.rsi_chart_layout.addWidget(empty_label_rsi)
+            return
+
+        if self.viewport_chart is None or (self.viewport_chart.ax_rsi is not None) != include_rsi:
+            self._clear_layout(self.price_chart_layout)
+            self._clear_layout(self.rsi_chart_layout)
+            self.viewport_chart = ViewportChartCanvas(max_display_candles, include_rsi, parent=self)
+            self.viewport_chart.setToolTip("Коліщатко — масштаб, перетягування — зсув, подвійний клік — уся історія")
+            self.price_chart_layout.addWidget(self.viewport_chart)
+            rsi_label = BodyLabel("RSI відображається під графіком ціни" if include_rsi else "RSI не обрано", parent=self)
+            rsi_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+            self.rsi_chart_layout.addWidget(rsi_label)
+        self.viewport_chart.set_pyramid(pyramid, max_display_candles, title)
\ No newline at end of file
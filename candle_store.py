@@ -0,0 +1,257 @@
+import os
+import sqlite3
+import logging
+import threading
+import calendar
+import time
+import numpy as np
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+
+from bybit_api import interval_to_ms
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - [Candle Store] %(message)s')
+
+DEFAULT_STORE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "candle_store.sqlite")
+
+# 1970-01-05 — понеділок, від нього відраховуються тижневі свічки Bybit
+_WEEK_ORIGIN_MS = 4 * 24 * 60 * 60 * 1000
+
+# Колонки значень свічки у порядку зберігання
+_VALUE_COLUMNS = 6
+
+
+def open_candle_start_ms(interval: str, now_ms: Optional[int] = None) -> int:
+    """
+    Повертає час відкриття поточної (ще не закритої) свічки інтервалу.
+    """
+    if now_ms is None:
+        now_ms = int(time.time() * 1000)
+
+    if interval == 'M':
+        now = datetime.fromtimestamp(now_ms / 1000, tz=timezone.utc)
+        return calendar.timegm((now.year, now.month, 1, 0, 0, 0)) * 1000
+    if interval == 'W':
+        week_ms = interval_to_ms('W')
+        return (now_ms - _WEEK_ORIGIN_MS) // week_ms * week_ms + _WEEK_ORIGIN_MS
+
+    interval_ms = interval_to_ms(interval)
+    return now_ms // interval_ms * interval_ms
+
+
+def month_start_ms(timestamps_ms: np.ndarray) -> np.ndarray:
+    """Початок календарного місяця (UTC, мс) для кожної мітки часу."""
+    months = np.asarray(timestamps_ms, dtype=np.int64).astype('datetime64[ms]').astype('datetime64[M]')
+    return months.astype('datetime64[ms]').astype(np.int64)
+
+
+def merge_ranges(ranges: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """
+    Об'єднує включні діапазони, що перетинаються або стикуються.
+    """
+    merged: List[Tuple[int, int]] = []
+    for range_start, range_end in sorted(ranges):
+        if merged and range_start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], range_end))
+        else:
+            merged.append((range_start, range_end))
+    return merged
+
+
+def subtract_ranges(start_ms: int, end_ms: int, covered: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """
+    Повертає частини [start_ms, end_ms], що не покриті жодним з діапазонів covered.
+    """
+    gaps = []
+    cursor = start_ms
+    for range_start, range_end in merge_ranges(covered):
+        if range_end < cursor:
+            continue
+        if range_start > end_ms:
+            break
+        if range_start > cursor:
+            gaps.append((cursor, range_start - 1))
+        cursor = max(cursor, range_end + 1)
+    if cursor <= end_ms:
+        gaps.append((cursor, end_ms))
+    return gaps
+
+
+class CandleStore:
+    """
+    Локальне сховище свічок у SQLite з обліком покритих часових діапазонів.
+    Ключ сховища — (category, symbol, interval).
+
+    Свічки зберігаються помісячними партиціями: один рядок таблиці на місяць
+    з упакованими масивами часу (int64) та значень (float64, колонка за колонкою),
+    тож завантаження — це кілька BLOB-ів і np.frombuffer без побудови кортежів
+    для кожної свічки. Запис переписує лише зачеплені місяці.
+    """
+
+    def __init__(self, path: str = DEFAULT_STORE_PATH):
+        self.path = path
+        self._write_lock = threading.Lock()
+        with self._connect() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS candle_months (
+                    category TEXT NOT NULL,
+                    symbol TEXT NOT NULL,
+                    interval TEXT NOT NULL,
+                    month_start INTEGER NOT NULL,
+                    timestamps BLOB NOT NULL,
+                    candle_values BLOB NOT NULL,
+                    PRIMARY KEY (category, symbol, interval, month_start)
+                ) WITHOUT ROWID
+            """)
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS coverage (
+                    category TEXT NOT NULL,
+                    symbol TEXT NOT NULL,
+                    interval TEXT NOT NULL,
+                    start_ms INTEGER NOT NULL,
+                    end_ms INTEGER NOT NULL
+                )
+            """)
+            connection.execute("CREATE INDEX IF NOT EXISTS coverage_key ON coverage (category, symbol, interval)")
+            self._migrate_row_table(connection)
+        logging.info(f"CandleStore: Відкрито сховище {self.path}")
+
+    def _migrate_row_table(self, connection: sqlite3.Connection):
+        """
+        Переносить свічки з таблиці попереднього формату (рядок на свічку) у помісячні партиції.
+        """
+        if not connection.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'candles'").fetchone():
+            return
+        keys = connection.execute("SELECT DISTINCT category, symbol, interval FROM candles").fetchall()
+        for category, symbol, interval in keys:
+            rows = connection.execute(
+                "SELECT timestamp, open, high, low, close, volume, turnover FROM candles "
+                "WHERE category = ? AND symbol = ? AND interval = ? ORDER BY timestamp",
+                (category, symbol, interval)
+            ).fetchall()
+            candles = np.array(rows, dtype=np.float64)
+            self._write_months(connection, category, symbol, interval,
+                               candles[:, 0].astype(np.int64), candles[:, 1:].T)
+        connection.execute("DROP TABLE candles")
+        logging.info(f"CandleStore: Перенесено {len(keys)} наборів свічок у помісячні партиції.")
+
+    @staticmethod
+    def _read_month(timestamps_blob: bytes, values_blob: bytes) -> Tuple[np.ndarray, np.ndarray]:
+        timestamps = np.frombuffer(timestamps_blob, dtype=np.int64)
+        return timestamps, np.frombuffer(values_blob, dtype=np.float64).reshape(_VALUE_COLUMNS, len(timestamps))
+
+    def _write_months(self, connection: sqlite3.Connection, category: str, symbol: str, interval: str,
+                      timestamps: np.ndarray, columns: np.ndarray):
+        """
+        Зливає свічки (timestamps, columns форми (6, n)) з наявними партиціями їхніх місяців;
+        нові значення замінюють збережені з тим самим часом.
+        """
+        if not len(timestamps):
+            return
+        months = month_start_ms(timestamps)
+        for month in np.unique(months):
+            in_month = months == month
+            month_timestamps, month_columns = timestamps[in_month], columns[:, in_month]
+            existing = connection.execute(
+                "SELECT timestamps, candle_values FROM candle_months "
+                "WHERE category = ? AND symbol = ? AND interval = ? AND month_start = ?",
+                (category, symbol, interval, int(month))
+            ).fetchone()
+            if existing is not None:
+                old_timestamps, old_columns = self._read_month(*existing)
+                month_timestamps = np.concatenate((month_timestamps, old_timestamps))
+                month_columns = np.concatenate((month_columns, old_columns), axis=1)
+            # np.unique бере перше входження — нові свічки стоять першими
+            month_timestamps, positions = np.unique(month_timestamps, return_index=True)
+            month_columns = np.ascontiguousarray(month_columns[:, positions], dtype=np.float64)
+            connection.execute(
+                "INSERT OR REPLACE INTO candle_months VALUES (?, ?, ?, ?, ?, ?)",
+                (category, symbol, interval, int(month), month_timestamps.tobytes(), month_columns.tobytes())
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        # Окреме з'єднання на виклик — сховище використовується з різних потоків
+        return sqlite3.connect(self.path, timeout=30)
+
+    def covered_ranges(self, category: str, symbol: str, interval: str) -> List[Tuple[int, int]]:
+        with self._connect() as connection:
+            rows = connection.execute(
+                "SELECT start_ms, end_ms FROM coverage WHERE category = ? AND symbol = ? AND interval = ?",
+                (category, symbol, interval)
+            ).fetchall()
+        return merge_ranges([(int(start), int(end)) for start, end in rows])
+
+    def missing_ranges(self, category: str, symbol: str, interval: str,
+                       start_ms: int, end_ms: int) -> List[Tuple[int, int]]:
+        """
+        Повертає діапазони в межах [start_ms, end_ms], яких ще немає у сховищі.
+        """
+        return subtract_ranges(start_ms, end_ms, self.covered_ranges(category, symbol, interval))
+
+    def save_candles(self, category: str, symbol: str, interval: str,
+                     timestamps: np.ndarray, values: np.ndarray, covered: List[Tuple[int, int]]):
+        """
+        Зберігає свічки та позначає діапазони covered як повністю завантажені.
+        Частина діапазону, що припадає на ще відкриту свічку, не позначається.
+        """
+        open_candle_start = open_candle_start_ms(interval)
+        covered = [(start, min(end, open_candle_start - 1)) for start, end in covered]
+        covered = [(start, end) for start, end in covered if start <= end]
+
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        columns = np.asarray(values, dtype=np.float64).reshape(len(timestamps), _VALUE_COLUMNS).T
+
+        with self._write_lock, self._connect() as connection:
+            # Читання-злиття-запис партицій атомарне й щодо інших процесів
+            connection.execute("BEGIN IMMEDIATE")
+            self._write_months(connection, category, symbol, interval, timestamps, columns)
+            if covered:
+                existing = connection.execute(
+                    "SELECT start_ms, end_ms FROM coverage WHERE category = ? AND symbol = ? AND interval = ?",
+                    (category, symbol, interval)
+                ).fetchall()
+                merged = merge_ranges([(int(start), int(end)) for start, end in existing] + covered)
+                connection.execute(
+                    "DELETE FROM coverage WHERE category = ? AND symbol = ? AND interval = ?",
+                    (category, symbol, interval)
+                )
+                connection.executemany(
+                    "INSERT INTO coverage VALUES (?, ?, ?, ?, ?)",
+                    [(category, symbol, interval, start, end) for start, end in merged]
+                )
+
+        logging.info(f"CandleStore: Збережено {len(timestamps)} свічок {symbol} ({interval}), покрито діапазонів: {len(covered)}.")
+
+    def load_candles(self, category: str, symbol: str, interval: str,
+                     start_ms: int, end_ms: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Повертає (timestamps, values) за діапазон у хронологічному порядку.
+        values має форму (n, 6) у колонковому розміщенні (транспонований (6, n)),
+        як очікує kline_arrays_to_df.
+        """
+        with self._connect() as connection:
+            rows = connection.execute(
+                "SELECT timestamps, candle_values FROM candle_months "
+                "WHERE category = ? AND symbol = ? AND interval = ? AND month_start BETWEEN ? AND ? "
+                "ORDER BY month_start",
+                (category, symbol, interval, int(month_start_ms(np.array([start_ms]))[0]), end_ms)
+            ).fetchall()
+        if not rows:
+            return np.empty(0, dtype=np.int64), np.empty((0, _VALUE_COLUMNS), dtype=np.float64)
+
+        months = [self._read_month(*row) for row in rows]
+        timestamps = np.concatenate([month_timestamps for month_timestamps, _ in months])
+        first = int(np.searchsorted(timestamps, start_ms, side='left'))
+        last = int(np.searchsorted(timestamps, end_ms, side='right'))
+        # Одна копія лише потрібних свічок (буфери BLOB-ів лише для читання)
+        columns = np.empty((_VALUE_COLUMNS, last - first), dtype=np.float64)
+        position = 0
+        offset = 0
+        for month_timestamps, month_columns in months:
+            lo = min(max(first - offset, 0), len(month_timestamps))
+            hi = min(max(last - offset, 0), len(month_timestamps))
+            columns[:, position:position + hi - lo] = month_columns[:, lo:hi]
+            position += hi - lo
+            offset += len(month_timestamps)
+        return timestamps[first:last], columns.T
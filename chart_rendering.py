@@ -0,0 +1,358 @@
+"""
+Побудова статичних графіків свічок у стилі Fluent Dark: шаблон фігури
+та пакетний headless-експорт PNG/SVG для багатьох символів у пулі процесів.
+
+Приклад: python chart_rendering.py --symbols BTCUSDT,ETHUSDT --intervals 60 --days 7 --ma --rsi --output-dir charts
+"""
+import os
+import time
+import argparse
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import matplotlib
+import mplfinance as mpf
+import numpy as np
+import pandas as pd
+from matplotlib.lines import Line2D
+
+from bybit_api import kline_arrays_to_df
+from batch_download import BatchJob, make_batch_jobs, run_batch_download
+from candle_store import CandleStore, DEFAULT_STORE_PATH
+from data_processing import resample_dataframe
+from indicators import (
+    DEFAULT_BB_STD_DEV, DEFAULT_BB_WINDOWS, DEFAULT_MA_WINDOWS, DEFAULT_RSI_WINDOWS,
+    Indicator, calculate_indicators, indicator_lines, indicators_for_groups, parse_windows
+)
+from parallel_indicators import DEFAULT_MP_CONTEXT
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - [Chart Rendering] %(message)s')
+
+FLUENT_DARK_STYLE = {
+    "base_mpl_style": "dark_background",
+    "marketcolors": {
+        "candle": {"up": "#3dc985", "down": "#ef4f60"},
+        "edge": {"up": "#3dc985", "down": "#ef4f60"},
+        "wick": {"up": "#3dc985", "down": "#ef4f60"},
+        "ohlc": {"up": "green", "down": "red"},
+        "volume": {"up": "#247252", "down": "#82333f"},
+        "vcedge": {"up": "green", "down": "red"},
+        "vcdopcod": False,
+        "alpha": 1,
+    },
+    "mavcolors": ["#ad7739", "#a63ab2", "#62b8ba"],
+    "facecolor": "#1b1f24",
+    "gridcolor": "#2c2e31",
+    "gridstyle": "--",
+    "y_on_right": True,
+    "rc": {
+        "axes.grid": True,
+        "axes.grid.axis": "y",
+        "axes.edgecolor": "#474d56",
+        "axes.labelcolor": "lightgray",
+        "xtick.color": "lightgray",
+        "ytick.color": "lightgray",
+        "axes.titlecolor": "lightgray",
+        "figure.facecolor": "#161a1e",
+        "figure.titlesize": "large",
+        "figure.titleweight": "normal",
+        "legend.labelcolor": "lightgray",
+        "axes.linewidth": 0.5,
+        "grid.linewidth": 0.5,
+    },
+    "style_name": "fluent_dark_style",
+}
+
+DATETIME_FORMAT = '%b %d, %H:%M'
+RSI_OVERBOUGHT = 70
+RSI_OVERSOLD = 30
+
+SUPPORTED_CHART_FORMATS = ("png", "svg")
+DEFAULT_CHART_DPI = 100
+# Розмір фігури експорту в дюймах (ширина, висота) без панелі осциляторів і з нею
+EXPORT_FIGSIZE = {False: (12, 7), True: (12, 9)}
+
+
+@lru_cache(maxsize=1)
+def chart_style() -> dict:
+    """Стиль mplfinance, що будується один раз на процес."""
+    return mpf.make_mpf_style(**FLUENT_DARK_STYLE)
+
+
+def price_addplots(df: pd.DataFrame, price_lines: List[Tuple[str, str, str, str]], ax=None) -> list:
+    """Лінії цінових індикаторів для mpf.plot: на панелі 0 або на зовнішній осі ax."""
+    placement = {'ax': ax} if ax is not None else {'panel': 0, 'secondary_y': False}
+    return [mpf.make_addplot(df[column], color=color, linestyle=linestyle, type='line', width=0.8, **placement)
+            for column, color, linestyle, _ in price_lines]
+
+
+def add_price_legend(ax, price_lines: List[Tuple[str, str, str, str]], loc: str = 'best'):
+    if not price_lines:
+        return
+    handles = [Line2D([0], [0], color=color, linestyle=linestyle, lw=1) for _, color, linestyle, _ in price_lines]
+    ax.legend(handles=handles, labels=[label for *_, label in price_lines],
+              loc=loc, frameon=False, fontsize='small', labelcolor='lightgray')
+
+
+def draw_oscillator_panel(ax, x, df: pd.DataFrame, oscillator_lines: List[Tuple[str, str, str, str]],
+                          title: Optional[str] = None, xlabel: Optional[str] = None):
+    """
+    Панель осциляторів у кольорах FLUENT_DARK_STYLE: лінії, рівні 70/30 та зони
+    перекупленості/перепроданості за першою лінією. x — значення осі X для рядків df.
+    """
+    rc = FLUENT_DARK_STYLE["rc"]
+    ax.set_facecolor(FLUENT_DARK_STYLE["facecolor"])
+    ax.tick_params(axis='x', colors=rc["xtick.color"])
+    ax.tick_params(axis='y', colors=rc["ytick.color"])
+    for spine in ax.spines.values():
+        spine.set_edgecolor(rc["axes.edgecolor"])
+        spine.set_linewidth(rc["axes.linewidth"])
+
+    if xlabel:
+        ax.set_xlabel(xlabel, color=rc["axes.labelcolor"])
+    ax.set_ylabel("RSI", color=rc["axes.labelcolor"])
+    if title:
+        ax.set_title(title, color=rc["axes.titlecolor"])
+    ax.grid(True, linestyle=FLUENT_DARK_STYLE["gridstyle"], color=FLUENT_DARK_STYLE["gridcolor"], linewidth=rc["grid.linewidth"])
+
+    for column, color, linestyle, label in oscillator_lines:
+        ax.plot(x, df[column], color=color, linestyle=linestyle, label=label)
+    ax.axhline(RSI_OVERBOUGHT, color='red', linestyle='--', linewidth=0.7)
+    ax.axhline(RSI_OVERSOLD, color='green', linestyle='--', linewidth=0.7)
+    # Зони перекупленості/перепроданості — за першою лінією, щоб не перекривати кольори
+    rsi = df[oscillator_lines[0][0]]
+    ax.fill_between(x, rsi, RSI_OVERBOUGHT, where=rsi >= RSI_OVERBOUGHT, color='red', alpha=0.3)
+    ax.fill_between(x, rsi, RSI_OVERSOLD, where=rsi <= RSI_OVERSOLD, color='green', alpha=0.3)
+
+    ax.legend(loc='best', frameon=False, fontsize='small', labelcolor=rc["legend.labelcolor"])
+
+
+class ChartFigureTemplate:
+    """
+    Фігура експорту, що створюється один раз і перевикористовується для всіх символів:
+    ціна, обсяг і (за потреби) осцилятори на спільній осі X у режимі зовнішніх осей
+    mplfinance. Для кожного символу осі лише очищаються й малюються заново, тож
+    фігура, gridspec і стиль не будуються повторно.
+    """
+
+    def __init__(self, include_oscillators: bool):
+        self.include_oscillators = include_oscillators
+        self.figure = mpf.figure(style=chart_style(), figsize=EXPORT_FIGSIZE[include_oscillators])
+        ratios = (6, 1.5, 2) if include_oscillators else (6, 1.5)
+        grid = self.figure.add_gridspec(len(ratios), 1, height_ratios=ratios, hspace=0.05,
+                                        left=0.08, right=0.93, top=0.95, bottom=0.1)
+        self.ax_price = self.figure.add_subplot(grid[0])
+        self.ax_volume = self.figure.add_subplot(grid[1], sharex=self.ax_price)
+        self.ax_oscillators = self.figure.add_subplot(grid[2], sharex=self.ax_price) if include_oscillators else None
+
+    @property
+    def axes(self) -> list:
+        return [ax for ax in (self.ax_price, self.ax_volume, self.ax_oscillators) if ax is not None]
+
+    def render(self, df_to_plot: pd.DataFrame, indicator_groups: Sequence[str], title: str):
+        for ax in self.axes:
+            ax.clear()
+        price_lines = indicator_lines(df_to_plot.columns, 'price', indicator_groups)
+        mpf.plot(
+            df_to_plot,
+            type='candle',
+            ax=self.ax_price,
+            volume=self.ax_volume,
+            addplot=price_addplots(df_to_plot, price_lines, self.ax_price),
+            ylabel='Ціна',
+            ylabel_lower='Обсяг',
+            show_nontrading=False,
+            datetime_format=DATETIME_FORMAT,
+            xrotation=30,
+        )
+        self.ax_price.set_title(title, color=FLUENT_DARK_STYLE["rc"]["axes.titlecolor"])
+        add_price_legend(self.ax_price, price_lines, loc='upper left')
+
+        oscillator_lines = indicator_lines(df_to_plot.columns, 'oscillator', indicator_groups)
+        if self.ax_oscillators is not None and oscillator_lines:
+            # mplfinance розміщує свічки за номером рядка, тож осцилятори — теж
+            draw_oscillator_panel(self.ax_oscillators, np.arange(len(df_to_plot)), df_to_plot, oscillator_lines)
+        bottom = self.axes[-1]
+        for ax in self.axes[:-1]:
+            ax.tick_params(axis='x', labelbottom=False)
+        bottom.tick_params(axis='x', labelbottom=True, labelrotation=30)
+
+
+# Кеш фігур експорту в межах процесу: окремий шаблон для графіків з осциляторами і без
+_templates: Dict[bool, ChartFigureTemplate] = {}
+
+
+def figure_template(include_oscillators: bool) -> ChartFigureTemplate:
+    if include_oscillators not in _templates:
+        _templates[include_oscillators] = ChartFigureTemplate(include_oscillators)
+    return _templates[include_oscillators]
+
+
+def chart_format(path: str) -> str:
+    fmt = os.path.splitext(path)[1].lstrip('.').lower()
+    if fmt not in SUPPORTED_CHART_FORMATS:
+        raise ValueError(f"Непідтримуваний формат графіка '{fmt}', очікується один з {', '.join(SUPPORTED_CHART_FORMATS)}")
+    return fmt
+
+
+def render_chart_file(df_with_indicators: pd.DataFrame, indicator_groups: Sequence[str], title: str, path: str,
+                      max_display_candles: int = 200, dpi: int = DEFAULT_CHART_DPI) -> int:
+    """
+    Зберігає графік у PNG або SVG (за розширенням path) і повертає кількість показаних свічок.
+    Викликається з процесу на бекенді Agg (див. render_chart_pack).
+    """
+    fmt = chart_format(path)
+    df_to_plot = resample_dataframe(df_with_indicators, max_display_candles)
+    include_oscillators = bool(indicator_lines(df_to_plot.columns, 'oscillator', indicator_groups))
+    template = figure_template(include_oscillators)
+    template.render(df_to_plot, indicator_groups, title)
+    template.figure.savefig(path, format=fmt, dpi=dpi, facecolor=template.figure.get_facecolor())
+    return len(df_to_plot)
+
+
+@dataclass
+class ChartJobResult:
+    """Результат побудови графіка одного завдання."""
+    job: BatchJob
+    candles: int = 0
+    output_path: Optional[str] = None
+    error: Optional[str] = None
+
+
+# Стан процесу-воркера: сховище відкривається один раз при старті процесу
+_worker_store: Optional[CandleStore] = None
+
+
+def _init_worker(store_path: str):
+    global _worker_store
+    # Лише растровий/векторний вивід без GUI; фігур на момент перемикання ще немає
+    matplotlib.use('Agg', force=True)
+    _worker_store = CandleStore(store_path)
+
+
+def chart_path(output_dir: str, job: BatchJob, fmt: str) -> str:
+    return os.path.join(output_dir, f"{job.symbol}_{job.interval}.{fmt}")
+
+
+def _render_job(task: Tuple[BatchJob, List[Indicator], str, int, int]) -> ChartJobResult:
+    job, indicators, path, max_display_candles, dpi = task
+    try:
+        timestamps, values = _worker_store.load_candles(job.category, job.symbol, job.interval,
+                                                        job.start_time_ms, job.end_time_ms)
+        if not len(timestamps):
+            return ChartJobResult(job, error="немає свічок у сховищі")
+        df = calculate_indicators(kline_arrays_to_df(timestamps, values), indicators)
+        groups = sorted({indicator.definition.group for indicator in indicators})
+        candles = render_chart_file(df, groups, f"{job.symbol} · {job.interval}", path, max_display_candles, dpi)
+        return ChartJobResult(job, candles=candles, output_path=path)
+    except Exception as e:
+        logging.error(f"_render_job: {job.name}: {e}", exc_info=True)
+        return ChartJobResult(job, error=str(e))
+
+
+def render_chart_pack(
+        jobs: Sequence[BatchJob],
+        output_dir: str,
+        indicators: Sequence[Indicator] = (),
+        fmt: str = "png",
+        max_display_candles: int = 200,
+        dpi: int = DEFAULT_CHART_DPI,
+        max_workers: Optional[int] = None,
+        store_path: str = DEFAULT_STORE_PATH,
+        job_finished_callback: Optional[Callable[[ChartJobResult], None]] = None,
+        mp_context: str = DEFAULT_MP_CONTEXT
+) -> List[ChartJobResult]:
+    """
+    Графіки для багатьох завдань зі сховища свічок у пулі процесів на бекенді Agg.
+
+    Процесам передаються лише описи завдань: кожен сам читає свічки зі сховища,
+    рахує індикатори, агрегує до max_display_candles і зберігає файл, тож
+    matplotlib не впирається в GIL, а DataFrame не серіалізуються. Стиль і
+    фігури (ChartFigureTemplate) створюються один раз у кожному процесі.
+    Результати повертаються в порядку jobs.
+    """
+    if fmt not in SUPPORTED_CHART_FORMATS:
+        raise ValueError(f"Непідтримуваний формат графіка '{fmt}', очікується один з {', '.join(SUPPORTED_CHART_FORMATS)}")
+    os.makedirs(output_dir, exist_ok=True)
+    workers = max(1, min(max_workers or os.cpu_count() or 1, len(jobs) or 1))
+    tasks = [(job, list(indicators), chart_path(output_dir, job, fmt), max_display_candles, dpi) for job in jobs]
+
+    started = time.perf_counter()
+    results: List[Optional[ChartJobResult]] = [None] * len(jobs)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(mp_context),
+                             initializer=_init_worker, initargs=(store_path,)) as executor:
+        futures = {executor.submit(_render_job, task): index for index, task in enumerate(tasks)}
+        for future in as_completed(futures):
+            result = future.result()
+            results[futures[future]] = result
+            if job_finished_callback:
+                job_finished_callback(result)
+
+    rendered = sum(1 for result in results if not result.error)
+    logging.info(f"render_chart_pack: {rendered}/{len(jobs)} графіків ({fmt}) за "
+                 f"{time.perf_counter() - started:.1f} с, {workers} процесів.")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Пакетний експорт графіків свічок у PNG/SVG зі сховища свічок")
+    parser.add_argument("--symbols", help="Символи через кому, наприклад BTCUSDT,ETHUSDT")
+    parser.add_argument("--symbols-file", help="Файл зі списком символів, по одному в рядку")
+    parser.add_argument("--intervals", default="60", help="Інтервали через кому, наприклад 15,60,D")
+    parser.add_argument("--days", type=int, default=7, help="Кількість днів історії")
+    parser.add_argument("--category", default="linear")
+    parser.add_argument("--output-dir", required=True, help="Каталог для файлів графіків")
+    parser.add_argument("--format", choices=SUPPORTED_CHART_FORMATS, default="png")
+    parser.add_argument("--max-candles", type=int, default=200, help="Максимум свічок на графіку")
+    parser.add_argument("--dpi", type=int, default=DEFAULT_CHART_DPI)
+    parser.add_argument("--workers", type=int, help="Кількість процесів (за замовчуванням — кількість ядер)")
+    parser.add_argument("--download", action="store_true",
+                        help="Спершу докачати відсутні свічки у сховище (як batch_download.py)")
+    parser.add_argument("--ma", action="store_true", help="Ковзні середні (SMA/EMA)")
+    parser.add_argument("--bb", action="store_true", help="Смуги Боллінджера")
+    parser.add_argument("--rsi", action="store_true", help="RSI")
+    parser.add_argument("--ma-windows", type=parse_windows, default=DEFAULT_MA_WINDOWS)
+    parser.add_argument("--bb-windows", type=parse_windows, default=DEFAULT_BB_WINDOWS)
+    parser.add_argument("--bb-std", type=float, default=DEFAULT_BB_STD_DEV)
+    parser.add_argument("--rsi-windows", type=parse_windows, default=DEFAULT_RSI_WINDOWS)
+    args = parser.parse_args()
+
+    symbols = []
+    if args.symbols:
+        symbols.extend(symbol.strip() for symbol in args.symbols.split(",") if symbol.strip())
+    if args.symbols_file:
+        with open(args.symbols_file, encoding="utf-8") as symbols_file:
+            symbols.extend(line.strip() for line in symbols_file if line.strip() and not line.startswith("#"))
+    if not symbols:
+        parser.error("Потрібно вказати --symbols або --symbols-file")
+    indicators = indicators_for_groups(args.ma, args.bb, args.rsi, ma_windows=args.ma_windows,
+                                       bb_windows=args.bb_windows, bb_std_dev=args.bb_std,
+                                       rsi_windows=args.rsi_windows)
+
+    end_time_ms = int(time.time() * 1000)
+    start_time_ms = end_time_ms - args.days * 24 * 60 * 60 * 1000
+    jobs = make_batch_jobs(symbols, [interval.strip() for interval in args.intervals.split(",")],
+                           start_time_ms, end_time_ms, args.category)
+    if args.download:
+        run_batch_download(jobs, store=CandleStore())
+
+    def report(result: ChartJobResult):
+        if result.error:
+            print(f"[ПОМИЛКА] {result.job.name}: {result.error}")
+        else:
+            print(f"[OK] {result.job.name}: {result.candles} свічок -> {result.output_path}")
+
+    results = render_chart_pack(jobs, args.output_dir, indicators, fmt=args.format,
+                                max_display_candles=args.max_candles, dpi=args.dpi,
+                                max_workers=args.workers, job_finished_callback=report)
+    failed = sum(1 for result in results if result.error)
+    print(f"Завершено: {len(results) - failed}/{len(results)} графіків успішно.")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,143 @@
+import os
+import logging
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - [Data Export] %(message)s')
+
+# Формат експорту -> підпис для інтерфейсу та розширення файлу
+EXPORT_FORMATS = {
+    'csv': ("CSV", ".csv"),
+    'parquet': ("Parquet", ".parquet"),
+    'feather': ("Feather (Arrow IPC)", ".feather"),
+}
+# Додаткові розширення, за якими впізнається формат
+_FORMAT_BY_EXTENSION = {'.csv': 'csv', '.parquet': 'parquet', '.pq': 'parquet',
+                        '.feather': 'feather', '.arrow': 'feather', '.ipc': 'feather'}
+
+# Стиснення колонкових форматів; перше — за замовчуванням
+COMPRESSIONS = {
+    'parquet': ('zstd', 'snappy', 'none'),
+    'feather': ('zstd', 'lz4', 'none'),
+}
+# Рядків в одному row group (Parquet) / record batch (Feather): читачі пропускають
+# зайві групи за статистикою мінімуму/максимуму часу і читають лише потрібні колонки
+DEFAULT_ROW_GROUP_SIZE = 50_000
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.feather
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("Для експорту у Parquet/Feather потрібен пакет pyarrow: pip install pyarrow")
+    return pyarrow, pyarrow.parquet, pyarrow.feather
+
+
+def export_format_for_path(file_path: str) -> str:
+    """Формат експорту за розширенням файлу (невідомі розширення — CSV)."""
+    return _FORMAT_BY_EXTENSION.get(os.path.splitext(file_path)[1].lower(), 'csv')
+
+
+def _to_arrow_table(pa, df: pd.DataFrame, columns: List[str], include_index: bool):
+    """
+    Таблиця Arrow з масивів колонок без проміжного DataFrame. Числові колонки передаються
+    без копіювання даних (float32 компактного режиму лишається float32), NaN стають null.
+    Індекс часу записується колонкою timestamp[ms] під його назвою.
+    """
+    arrays, names = [], []
+    if include_index:
+        index = df.index
+        if isinstance(index, pd.DatetimeIndex):
+            arrays.append(pa.array(index.as_unit('ms').asi8, type=pa.timestamp('ms')))
+        else:
+            arrays.append(pa.array(index.to_numpy()))
+        names.append(index.name)
+    for column in columns:
+        arrays.append(pa.array(df[column].to_numpy(), from_pandas=True))
+        names.append(column)
+    return pa.Table.from_arrays(arrays, names=names)
+
+
+def export_dataframe(df: pd.DataFrame, file_path: str, columns: Optional[List[str]] = None,
+                     file_format: Optional[str] = None, compression: Optional[str] = None,
+                     row_group_size: int = DEFAULT_ROW_GROUP_SIZE):
+    """
+    Зберігає вибрані колонки DataFrame у CSV, Parquet або Feather (Arrow IPC).
+    Формат визначається file_format або розширенням файлу.
+    Індекс (час свічки) записується, якщо він має назву.
+
+    Колонкові формати пишуться row group'ами (Parquet) чи record batch'ами (Feather)
+    по row_group_size рядків, тож read_columnar може читати лише потрібні колонки
+    та часові діапазони.
+    """
+    if columns is not None:
+        missing_columns = [col for col in columns if col not in df.columns]
+        if missing_columns:
+            raise ValueError(f"Колонки відсутні у даних: {', '.join(missing_columns)}")
+
+    file_format = file_format or export_format_for_path(file_path)
+    if file_format not in EXPORT_FORMATS:
+        raise ValueError(f"Непідтримуваний формат експорту '{file_format}', очікується один з {', '.join(EXPORT_FORMATS)}")
+
+    include_index = bool(df.index.name)
+    if file_format == 'csv':
+        df.to_csv(file_path, columns=columns, index=include_index)
+        logging.info(f"export_dataframe: Збережено {len(df)} рядків у {file_path}")
+        return
+
+    compression = compression or COMPRESSIONS[file_format][0]
+    if compression not in COMPRESSIONS[file_format]:
+        raise ValueError(f"Стиснення '{compression}' не підтримується для {file_format}, "
+                         f"очікується одне з {', '.join(COMPRESSIONS[file_format])}")
+    if row_group_size < 1:
+        raise ValueError(f"Розмір row group має бути додатним, отримано {row_group_size}")
+
+    pa, pq, feather = _require_pyarrow()
+    table = _to_arrow_table(pa, df, list(df.columns) if columns is None else columns, include_index)
+    if file_format == 'parquet':
+        pq.write_table(table, file_path, compression=compression, row_group_size=row_group_size)
+    else:
+        feather.write_feather(table, file_path, compression='uncompressed' if compression == 'none' else compression,
+                              chunksize=row_group_size)
+    logging.info(f"export_dataframe: Збережено {len(df)} рядків у {file_path} "
+                 f"({file_format}, {compression}, row group {row_group_size})")
+
+
+def read_columnar(file_path: str, columns: Optional[List[str]] = None, start_time_ms: Optional[int] = None,
+                  end_time_ms: Optional[int] = None, time_column: str = 'timestamp') -> pd.DataFrame:
+    """
+    Читає файл Parquet/Feather, записаний export_dataframe, лише з потрібними
+    колонками та свічками [start_time_ms, end_time_ms]; індекс — time_column.
+
+    Для Parquet row group'и поза діапазоном пропускаються за статистикою;
+    Feather відображається у пам'ять, і розпаковуються лише вибрані колонки.
+    """
+    pa, pq, feather = _require_pyarrow()
+    read_columns = None if columns is None else [time_column] + [col for col in columns if col != time_column]
+
+    if export_format_for_path(file_path) == 'parquet':
+        filters = []
+        if start_time_ms is not None:
+            filters.append((time_column, '>=', pd.Timestamp(start_time_ms, unit='ms')))
+        if end_time_ms is not None:
+            filters.append((time_column, '<=', pd.Timestamp(end_time_ms, unit='ms')))
+        table = pq.read_table(file_path, columns=read_columns, filters=filters or None)
+    else:
+        table = feather.read_table(file_path, columns=read_columns, memory_map=True)
+        if start_time_ms is not None or end_time_ms is not None:
+            # Свічки впорядковані за часом — межі діапазону знаходяться бінарним пошуком
+            timestamps = table.column(time_column).cast(pa.int64()).to_numpy()
+            first = 0 if start_time_ms is None else int(np.searchsorted(timestamps, start_time_ms, side='left'))
+            last = len(timestamps) if end_time_ms is None else int(np.searchsorted(timestamps, end_time_ms, side='right'))
+            table = table.slice(first, max(0, last - first))
+
+    df = table.to_pandas()
+    df = df.set_index(time_column)
+    # Читання з фільтрами може змінити порядок фрагментів
+    if not df.index.is_monotonic_increasing:
+        df = df.sort_index()
+    return df
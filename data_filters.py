@@ -1,6 +1,9 @@
 import pandas as pd
+import numpy as np
 import logging
 
+from indicators import INDICATOR_GROUPS, parse_indicator_columns
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - [Data Filters] %(message)s')
 
 def filter_incomplete_indicator_data(df: pd.DataFrame, included_indicators: dict) -> pd.DataFrame:
@@ -9,40 +12,33 @@ def filter_incomplete_indicator_data(df: pd.DataFrame, included_indicators: dict
         logging.warning("filter_incomplete_indicator_data: Вхідний DataFrame порожній.")
         return df
 
-    df_filtered = df.copy()
-    initial_rows = len(df_filtered)
-    columns_to_check = []
-
-    if included_indicators.get('MA', False):
-        if 'SMA_20' in df_filtered.columns:
-            columns_to_check.append('SMA_20')
-        if 'EMA_20' in df_filtered.columns:
-            columns_to_check.append('EMA_20')
-
-    if included_indicators.get('BB', False):
-        if 'BBM_20_2.0' in df_filtered.columns:
-            columns_to_check.append('BBM_20_2.0')
-        if 'BBU_20_2.0' in df_filtered.columns:
-            columns_to_check.append('BBU_20_2.0')
-        if 'BBL_20_2.0' in df_filtered.columns:
-            columns_to_check.append('BBL_20_2.0')
-
-    if included_indicators.get('RSI', False):
-        if 'RSI_14' in df_filtered.columns:
-            columns_to_check.append('RSI_14')
+    enabled_groups = [group for group in INDICATOR_GROUPS if included_indicators.get(group, False)]
+    columns_to_check = list(dict.fromkeys(
+        column
+        for indicator in parse_indicator_columns(df.columns, enabled_groups)
+        for column in indicator.columns
+        if column in df.columns
+    ))
             
     if not columns_to_check:
         logging.info("filter_incomplete_indicator_data: Жодні індикатори не були включені або відповідні колонки відсутні. Фільтрація не застосовується.")
-        return df_filtered
+        return df
 
-    columns_to_check = list(set(columns_to_check))
+    complete = np.ones(len(df), dtype=bool)
+    for column in columns_to_check:
+        complete &= pd.notna(df[column].to_numpy())
 
-    df_filtered.dropna(subset=columns_to_check, inplace=True)
+    first_complete = int(np.argmax(complete)) if complete.any() else len(df)
+    if complete[first_complete:].all():
+        # Неповні лише перші рядки (розігрів індикаторів) — зріз без копіювання даних
+        df_filtered = df.iloc[first_complete:]
+    else:
+        df_filtered = df[complete]
     
-    rows_removed = initial_rows - len(df_filtered)
+    rows_removed = len(df) - len(df_filtered)
     if rows_removed > 0:
         logging.info(f"filter_incomplete_indicator_data: Видалено {rows_removed} рядків з неповними даними індикаторів ({', '.join(columns_to_check)}).")
     else:
         logging.info("filter_incomplete_indicator_data: Рядків з неповними даними індикаторів не знайдено.")
 
-    return df_filtered
\ No newline at end of file
+    return df_filtered
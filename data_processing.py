@@ -1,9 +1,125 @@
 import pandas as pd
 import numpy as np
 import logging
+from typing import List, Optional, Union
+
+from interval_rollup import align_to_interval
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - [Data Processing] %(message)s')
 
+# Кожен рівень піраміди агрегує стільки свічок попереднього рівня
+DEFAULT_PYRAMID_FACTOR = 4
+# Рівні будуються, доки не стануть коротшими за мінімальну кількість свічок на графіку
+DEFAULT_PYRAMID_MIN_CANDLES = 50
+
+# Правила агрегації колонок свічок; решта колонок (індикатори) беруть останнє не-NaN значення сегмента
+OHLC_AGGREGATIONS = {
+    'open': 'first',
+    'high': 'max',
+    'low': 'min',
+    'close': 'last',
+    'volume': 'sum',
+    'turnover': 'sum',
+}
+
+
+def count_bucket_starts(rows: int, bucket_size: int) -> np.ndarray:
+    """
+    Перші рядки сегментів по bucket_size рядків (останній сегмент може бути коротшим).
+    """
+    if bucket_size < 1:
+        raise ValueError(f"Розмір сегмента має бути додатним, отримано {bucket_size}")
+    return np.arange(0, rows, bucket_size, dtype=np.intp)
+
+
+def time_bucket_starts(timestamps_ms: np.ndarray, bucket: Union[str, int]) -> tuple:
+    """
+    Перші рядки та часи відкриття календарних сегментів для впорядкованих міток часу (мс).
+    bucket — інтервал Bybit ('15', '60', 'D', 'W', 'M'; межі як на біржі, від 00:00 UTC,
+    тижні від понеділка) або довільна тривалість у мс, вирівняна від 00:00 UTC.
+    Порожні проміжки сегментів не утворюють.
+    """
+    timestamps_ms = np.asarray(timestamps_ms, dtype=np.int64)
+    if isinstance(bucket, str):
+        buckets = align_to_interval(timestamps_ms, bucket)
+    else:
+        if bucket < 1:
+            raise ValueError(f"Тривалість сегмента має бути додатною, отримано {bucket}")
+        buckets = timestamps_ms // bucket * bucket
+    if not len(buckets):
+        return np.empty(0, dtype=np.intp), buckets
+    first_rows = np.concatenate(([0], np.flatnonzero(buckets[1:] != buckets[:-1]) + 1))
+    return first_rows, buckets[first_rows]
+
+
+def _sum_segments(values: np.ndarray, first_rows: np.ndarray) -> np.ndarray:
+    """Суми сегментів із накопиченням у float64; NaN вважаються нулем, як у groupby().sum()."""
+    if np.isnan(values).any():
+        values = np.where(np.isnan(values), 0.0, values)
+    return np.add.reduceat(values, first_rows, dtype=np.float64).astype(values.dtype, copy=False)
+
+
+def _pick_valid(values: np.ndarray, first_rows: np.ndarray, last_rows: np.ndarray, last: bool) -> np.ndarray:
+    """
+    Перше (last=False) чи останнє не-NaN значення кожного сегмента, як у groupby().first()/last();
+    сегмент без значень дає NaN. Якщо на межах сегментів NaN немає, це проста вибірка за індексами.
+    """
+    picked = values[last_rows if last else first_rows]
+    if values.dtype.kind != 'f':
+        return picked
+    missing = np.flatnonzero(np.isnan(picked))
+    if not len(missing):
+        return picked
+    # Пошук лише в рядках сегментів з NaN на межі (для прогріву індикаторів — лише на початку)
+    segment_first, segment_last = first_rows[missing], last_rows[missing]
+    offset = int(segment_first[0])
+    span = values[offset:segment_last[-1] + 1]
+    positions = np.arange(offset, offset + len(span))
+    if last:
+        # Позиція останнього не-NaN значення до кожного рядка включно
+        nearest = np.maximum.accumulate(np.where(np.isnan(span), -1, positions))[segment_last - offset]
+        empty = nearest < segment_first
+    else:
+        nearest = np.minimum.accumulate(np.where(np.isnan(span), len(values), positions)[::-1])[::-1][segment_first - offset]
+        empty = nearest > segment_last
+    picked[missing] = values[np.where(empty, segment_first, nearest)]
+    picked[missing[empty]] = np.nan
+    return picked
+
+
+def decimate_ohlc(df: pd.DataFrame, first_rows: np.ndarray, index: Optional[pd.Index] = None) -> pd.DataFrame:
+    """
+    Агрегує впорядкований за часом DataFrame у сегменти, що починаються з рядків first_rows.
+
+    Кожна колонка обробляється однією сегментною редукцією над її масивом
+    (np.fmax/np.fmin.reduceat для high/low, np.add.reduceat для обсягів,
+    вибірка за індексами для open/close та індикаторів) без reset_index і groupby.
+    Як і groupby().first()/last(), open, close та індикатори беруть перше/останнє
+    не-NaN значення сегмента, тож лінії не втрачають точок на NaN у межах сегмента.
+    Мітка сегмента — час його першої свічки, якщо index не задано.
+    Тип колонок (зокрема float32 компактного режиму) зберігається.
+    """
+    first_rows = np.asarray(first_rows, dtype=np.intp)
+    last_rows = np.append(first_rows[1:], len(df)) - 1
+
+    columns = {}
+    for column in df.columns:
+        values = df[column].to_numpy()
+        rule = OHLC_AGGREGATIONS.get(column, 'last')
+        if rule in ('first', 'last'):
+            columns[column] = _pick_valid(values, first_rows, last_rows, last=rule == 'last')
+        elif rule == 'max':
+            columns[column] = np.fmax.reduceat(values, first_rows)
+        elif rule == 'min':
+            columns[column] = np.fmin.reduceat(values, first_rows)
+        else:
+            columns[column] = _sum_segments(values, first_rows)
+
+    if index is None:
+        index = df.index[first_rows]
+    return pd.DataFrame(columns, index=index, copy=False)
+
+
 def resample_dataframe(df: pd.DataFrame, max_candles: int = 200) -> pd.DataFrame:
     if df.empty:
         logging.warning("[Data Processing] resample_dataframe: Вхідний DataFrame порожній.")
@@ -16,37 +132,93 @@ def resample_dataframe(df: pd.DataFrame, max_candles: int = 200) -> pd.DataFrame
         logging.info("[Data Processing] resample_dataframe: Кількість свічок в межах ліміту, ресемплінг не потрібен.")
         return df
 
-    resample_factor = np.ceil(current_candles / max_candles).astype(int)
+    resample_factor = int(np.ceil(current_candles / max_candles))
     logging.info(f"[Data Processing] resample_dataframe: Коефіцієнт ресемплінгу: {resample_factor} (свічок на агреговану свічку).")
 
-    df_temp = df.reset_index() 
-    df_temp['group_id'] = df_temp.index // resample_factor
-
-    agg_dict = {
-        'timestamp': 'first', 
-        'open': 'first',
-        'high': 'max',
-        'low': 'min',
-        'close': 'last',
-        'volume': 'sum'
-    }
-
-    fixed_cols = ['timestamp', 'open', 'high', 'low', 'close', 'volume', 'group_id']
-    if 'turnover' in df_temp.columns and 'turnover' not in agg_dict:
-        agg_dict['turnover'] = 'sum'
-
-    indicator_columns = [col for col in df_temp.columns if col not in fixed_cols and col not in agg_dict]
-    
-    for col in indicator_columns:
-        agg_dict[col] = 'last' 
-
-    resampled_df = df_temp.groupby('group_id').agg(
-        **{k: (k, v) for k, v in agg_dict.items()}
-    )
-    
-    resampled_df.set_index('timestamp', inplace=True)
-    resampled_df.sort_index(inplace=True) 
-    
+    resampled_df = decimate_ohlc(df, count_bucket_starts(current_candles, resample_factor))
+
     logging.info(f"[Data Processing] resample_dataframe: Завершено ресемплінг. Нова кількість свічок: {len(resampled_df)}. Колонок: {resampled_df.columns.tolist()}")
-    
-    return resampled_df
\ No newline at end of file
+
+    return resampled_df
+
+
+def resample_by_time(df: pd.DataFrame, bucket: Union[str, int]) -> pd.DataFrame:
+    """
+    Агрегує свічки у календарні сегменти (див. time_bucket_starts), позначені часом відкриття сегмента.
+    """
+    if df.empty:
+        logging.warning("[Data Processing] resample_by_time: Вхідний DataFrame порожній.")
+        return df
+
+    first_rows, bucket_times = time_bucket_starts(df.index.as_unit('ms').asi8, bucket)
+    index = pd.DatetimeIndex(bucket_times.astype('datetime64[ms]'), name=df.index.name)
+    resampled_df = decimate_ohlc(df, first_rows, index)
+
+    logging.info(f"[Data Processing] resample_by_time: {len(df)} свічок агреговано у {len(resampled_df)} сегментів ({bucket}).")
+    return resampled_df
+
+
+class OHLCPyramid:
+    """
+    Піраміда рівнів деталізації свічок, що будується один раз при завантаженні.
+
+    Рівень 0 — сам DataFrame (без копії), кожен наступний агрегує factor свічок
+    попереднього, тож свічка рівня l — це factor**l вихідних свічок, вирівняних
+    від початку історії (агрегація агрегатів для OHLC та сум точна). Додаткова
+    пам'ять — близько 1/(factor - 1) від вихідних даних.
+
+    view() відповідає на будь-який max_candles чи видиму ділянку зрізом
+    найближчого рівня і доагрегацією менш ніж max_candles·factor² рядків,
+    тож вартість не залежить від довжини історії.
+    """
+
+    def __init__(self, df: pd.DataFrame, factor: int = DEFAULT_PYRAMID_FACTOR,
+                 min_candles: int = DEFAULT_PYRAMID_MIN_CANDLES):
+        if factor < 2:
+            raise ValueError(f"Коефіцієнт піраміди має бути не меншим за 2, отримано {factor}")
+        self.factor = factor
+        self.levels: List[pd.DataFrame] = [df]
+        while len(self.levels[-1]) > min_candles:
+            previous = self.levels[-1]
+            self.levels.append(decimate_ohlc(previous, count_bucket_starts(len(previous), factor)))
+        logging.info(f"[Data Processing] OHLCPyramid: {len(df)} свічок, рівні "
+                     f"{', '.join(str(len(level)) for level in self.levels)}.")
+
+    def __len__(self) -> int:
+        return len(self.levels[0])
+
+    @property
+    def data(self) -> pd.DataFrame:
+        return self.levels[0]
+
+    def bucket_size(self, level: int) -> int:
+        """Кількість вихідних свічок в одній свічці рівня."""
+        return self.factor ** level
+
+    def level_for(self, candles: int, max_candles: int) -> int:
+        """
+        Найгрубший рівень, на якому candles вихідних свічок дають не менше max_candles·factor свічок.
+        Запас у factor разів дозволяє доагрегувати до max_candles з цілим кроком так само
+        точно, як resample_dataframe (не менше ~80% від max_candles), а не вдвічі грубіше.
+        """
+        level = 0
+        while level + 1 < len(self.levels) and candles // self.bucket_size(level + 1) >= max_candles * self.factor:
+            level += 1
+        return level
+
+    def view(self, max_candles: int, start: int = 0, end: Optional[int] = None) -> pd.DataFrame:
+        """
+        Не більше max_candles агрегованих свічок для вихідних рядків [start, end).
+        Межі розширюються до свічок обраного рівня, що їх перекривають.
+        """
+        end = len(self) if end is None else min(end, len(self))
+        start = max(0, start)
+        if end <= start:
+            return self.data.iloc[0:0]
+
+        level = self.level_for(end - start, max_candles)
+        size = self.bucket_size(level)
+        rows = self.levels[level].iloc[start // size:-(-end // size)]
+        if len(rows) <= max_candles:
+            return rows
+        return decimate_ohlc(rows, count_bucket_starts(len(rows), int(np.ceil(len(rows) / max_candles))))
@@ -0,0 +1,141 @@
+import os
+import time
+import logging
+import threading
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from candle_store import merge_ranges
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - [Download Checkpoint] %(message)s')
+
+DEFAULT_CHECKPOINT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "download_checkpoints")
+# Журнали, старші за цей вік, вважаються застарілими і не продовжуються
+DEFAULT_CHECKPOINT_MAX_AGE_MS = 24 * 60 * 60 * 1000
+
+# Заголовок файлу: сигнатура, версія, межі запиту, час створення (int64)
+_FILE_MAGIC = int.from_bytes(b"BKLCKPT2", "little")
+_FILE_VERSION = 2
+_FILE_HEADER_SIZE = 5
+_HEADER_SIZE = 3  # window_start, window_end, кількість свічок (int64)
+
+
+def default_checkpoint_path(category: str, symbol: str, interval: str,
+                            directory: str = DEFAULT_CHECKPOINT_DIR) -> str:
+    return os.path.join(directory, f"{category}_{symbol}_{interval}.ckpt")
+
+
+class DownloadCheckpoint:
+    """
+    Журнал завершених вікон завантаження на диску для продовження після збою.
+
+    Файл починається заголовком з межами запиту та часом створення, далі кожне
+    вікно дописується в кінець окремим записом: заголовок (межі вікна, кількість
+    свічок) і свічки (n, 7) у float64. Запис, обірваний аварійним завершенням,
+    ігнорується під час читання, тож файл завжди придатний для продовження
+    з останнього повного вікна. Журнал іншого формату, застарілий (max_age_ms)
+    чи для діапазону, що не перетинається із запитом, відкидається в prepare().
+    """
+
+    def __init__(self, path: str, max_age_ms: int = DEFAULT_CHECKPOINT_MAX_AGE_MS):
+        self.path = path
+        self.max_age_ms = max_age_ms
+        self._request: Optional[Tuple[int, int]] = None
+        self._lock = threading.Lock()
+
+    def _read_file_header(self, raw: np.ndarray) -> Optional[Tuple[int, int, int]]:
+        """(start_ms, end_ms, created_ms) запиту або None для файлу іншого формату."""
+        if len(raw) < _FILE_HEADER_SIZE or int(raw[0]) != _FILE_MAGIC or int(raw[1]) != _FILE_VERSION:
+            return None
+        return int(raw[2]), int(raw[3]), int(raw[4])
+
+    def _read_records(self) -> List[Tuple[int, int, np.ndarray]]:
+        if not os.path.exists(self.path):
+            return []
+        raw = np.fromfile(self.path, dtype=np.int64)
+        if self._read_file_header(raw) is None:
+            return []
+        records = []
+        position = _FILE_HEADER_SIZE
+        while position + _HEADER_SIZE <= len(raw):
+            window_start, window_end, count = (int(value) for value in raw[position:position + _HEADER_SIZE])
+            body_end = position + _HEADER_SIZE + count * 7
+            if count < 0 or body_end > len(raw):
+                logging.warning(f"DownloadCheckpoint: Обірваний запис у {self.path} проігноровано.")
+                break
+            page = raw[position + _HEADER_SIZE:body_end].view(np.float64).reshape(count, 7)
+            records.append((window_start, window_end, page))
+            position = body_end
+        return records
+
+    def prepare(self, start_ms: int, end_ms: int, now_ms: Optional[int] = None):
+        """
+        Готує журнал для запиту [start_ms, end_ms]: наявний журнал лишається для
+        продовження, лише якщо він поточного формату, не старший за max_age_ms
+        і його діапазон перетинається із запитом; інакше видаляється.
+        """
+        if now_ms is None:
+            now_ms = int(time.time() * 1000)
+        self._request = (start_ms, end_ms)
+        if not os.path.exists(self.path):
+            return
+        header = self._read_file_header(np.fromfile(self.path, dtype=np.int64, count=_FILE_HEADER_SIZE))
+        if header is None:
+            reason = "інший формат"
+        elif now_ms - header[2] > self.max_age_ms:
+            reason = "застарілий"
+        elif header[1] < start_ms or header[0] > end_ms:
+            reason = "інший діапазон"
+        else:
+            return
+        logging.info(f"DownloadCheckpoint: Журнал {self.path} не продовжується ({reason}).")
+        self.discard()
+
+    def completed_ranges(self) -> List[Tuple[int, int]]:
+        """
+        Діапазони вікон, що вже повернули дані.
+        """
+        return merge_ranges([(window_start, window_end) for window_start, window_end, _ in self._read_records()])
+
+    def load(self, start_ms: int, end_ms: int) -> np.ndarray:
+        """
+        Збережені свічки (n, 7) у межах [start_ms, end_ms] у порядку запису.
+        """
+        pages = [page for _, _, page in self._read_records()]
+        if not pages:
+            return np.empty((0, 7), dtype=np.float64)
+        candles = np.concatenate(pages)
+        return candles[(candles[:, 0] >= start_ms) & (candles[:, 0] <= end_ms)]
+
+    def record(self, window_start: int, window_end: int, page: np.ndarray, open_candle_start: Optional[int] = None):
+        """
+        Дописує завершене вікно; вікна без свічок не записуються.
+        Свічки від open_candle_start (ще не закрита свічка) не записуються, а межа
+        вікна обрізається до неї, тож наступний запуск перезавантажить цю свічку.
+        """
+        if open_candle_start is not None:
+            window_end = min(window_end, open_candle_start - 1)
+            page = page[page[:, 0] < open_candle_start]
+        if not len(page) or window_end < window_start:
+            return
+        header = np.array([window_start, window_end, len(page)], dtype=np.int64)
+        body = np.ascontiguousarray(page, dtype=np.float64)
+        with self._lock:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            new_file = not os.path.exists(self.path)
+            with open(self.path, "ab") as checkpoint_file:
+                if new_file:
+                    request_start, request_end = self._request or (window_start, window_end)
+                    file_header = np.array([_FILE_MAGIC, _FILE_VERSION, request_start, request_end,
+                                            int(time.time() * 1000)], dtype=np.int64)
+                    checkpoint_file.write(file_header.tobytes())
+                checkpoint_file.write(header.tobytes() + body.tobytes())
+                checkpoint_file.flush()
+                os.fsync(checkpoint_file.fileno())
+
+    def discard(self):
+        with self._lock:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+                logging.info(f"DownloadCheckpoint: Видалено {self.path}")
@@ -0,0 +1,407 @@
+"""
+Локальний замінник Bybit REST API (/v5/market/kline) для навантажувальних
+тестів і регресійних перевірок без звернень до api.bybit.com.
+
+Віддає детерміновані синтетичні або записані (CSV) свічки з тією ж
+семантикою сторінок, що й біржа: фільтр start/end, limit (до 1000),
+порядок від найновішої до найстарішої. Уміє додавати затримку, помилки
+та відповіді про перевищення ліміту.
+
+Запуск: python fake_bybit_server.py --port 8080 --latency-ms 40 --rate-limit 100
+Клієнт: BYBIT_BASE_URL=http://127.0.0.1:8080 python cli.py ...  (або bybit_api.set_base_url)
+
+FakeBybitStreamServer імітує публічний WebSocket /v5/public/{category}
+(тема kline.{interval}.{symbol}) для перевірки live-режиму:
+python fake_bybit_server.py --ws-port 8081, далі BYBIT_WS_URL=ws://127.0.0.1:8081
+"""
+import gzip
+import json
+import time
+import zlib
+import random
+import argparse
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Tuple
+from urllib.parse import urlparse, parse_qs
+
+import numpy as np
+import pandas as pd
+
+from bybit_api import interval_to_ms
+from interval_rollup import candle_starts
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - [Fake Bybit] %(message)s')
+
+DEFAULT_LISTING_TIME_MS = 1_577_836_800_000  # 2020-01-01 00:00 UTC
+
+
+def _hash_noise(starts: np.ndarray, salt: float) -> np.ndarray:
+    # Детермінований псевдошум у [0, 1), що залежить лише від часу свічки
+    x = np.sin(starts / 60_000.0 * 12.9898 + salt * 78.233) * 43758.5453
+    return x - np.floor(x)
+
+
+def synthetic_candles(symbol: str, starts: np.ndarray) -> np.ndarray:
+    """
+    Детерміновані синтетичні свічки (n, 7) для заданих часів відкриття.
+    """
+    seed = zlib.crc32(symbol.encode()) % 1000
+    base_price = 50.0 + seed * 37.0
+    hours = starts / 3_600_000.0
+    open_ = base_price * (1 + 0.05 * np.sin(hours / 97.0 + seed) + 0.01 * np.sin(hours / 7.0))
+    close = open_ * (1 + 0.004 * (_hash_noise(starts, seed + 1) - 0.5))
+    high = np.maximum(open_, close) * (1 + 0.002 * _hash_noise(starts, seed + 2))
+    low = np.minimum(open_, close) * (1 - 0.002 * _hash_noise(starts, seed + 3))
+    volume = 10 + 500 * _hash_noise(starts, seed + 4)
+    turnover = volume * close
+    return np.column_stack([starts.astype(np.float64), open_, high, low, close, volume, turnover])
+
+
+def load_fixture_csv(path: str) -> np.ndarray:
+    """
+    Завантажує записані свічки з CSV (формат експорту застосунку) у масив (n, 7).
+    """
+    df = pd.read_csv(path)
+    timestamps = df['timestamp']
+    if not pd.api.types.is_numeric_dtype(timestamps):
+        timestamps = pd.to_datetime(timestamps).astype('datetime64[ms]').astype(np.int64)
+    candles = np.column_stack([
+        np.asarray(timestamps, dtype=np.float64),
+        df[['open', 'high', 'low', 'close', 'volume', 'turnover']].to_numpy(dtype=np.float64)
+    ])
+    return candles[np.argsort(candles[:, 0], kind='stable')]
+
+
+class FakeBybitServer:
+    """
+    Локальний HTTP-сервер, що імітує /v5/market/kline.
+
+    latency_ms / latency_jitter_ms — затримка кожної відповіді;
+    error_rate — частка відповідей з HTTP 502 або retCode 10016;
+    rate_limit_per_second — ліміт запитів (понад нього retCode 10006 і заголовки X-Bapi-Limit-*);
+    fixture_path — CSV із записаними свічками замість синтетичних.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency_ms: float = 0.0,
+                 latency_jitter_ms: float = 0.0, error_rate: float = 0.0,
+                 rate_limit_per_second: Optional[float] = None, fixture_path: Optional[str] = None,
+                 listing_time_ms: int = DEFAULT_LISTING_TIME_MS, seed: int = 0):
+        self.latency_ms = latency_ms
+        self.latency_jitter_ms = latency_jitter_ms
+        self.error_rate = error_rate
+        self.rate_limit_per_second = rate_limit_per_second
+        self.listing_time_ms = listing_time_ms
+        self.fixture = load_fixture_csv(fixture_path) if fixture_path else None
+
+        self.requests_served = 0
+        self.candles_served = 0
+        self.rate_limited_responses = 0
+        self.error_responses = 0
+
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._tokens = rate_limit_per_second or 0.0
+        self._tokens_updated_at = time.monotonic()
+
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeBybitServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="fake-bybit", daemon=True)
+        self._thread.start()
+        logging.info(f"FakeBybitServer: Слухаю {self.base_url}")
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+        logging.info(f"FakeBybitServer: Зупинено. Запитів: {self.requests_served}, свічок: {self.candles_served}, "
+                     f"лімітовано: {self.rate_limited_responses}, помилок: {self.error_responses}")
+
+    def __enter__(self) -> "FakeBybitServer":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _take_token(self) -> Tuple[bool, int, int]:
+        """Повертає (дозволено, залишок, час скидання у мс)."""
+        now_ms = int(time.time() * 1000)
+        if not self.rate_limit_per_second:
+            return True, 1000, now_ms
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.rate_limit_per_second,
+                               self._tokens + (now - self._tokens_updated_at) * self.rate_limit_per_second)
+            self._tokens_updated_at = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True, int(self._tokens), now_ms + 1000
+            reset_ms = now_ms + int((1 - self._tokens) / self.rate_limit_per_second * 1000) + 1
+            return False, 0, reset_ms
+
+    def query_candles(self, symbol: str, interval: str, start: Optional[int], end: Optional[int],
+                      limit: int) -> np.ndarray:
+        """
+        Свічки за правилами Bybit: не більше limit найновіших у [start, end], від найновішої.
+        """
+        end = int(time.time() * 1000) if end is None else end
+        if self.fixture is not None:
+            timestamps = self.fixture[:, 0]
+            lo = start if start is not None else -np.inf
+            selected = self.fixture[(timestamps >= lo) & (timestamps <= end)][-limit:]
+            return selected[::-1]
+
+        if start is None:
+            span = (31 * 24 * 60 * 60 * 1000 if interval == 'M' else interval_to_ms(interval)) * limit
+            start = end - span
+        starts = candle_starts(interval, max(start, self.listing_time_ms), end)[-limit:]
+        return synthetic_candles(symbol, starts)[::-1]
+
+    def _make_handler(self):
+        server = self
+
+        class KlineHandler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, status: int, payload: dict, headers: dict = None):
+                body = json.dumps(payload, separators=(",", ":")).encode()
+                gzip_accepted = "gzip" in self.headers.get("Accept-Encoding", "")
+                if gzip_accepted:
+                    body = gzip.compress(body, compresslevel=1)
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                if gzip_accepted:
+                    self.send_header("Content-Encoding", "gzip")
+                for name, value in (headers or {}).items():
+                    self.send_header(name, str(value))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                if parsed.path != "/v5/market/kline":
+                    self._send_json(404, {"retCode": 10404, "retMsg": "Not found"})
+                    return
+
+                with server._lock:
+                    server.requests_served += 1
+                    inject_error = server._random.random() < server.error_rate
+                    latency = server.latency_ms + server._random.uniform(0, server.latency_jitter_ms)
+                if latency > 0:
+                    time.sleep(latency / 1000)
+
+                allowed, remaining, reset_ms = server._take_token()
+                limit_headers = {
+                    "X-Bapi-Limit": int(server.rate_limit_per_second or 1000),
+                    "X-Bapi-Limit-Status": remaining,
+                    "X-Bapi-Limit-Reset-Timestamp": reset_ms,
+                }
+                now_ms = int(time.time() * 1000)
+                if not allowed:
+                    with server._lock:
+                        server.rate_limited_responses += 1
+                    self._send_json(200, {"retCode": 10006, "retMsg": "Too many visits!", "result": {},
+                                          "retExtInfo": {}, "time": now_ms}, limit_headers)
+                    return
+                if inject_error:
+                    with server._lock:
+                        server.error_responses += 1
+                    if server._random.random() < 0.5:
+                        self._send_json(502, {"retCode": 10016, "retMsg": "Bad gateway"})
+                    else:
+                        self._send_json(200, {"retCode": 10016, "retMsg": "Server error", "result": {},
+                                              "retExtInfo": {}, "time": now_ms}, limit_headers)
+                    return
+
+                query = {key: values[-1] for key, values in parse_qs(parsed.query).items()}
+                try:
+                    symbol = query["symbol"]
+                    interval = query["interval"]
+                    interval_to_ms(interval)
+                    limit = min(1000, max(1, int(query.get("limit", 200))))
+                    start = int(query["start"]) if "start" in query else None
+                    end = int(query["end"]) if "end" in query else None
+                except (KeyError, ValueError) as e:
+                    self._send_json(200, {"retCode": 10001, "retMsg": f"params error: {e}", "result": {},
+                                          "retExtInfo": {}, "time": now_ms}, limit_headers)
+                    return
+
+                candles = server.query_candles(symbol, interval, start, end, limit)
+                with server._lock:
+                    server.candles_served += len(candles)
+                candle_list = [
+                    [str(int(row[0]))] + [repr(round(value, 8)) for value in row[1:]]
+                    for row in candles.tolist()
+                ]
+                self._send_json(200, {
+                    "retCode": 0,
+                    "retMsg": "OK",
+                    "result": {"symbol": symbol, "category": query.get("category", "linear"), "list": candle_list},
+                    "retExtInfo": {},
+                    "time": now_ms,
+                }, limit_headers)
+
+        return KlineHandler
+
+
+class FakeBybitStreamServer:
+    """
+    Локальний WebSocket-сервер, що імітує публічний потік свічок Bybit.
+
+    Після підписки на kline.{interval}.{symbol} надсилає для кожної свічки
+    updates_per_candle проміжних оновлень (confirm=false) та фінальне
+    (confirm=true) з інтервалом update_period секунд — час свічок іде
+    прискорено, тож нові свічки з'являються без очікування реального інтервалу.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, update_period: float = 0.05,
+                 updates_per_candle: int = 5, start_time_ms: Optional[int] = None):
+        try:
+            from websockets.sync.server import serve
+        except ImportError:
+            raise ImportError("Для FakeBybitStreamServer потрібен пакет websockets: pip install websockets")
+        self.update_period = update_period
+        self.updates_per_candle = max(1, updates_per_candle)
+        self.start_time_ms = start_time_ms
+        self.messages_sent = 0
+        self._lock = threading.Lock()
+        self._server = serve(self._handle_connection, host, port)
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.socket.getsockname()[:2]
+        return f"ws://{host}:{port}"
+
+    def start(self) -> "FakeBybitStreamServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-bybit-ws", daemon=True)
+        self._thread.start()
+        logging.info(f"FakeBybitStreamServer: Слухаю {self.base_url}")
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        if self._thread is not None:
+            self._thread.join()
+        logging.info(f"FakeBybitStreamServer: Зупинено. Повідомлень: {self.messages_sent}")
+
+    def __enter__(self) -> "FakeBybitStreamServer":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _candle_updates(self, symbol: str, interval: str):
+        """Нескінченна послідовність (свічка (7,), confirm) з проміжними станами."""
+        now_ms = int(time.time() * 1000)
+        start_ms = self.start_time_ms if self.start_time_ms is not None else now_ms
+        candle_start = int(candle_starts(interval, start_ms - interval_to_ms(interval), start_ms)[-1])
+        while True:
+            final = synthetic_candles(symbol, np.array([candle_start], dtype=np.int64))[0]
+            open_ = final[1]
+            for step in range(1, self.updates_per_candle + 1):
+                share = step / (self.updates_per_candle + 1)
+                partial = final.copy()
+                partial[4] = open_ + (final[4] - open_) * share
+                partial[2] = max(open_, partial[4], open_ + (final[2] - open_) * share)
+                partial[3] = min(open_, partial[4], open_ + (final[3] - open_) * share)
+                partial[5] = final[5] * share
+                partial[6] = partial[5] * partial[4]
+                yield partial, False
+            yield final, True
+            candle_start = int(candle_starts(interval, candle_start + 1, candle_start + 32 * 24 * 3_600_000)[0])
+
+    def _handle_connection(self, websocket):
+        updates = None
+        topic = None
+        try:
+            while True:
+                try:
+                    message = websocket.recv(timeout=self.update_period if updates is not None else None)
+                except TimeoutError:
+                    message = None
+
+                if message is not None:
+                    request = json.loads(message)
+                    op = request.get("op")
+                    if op == "ping":
+                        websocket.send(json.dumps({"success": True, "ret_msg": "pong", "op": "ping"}))
+                    elif op == "subscribe":
+                        topic = request["args"][0]
+                        _, interval, symbol = topic.split(".", 2)
+                        updates = self._candle_updates(symbol, interval)
+                        websocket.send(json.dumps({"success": True, "ret_msg": "", "op": "subscribe"}))
+                    continue
+
+                candle, confirm = next(updates)
+                timestamp_ms = int(time.time() * 1000)
+                interval = topic.split(".")[1]
+                websocket.send(json.dumps({
+                    "topic": topic,
+                    "type": "snapshot",
+                    "ts": timestamp_ms,
+                    "data": [{
+                        "start": int(candle[0]),
+                        "end": int(candle[0]) + interval_to_ms(interval) - 1,
+                        "interval": interval,
+                        "open": f"{candle[1]:.4f}",
+                        "close": f"{candle[4]:.4f}",
+                        "high": f"{candle[2]:.4f}",
+                        "low": f"{candle[3]:.4f}",
+                        "volume": f"{candle[5]:.4f}",
+                        "turnover": f"{candle[6]:.4f}",
+                        "confirm": confirm,
+                        "timestamp": timestamp_ms,
+                    }],
+                }))
+                with self._lock:
+                    self.messages_sent += 1
+        except Exception as e:
+            logging.info(f"FakeBybitStreamServer: З'єднання закрито ({type(e).__name__})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Локальний замінник Bybit /v5/market/kline")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--latency-jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=float, help="Максимум запитів за секунду")
+    parser.add_argument("--fixture", help="CSV із записаними свічками")
+    parser.add_argument("--ws-port", type=int, help="Порт WebSocket-потоку свічок (за замовчуванням вимкнено)")
+    parser.add_argument("--ws-update-period", type=float, default=0.5, help="Секунд між оновленнями потоку")
+    args = parser.parse_args()
+
+    server = FakeBybitServer(args.host, args.port, args.latency_ms, args.latency_jitter_ms,
+                             args.error_rate, args.rate_limit, args.fixture)
+    server.start()
+    stream_server = None
+    if args.ws_port is not None:
+        stream_server = FakeBybitStreamServer(args.host, args.ws_port, args.ws_update_period).start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+        if stream_server is not None:
+            stream_server.stop()
+
+
+if __name__ == '__main__':
+    main()
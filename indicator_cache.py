@@ -0,0 +1,146 @@
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from indicators import (
+    Indicator, compute_indicator_columns, indicator_dtype, join_indicator_columns, order_indicators
+)
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - [Indicator Cache] %(message)s')
+
+DEFAULT_CACHE_MAX_BYTES = 512 * 1024 * 1024
+EVICTION_POLICIES = ('lru', 'fifo')
+
+
+@dataclass(frozen=True)
+class DataFingerprint:
+    """
+    Дешевий відбиток набору свічок: межі, кількість рядків і останнє закриття
+    замість хешування всіх значень. Оновлення відкритої свічки змінює last_close.
+    dtype розділяє звичайні та компактні (float32) дані тих самих свічок.
+    """
+    category: str
+    symbol: str
+    interval: str
+    first_timestamp: int
+    last_timestamp: int
+    rows: int
+    last_close: float
+    dtype: str = 'float64'
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, symbol: str, interval: str, category: str = "linear") -> "DataFingerprint":
+        timestamps = df.index.as_unit('ms').asi8
+        return cls(category, symbol, interval, int(timestamps[0]), int(timestamps[-1]), len(df),
+                   float(df['close'].iat[-1]), df['close'].dtype.name)
+
+
+CacheKey = Tuple[DataFingerprint, Indicator]
+
+
+class IndicatorCache:
+    """
+    Обмежений кеш розрахованих колонок індикаторів.
+
+    Ключ — відбиток даних і параметри індикатора, тож увімкнення ще одного
+    індикатора для тих самих свічок рахує лише його. Розмір обмежено
+    max_bytes (і, за потреби, max_entries); при переповненні витісняється
+    найдавніше використаний запис ('lru') або найдавніше доданий ('fifo').
+    Масиви в кеші доступні лише для читання, тож DataFrame з них не копіює
+    значень, а випадковий запис у колонку не зіпсує кеш.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_CACHE_MAX_BYTES, max_entries: Optional[int] = None,
+                 policy: str = 'lru'):
+        if policy not in EVICTION_POLICIES:
+            raise ValueError(f"Невідома політика витіснення '{policy}', доступні: {', '.join(EVICTION_POLICIES)}")
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.policy = policy
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[CacheKey, Dict[str, np.ndarray]]" = OrderedDict()
+        self._sizes: Dict[CacheKey, int] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, fingerprint: DataFingerprint, indicator: Indicator) -> Optional[Dict[str, np.ndarray]]:
+        key = (fingerprint, indicator)
+        with self._lock:
+            columns = self._entries.get(key)
+            if columns is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            if self.policy == 'lru':
+                self._entries.move_to_end(key)
+            return columns
+
+    def put(self, fingerprint: DataFingerprint, indicator: Indicator, columns: Dict[str, np.ndarray]):
+        size = sum(values.nbytes for values in columns.values())
+        if size > self.max_bytes:
+            logging.info(f"IndicatorCache: {indicator.label} ({size / 2**20:.1f} МіБ) більший за ліміт кешу, не збережено.")
+            return
+        for values in columns.values():
+            values.flags.writeable = False
+
+        key = (fingerprint, indicator)
+        with self._lock:
+            if key in self._entries:
+                self.current_bytes -= self._sizes.pop(key)
+                del self._entries[key]
+            self._entries[key] = columns
+            self._sizes[key] = size
+            self.current_bytes += size
+            self._evict()
+
+    def _evict(self):
+        while self._entries and (self.current_bytes > self.max_bytes or
+                                 (self.max_entries is not None and len(self._entries) > self.max_entries)):
+            key, _ = self._entries.popitem(last=False)
+            self.current_bytes -= self._sizes.pop(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self.current_bytes = 0
+
+    def calculate(self, df: pd.DataFrame, indicators: Sequence[Indicator],
+                  fingerprint: DataFingerprint) -> pd.DataFrame:
+        """
+        Те саме, що calculate_indicators, але рахує лише індикатори, яких немає в кеші.
+        """
+        if df.empty:
+            return df
+
+        requested = order_indicators(indicators)
+        found: Dict[Indicator, Dict[str, np.ndarray]] = {}
+        missing: List[Indicator] = []
+        for indicator in requested:
+            columns = self.get(fingerprint, indicator)
+            if columns is None:
+                missing.append(indicator)
+            else:
+                found[indicator] = columns
+
+        if missing:
+            computed = compute_indicator_columns(df['close'].to_numpy(dtype=np.float64), missing,
+                                                 indicator_dtype(df['close'].dtype))
+            for indicator in missing:
+                found[indicator] = {column: computed[column] for column in indicator.columns}
+                self.put(fingerprint, indicator, found[indicator])
+        logging.info(f"IndicatorCache: {len(requested) - len(missing)} з {len(requested)} індикаторів узято з кешу "
+                     f"({self.current_bytes / 2**20:.1f} МіБ у {len(self._entries)} записах).")
+
+        return join_indicator_columns(df, {column: values
+                                           for indicator in requested
+                                           for column, values in found[indicator].items()})
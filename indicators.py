@@ -1,37 +1,649 @@
+import re
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
 import pandas as pd
 import numpy as np
 
-def calculate_technical_indicators(df: pd.DataFrame, include_ma: bool, include_bb: bool, include_rsi: bool) -> pd.DataFrame:
+
+@dataclass(frozen=True)
+class Indicator:
+    """Запит на індикатор з реєстру: тип і параметри."""
+    kind: str
+    window: int
+    std_dev: float = 2.0
+
+    @property
+    def definition(self) -> "IndicatorDefinition":
+        return INDICATOR_REGISTRY[self.kind]
+
+    @property
+    def columns(self) -> List[str]:
+        return [template.format(window=self.window, std_dev=self.std_dev)
+                for template in self.definition.column_templates]
+
+    @property
+    def label(self) -> str:
+        return self.definition.field_label.format(window=self.window, std_dev=self.std_dev)
+
+    @property
+    def key(self) -> str:
+        return self.columns[0].lower() if len(self.columns) == 1 else f"{self.kind.lower()}_{self.window}_{self.std_dev}"
+
+
+@dataclass(frozen=True)
+class IndicatorDefinition:
+    """Опис типу індикатора в реєстрі: параметри, колонки, відображення та розрахунок."""
+    kind: str
+    group: str  # перемикач GUI/CLI: 'MA', 'BB' або 'RSI'
+    field_label: str
+    column_templates: Tuple[str, ...]
+    line_labels: Tuple[str, ...]
+    line_styles: Tuple[str, ...]
+    colors: Tuple[str, ...]  # палітра для різних вікон одного типу
+    panel: str  # 'price' — поверх свічок, 'oscillator' — окрема панель
+    intermediates: Tuple[str, ...]  # проміжні ряди (INTERMEDIATE_DEPENDENCIES), які бере compute
+    compute: Callable[["IndicatorIntermediates", List[Indicator]], Dict[str, np.ndarray]]
+
+    def column_pattern(self, template: str) -> re.Pattern:
+        pattern = re.escape(template).replace(r'\{window\}', r'(?P<window>\d+)')
+        pattern = pattern.replace(r'\{std_dev\}', r'(?P<std_dev>\d+(?:\.\d+)?)')
+        return re.compile(f"^{pattern}$")
+
+
+class WindowSums:
+    """
+    Ковзні суми та суми квадратів для будь-якого вікна з одного набору префіксних сум.
+
+    Ряд ділиться на блоки; кожен блок разом з max_window - 1 попередніми
+    значеннями зсувається на власне середнє, і префіксні суми рахуються
+    всередині блоку. Так накопичені суми лишаються малими навіть для
+    мільйонів свічок, а сума будь-якого вікна до max_window — одна різниця.
+    """
+
+    def __init__(self, values: np.ndarray, max_window: int, with_squares: bool = True, block_size: int = 4096):
+        values = np.asarray(values, dtype=np.float64)
+        self.size = len(values)
+        self.max_window = max_window
+        self._lead = max_window - 1
+        self._block = max(block_size, max_window)
+        blocks = max(1, -(-self.size // self._block))
+
+        # Рядок блоку: [0, lead попередніх значень, block значень блоку]; заповнюється на місці
+        self._prefix = np.zeros((blocks, self._lead + self._block + 1))
+        body = self._prefix[:, self._lead + 1:]
+        full_blocks = self.size // self._block
+        body[:full_blocks] = values[:full_blocks * self._block].reshape(full_blocks, self._block)
+        if full_blocks < blocks:
+            tail = values[full_blocks * self._block:]
+            body[full_blocks, :len(tail)] = tail
+            body[full_blocks, len(tail):] = values[-1] if self.size else 0.0
+        self._prefix[0, 1:self._lead + 1] = values[0] if self.size else 0.0
+        self._prefix[1:, 1:self._lead + 1] = body[:-1, self._block - self._lead:]
+
+        self._shifts = body.mean(axis=1, keepdims=True)
+        rows = self._prefix[:, 1:]
+        rows -= self._shifts
+        self._prefix_sq = None
+        self._shift_values = None
+        if with_squares:
+            self._prefix_sq = np.zeros_like(self._prefix)
+            np.multiply(rows, rows, out=self._prefix_sq[:, 1:])
+            np.cumsum(self._prefix_sq[:, 1:], axis=1, out=self._prefix_sq[:, 1:])
+        np.cumsum(rows, axis=1, out=rows)
+
+    def _window_diff(self, prefix: np.ndarray, window: int) -> np.ndarray:
+        end = self._lead + 1
+        result = (prefix[:, end:] - prefix[:, end - window:end - window + self._block]).ravel()[:self.size]
+        result[:window - 1] = np.nan
+        return result
+
+    def shifts(self) -> np.ndarray:
+        """Зсув (середнє блоку) для кожної позиції ряду."""
+        if self._shift_values is None:
+            self._shift_values = np.repeat(self._shifts.ravel(), self._block)[:self.size]
+        return self._shift_values
+
+    def sum(self, window: int) -> np.ndarray:
+        """Ковзна сума зсунутих значень (без доданку shifts() * window)."""
+        return self._window_diff(self._prefix, window)
+
+    def sum_sq(self, window: int) -> np.ndarray:
+        """Ковзна сума квадратів зсунутих значень."""
+        return self._window_diff(self._prefix_sq, window)
+
+    def mean(self, window: int) -> np.ndarray:
+        result = self.sum(window)
+        result /= window
+        result += self.shifts()
+        return result
+
+    def std(self, window: int) -> np.ndarray:
+        """Вибіркове стандартне відхилення (ddof=1), як у pandas rolling().std()."""
+        return _std_from_sums(self.sum(window), self.sum_sq(window), window)
+
+
+def _std_from_sums(window_sum: np.ndarray, window_sum_sq: np.ndarray, window: int) -> np.ndarray:
+    """Стандартне відхилення (ddof=1) з ковзних сум; window_sum_sq перезаписується результатом."""
+    correction = window_sum * window_sum
+    correction /= window
+    variance = window_sum_sq
+    variance -= correction
+    variance /= window - 1
+    np.maximum(variance, 0.0, out=variance)
+    return np.sqrt(variance, out=variance)
+
+
+# Проміжний ряд → ряди, з яких він рахується. Ряди з вікном беруть залежності з тим самим вікном.
+INTERMEDIATE_DEPENDENCIES: Dict[str, Tuple[str, ...]] = {
+    'window_sums': (),
+    'shifts': ('window_sums',),
+    'rolling_sum': ('window_sums',),
+    'rolling_sumsq': ('window_sums',),
+    'rolling_mean': ('rolling_sum', 'shifts'),
+    'rolling_std': ('rolling_sum', 'rolling_sumsq'),
+    'ema': (),
+    'diff': (),
+    'gains': ('diff',),
+    'losses': ('diff',),
+    'average_gain': ('gains',),
+    'average_loss': ('losses',),
+}
+_WINDOWED_INTERMEDIATES = frozenset({
+    'rolling_sum', 'rolling_sumsq', 'rolling_mean', 'rolling_std', 'ema', 'average_gain', 'average_loss',
+})
+
+IntermediateKey = Tuple[str, Optional[int]]
+
+
+class IndicatorIntermediates:
+    """
+    Граф спільних проміжних рядів одного запиту на індикатори.
+
+    З intermediates усіх запитаних індикаторів і INTERMEDIATE_DEPENDENCIES
+    заздалегідь будується план: скільки споживачів має кожен ряд, найбільше
+    вікно та чи потрібні суми квадратів для спільних префіксних сум. Кожен
+    ряд рахується один раз при першому зверненні (SMA і середня лінія BB
+    одного вікна — той самий масив, усі вікна RSI — одні прирости/втрати) і
+    звільняється після останнього споживача. Проміжний ряд, що дістався
+    останньому споживачеві, перевикористовується на місці.
+    """
+
+    def __init__(self, close: np.ndarray, indicators: Sequence[Indicator]):
+        self.close = np.asarray(close, dtype=np.float64)
+        self._has_nan = bool(np.isnan(self.close).any())
+        self._values: Dict[IntermediateKey, object] = {}
+        self._consumers: Dict[IntermediateKey, int] = {}
+        for indicator in dict.fromkeys(indicators):
+            for name in indicator.definition.intermediates:
+                self._plan((name, indicator.window))
+
+        self._max_window = max((window for name, window in self._consumers if name == 'rolling_sum'), default=1)
+        self._with_squares = any(name == 'rolling_sumsq' for name, _ in self._consumers)
+
+    def _dependencies(self, key: IntermediateKey) -> List[IntermediateKey]:
+        name, window = key
+        # З пропусками у даних ковзні вікна рахує pandas (min_periods = вікно)
+        if self._has_nan and name in ('rolling_mean', 'rolling_std'):
+            return []
+        return [(dependency, window if dependency in _WINDOWED_INTERMEDIATES else None)
+                for dependency in INTERMEDIATE_DEPENDENCIES[name]]
+
+    def _plan(self, key: IntermediateKey):
+        if key not in self._consumers:
+            self._consumers[key] = 0
+            for dependency in self._dependencies(key):
+                self._plan(dependency)
+        self._consumers[key] += 1
+
+    def take(self, name: str, window: Optional[int] = None):
+        """
+        Значення проміжного ряду для одного споживача.
+        """
+        return self._take((name, window if name in _WINDOWED_INTERMEDIATES else None))[0]
+
+    def _take(self, key: IntermediateKey) -> Tuple[object, bool]:
+        if key not in self._consumers:
+            self._plan(key)
+        if key not in self._values:
+            self._values[key] = self._compute(key)
+        value = self._values[key]
+        self._consumers[key] -= 1
+        last_consumer = self._consumers[key] <= 0
+        if last_consumer:
+            del self._values[key]
+        return value, last_consumer
+
+    def _compute(self, key: IntermediateKey):
+        name, window = key
+        dependencies = [self._take(dependency) for dependency in self._dependencies(key)]
+
+        if name == 'window_sums':
+            return WindowSums(self.close, self._max_window, with_squares=self._with_squares)
+        if name == 'shifts':
+            return dependencies[0][0].shifts()
+        if name == 'rolling_sum':
+            return dependencies[0][0].sum(window)
+        if name == 'rolling_sumsq':
+            return dependencies[0][0].sum_sq(window)
+        if name == 'rolling_mean':
+            if self._has_nan:
+                return pd.Series(self.close).rolling(window=window).mean().to_numpy()
+            (total, owned), (shifts, _) = dependencies
+            mean = np.divide(total, window, out=total if owned else None)
+            mean += shifts
+            return mean
+        if name == 'rolling_std':
+            if self._has_nan:
+                return pd.Series(self.close).rolling(window=window).std().to_numpy()
+            (total, _), (total_sq, owned) = dependencies
+            return _std_from_sums(total, total_sq if owned else total_sq.copy(), window)
+        if name == 'ema':
+            return pd.Series(self.close).ewm(span=window, adjust=False).mean().to_numpy()
+        if name == 'diff':
+            delta = np.empty_like(self.close)
+            delta[:1] = np.nan
+            np.subtract(self.close[1:], self.close[:-1], out=delta[1:])
+            return delta
+        if name in ('gains', 'losses'):
+            # fmax замінює NaN-різниці (перша свічка, пропуски) нулем, як delta.where(delta > 0, 0)
+            delta, owned = dependencies[0]
+            out = delta if owned else None
+            if name == 'losses':
+                delta = np.negative(delta, out=out)
+                out = delta
+            return np.fmax(delta, 0.0, out=out)
+        if name == 'average_gain' or name == 'average_loss':
+            return pd.Series(dependencies[0][0]).ewm(span=window, adjust=False).mean().to_numpy()
+        raise KeyError(f"Невідомий проміжний ряд: {name}")
+
+
+def _compute_sma(intermediates: IndicatorIntermediates, indicators: List[Indicator]) -> Dict[str, np.ndarray]:
+    return {ind.columns[0]: intermediates.take('rolling_mean', ind.window) for ind in indicators}
+
+
+def _compute_ema(intermediates: IndicatorIntermediates, indicators: List[Indicator]) -> Dict[str, np.ndarray]:
+    return {ind.columns[0]: intermediates.take('ema', ind.window) for ind in indicators}
+
+
+def _compute_bb(intermediates: IndicatorIntermediates, indicators: List[Indicator]) -> Dict[str, np.ndarray]:
+    results = {}
+    for ind in indicators:
+        middle = intermediates.take('rolling_mean', ind.window)
+        band = intermediates.take('rolling_std', ind.window) * ind.std_dev
+        results.update(zip(ind.columns, (middle, middle + band, middle - band)))
+    return results
+
+
+def _rsi_from_averages(avg_gain: np.ndarray, avg_loss: np.ndarray) -> np.ndarray:
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rs = avg_gain / avg_loss
+        return 100 - (100 / (1 + rs))
+
+
+def _compute_rsi(intermediates: IndicatorIntermediates, indicators: List[Indicator]) -> Dict[str, np.ndarray]:
+    return {
+        ind.columns[0]: _rsi_from_averages(intermediates.take('average_gain', ind.window),
+                                           intermediates.take('average_loss', ind.window))
+        for ind in indicators
+    }
+
+
+INDICATOR_REGISTRY: Dict[str, IndicatorDefinition] = {
+    definition.kind: definition for definition in (
+        IndicatorDefinition(
+            kind='SMA', group='MA', field_label="SMA ({window} періодів)",
+            column_templates=('SMA_{window}',), line_labels=('SMA {window}',), line_styles=('-',),
+            colors=('blue', '#4fa3ff', '#1f5fbf', '#8fb8ff', '#6f6fff', '#00bcd4'),
+            panel='price', intermediates=('rolling_mean',), compute=_compute_sma,
+        ),
+        IndicatorDefinition(
+            kind='EMA', group='MA', field_label="EMA ({window} періодів)",
+            column_templates=('EMA_{window}',), line_labels=('EMA {window}',), line_styles=('-',),
+            colors=('lime', '#b6ff4f', '#2fbf5f', '#e6ee9c', '#00e676', '#9ccc65'),
+            panel='price', intermediates=('ema',), compute=_compute_ema,
+        ),
+        IndicatorDefinition(
+            kind='BB', group='BB', field_label="Смуги Боллінджера ({window}, {std_dev})",
+            column_templates=('BBM_{window}_{std_dev}', 'BBU_{window}_{std_dev}', 'BBL_{window}_{std_dev}'),
+            line_labels=('BB Middle {window}', 'BB Upper {window}', 'BB Lower {window}'),
+            line_styles=('-', '--', '--'),
+            colors=('red', '#ff9f40', '#ff4fd8', '#ffd54f'),
+            panel='price', intermediates=('rolling_mean', 'rolling_std'), compute=_compute_bb,
+        ),
+        IndicatorDefinition(
+            kind='RSI', group='RSI', field_label="RSI ({window} періодів)",
+            column_templates=('RSI_{window}',), line_labels=('RSI ({window})',), line_styles=('-',),
+            colors=('purple', '#c77dff', '#7b2cbf', '#e0aaff'),
+            panel='oscillator', intermediates=('average_gain', 'average_loss'), compute=_compute_rsi,
+        ),
+    )
+}
+
+INDICATOR_GROUPS = ('MA', 'BB', 'RSI')
+DEFAULT_MA_WINDOWS = (20,)
+DEFAULT_BB_WINDOWS = (20,)
+DEFAULT_BB_STD_DEV = 2.0
+DEFAULT_RSI_WINDOWS = (14,)
+
+
+def parse_windows(text: str) -> Tuple[int, ...]:
+    """
+    Розбирає перелік періодів на кшталт "5, 10, 20"; ValueError для некоректного вводу.
+    """
+    windows = tuple(dict.fromkeys(int(part) for part in re.split(r'[,\s;]+', text.strip()) if part))
+    if not windows or any(window < 2 for window in windows):
+        raise ValueError(f"Некоректні періоди індикатора: '{text}' (потрібні цілі числа ≥ 2)")
+    return windows
+
+
+def indicators_for_groups(include_ma: bool, include_bb: bool, include_rsi: bool,
+                          ma_windows: Sequence[int] = DEFAULT_MA_WINDOWS,
+                          bb_windows: Sequence[int] = DEFAULT_BB_WINDOWS,
+                          bb_std_dev: float = DEFAULT_BB_STD_DEV,
+                          rsi_windows: Sequence[int] = DEFAULT_RSI_WINDOWS) -> List[Indicator]:
+    """
+    Перелік індикаторів для перемикачів MA/BB/RSI з заданими періодами.
+    """
+    indicators = []
+    if include_ma:
+        indicators += [Indicator('SMA', window) for window in ma_windows]
+        indicators += [Indicator('EMA', window) for window in ma_windows]
+    if include_bb:
+        indicators += [Indicator('BB', window, float(bb_std_dev)) for window in bb_windows]
+    if include_rsi:
+        indicators += [Indicator('RSI', window) for window in rsi_windows]
+    return indicators
+
+
+def parse_indicator_columns(columns: Sequence[str], groups: Optional[Sequence[str]] = None) -> List[Indicator]:
+    """
+    Визначає за назвами колонок, які індикатори з реєстру присутні в даних
+    (у порядку реєстру). Індикатор повертається, якщо є хоча б одна його колонка.
+    """
+    found = {}
+    for definition in INDICATOR_REGISTRY.values():
+        if groups is not None and definition.group not in groups:
+            continue
+        patterns = [definition.column_pattern(template) for template in definition.column_templates]
+        for column in columns:
+            for pattern in patterns:
+                match = pattern.match(str(column))
+                if match is None:
+                    continue
+                params = match.groupdict()
+                indicator = Indicator(definition.kind, int(params['window']),
+                                      float(params['std_dev']) if 'std_dev' in params else 2.0)
+                found.setdefault(indicator, None)
+    return list(found)
+
+
+def indicator_lines(columns: Sequence[str], panel: str,
+                    groups: Optional[Sequence[str]] = None) -> List[Tuple[str, str, str, str]]:
+    """
+    Лінії для графіка: (колонка, колір, стиль лінії, підпис) для індикаторів панелі panel.
+    Різні вікна одного типу отримують різні кольори з палітри типу.
+    """
+    lines = []
+    position_by_kind: Dict[str, int] = {}
+    for indicator in parse_indicator_columns(columns, groups):
+        definition = indicator.definition
+        if definition.panel != panel:
+            continue
+        position = position_by_kind.get(indicator.kind, 0)
+        position_by_kind[indicator.kind] = position + 1
+        color = definition.colors[position % len(definition.colors)]
+        for column, linestyle, label in zip(indicator.columns, definition.line_styles, definition.line_labels):
+            if column in columns:
+                lines.append((column, color, linestyle,
+                              label.format(window=indicator.window, std_dev=indicator.std_dev)))
+    return lines
+
+
+def order_indicators(indicators: Sequence[Indicator]) -> List[Indicator]:
+    """Унікальні індикатори в порядку реєстру (так само впорядковуються колонки)."""
+    requested = list(dict.fromkeys(indicators))
+    return [indicator for kind in INDICATOR_REGISTRY for indicator in requested if indicator.kind == kind]
+
+
+def indicator_dtype(close_dtype) -> type:
+    """
+    Тип колонок індикаторів для фрейму: float32 для компактних (float32) свічок, інакше float64.
+    """
+    return np.float32 if np.dtype(close_dtype) == np.float32 else np.float64
+
+
+def compute_indicator_columns(close: np.ndarray, indicators: Sequence[Indicator],
+                              dtype: type = np.float64) -> Dict[str, np.ndarray]:
+    """
+    Колонки індикаторів для ряду цін закриття у порядку реєстру.
+    Проміжні ряди спільні для всього запиту (IndicatorIntermediates): усі вікна
+    SMA/BB рахуються з одного набору префіксних сум, SMA і BBM одного вікна —
+    один масив, RSI різних вікон використовують одні прирости/втрати.
+
+    dtype=float32 (компактний режим) змінює лише тип результату: суми й середні
+    рахуються у float64, а кожна колонка округлюється один раз наприкінці.
+    Нехай u = 2**-24, M — найбільше |close| в історії до свічки, k — кількість
+    відхилень BB, n — вікно. Оскільки самі закриття у float32 вже мають
+    похибку до u·|close|, відхилення від розрахунку на точних float64 даних:
+        SMA, EMA, BBM:  |Δ| ≤ 2·u·M
+        BBU, BBL:       |Δ| ≤ (1 + k·√(n/(n−1)))·u·M + u·|значення|
+        RSI:            |Δ| ≤ 200·u·M / (avg_gain + avg_loss) + 100·u пунктів
+    Тобто ціни та ковзні лінії точні до ~1e-7 відносно ціни, а RSI втрачає
+    точність лише коли середні прирости та втрати порівнянні з u·M (плоский ринок).
+    Оцінки перевіряє `python benchmarks.py compact`.
+    """
+    requested = order_indicators(indicators)
+    intermediates = IndicatorIntermediates(close, requested)
+    columns: Dict[str, np.ndarray] = {}
+    # SMA і BBM одного вікна — один масив, тож і перетворюється він один раз
+    # (вихідний масив тримається поруч, щоб його id не перевикористався)
+    converted: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+    for kind, definition in INDICATOR_REGISTRY.items():
+        of_kind = [indicator for indicator in requested if indicator.kind == kind]
+        if not of_kind:
+            continue
+        results = definition.compute(intermediates, of_kind)
+        for indicator in of_kind:
+            for column in indicator.columns:
+                values = results[column]
+                if values.dtype != dtype:
+                    if id(values) not in converted:
+                        converted[id(values)] = (values, values.astype(dtype))
+                    values = converted[id(values)][1]
+                columns[column] = values
+    return columns
+
+
+def join_indicator_columns(df: pd.DataFrame, columns: Dict[str, np.ndarray]) -> pd.DataFrame:
+    """
+    Новий DataFrame з колонками df і columns (однойменні колонки df замінюються).
+    Колонки приєднуються одним concat без копіювання масивів.
+    """
+    if not columns:
+        return df.copy(deep=False)
+    replaced = [column for column in columns if column in df.columns]
+    base = df.drop(columns=replaced) if replaced else df
+    return pd.concat([base, pd.DataFrame(columns, index=df.index, copy=False)], axis=1)
+
+
+def calculate_indicators(df: pd.DataFrame, indicators: Sequence[Indicator]) -> pd.DataFrame:
+    """
+    Повертає новий DataFrame з колонками df і колонками індикаторів.
+    Для компактних (float32) свічок індикатори теж зберігаються у float32.
+    """
     if df.empty:
         return df
+    return join_indicator_columns(df, compute_indicator_columns(df['close'].to_numpy(dtype=np.float64), indicators,
+                                                                indicator_dtype(df['close'].dtype)))
 
-    df_copy = df.copy()
 
-    if include_ma:
-        df_copy['SMA_20'] = df_copy['close'].rolling(window=20).mean()
-        df_copy['EMA_20'] = df_copy['close'].ewm(span=20, adjust=False).mean()
+def calculate_technical_indicators(df: pd.DataFrame, include_ma: bool, include_bb: bool, include_rsi: bool) -> pd.DataFrame:
+    return calculate_indicators(df, indicators_for_groups(include_ma, include_bb, include_rsi))
 
-    if include_bb:
-        window = 20
-        num_std_dev = 2.0
-        df_copy['BBM_20_2.0'] = df_copy['close'].rolling(window=window).mean()
-        rolling_std = df_copy['close'].rolling(window=window).std()
-        df_copy['BBU_20_2.0'] = df_copy['BBM_20_2.0'] + (rolling_std * num_std_dev)
-        df_copy['BBL_20_2.0'] = df_copy['BBM_20_2.0'] - (rolling_std * num_std_dev)
 
-    if include_rsi:
-        window = 14
-        delta = df_copy['close'].diff(1)
-        gain = delta.where(delta > 0, 0)
-        loss = -delta.where(delta < 0, 0)
+class IncrementalIndicators:
+    """
+    Стан індикаторів, що просувається на одну свічку за O(1).
 
-        avg_gain = gain.ewm(span=window, adjust=False).mean()
-        avg_loss = loss.ewm(span=window, adjust=False).mean()
+    Зберігає кільцевий буфер останніх цін закриття, ковзні суми та суми
+    квадратів для кожного вікна SMA/BB (зі зсувом на опорну ціну, щоб
+    уникнути втрати точності), стани EMA та середні приріст/втрату RSI.
+    Результати збігаються з calculate_indicators з точністю до похибки float64.
+    Останню свічку можна замінити (оновлення відкритої свічки) без перерахунку.
+    """
 
-        rs = avg_gain / avg_loss
-        df_copy['RSI_14'] = 100 - (100 / (1 + rs))
-        df_copy['RSI_14'].replace([np.inf, -np.inf], np.nan, inplace=True)
+    def __init__(self, indicators: Sequence[Indicator]):
+        self.indicators = list(dict.fromkeys(indicators))
+        self.columns = [column for kind in INDICATOR_REGISTRY
+                        for indicator in self.indicators if indicator.kind == kind
+                        for column in indicator.columns]
+
+        self._windows = sorted({ind.window for ind in self.indicators if ind.kind in ('SMA', 'BB')})
+        self._ema_spans = sorted({ind.window for ind in self.indicators if ind.kind == 'EMA'})
+        self._rsi_windows = sorted({ind.window for ind in self.indicators if ind.kind == 'RSI'})
+        self._ring = np.zeros(max(self._windows, default=1))
+        self._position = 0
+        self._count = 0
+        self._shift = 0.0
+        self._sums = {window: 0.0 for window in self._windows}
+        self._sumsqs = {window: 0.0 for window in self._windows}
+        self._emas = {span: np.nan for span in self._ema_spans}
+        self._avg_gains = {window: 0.0 for window in self._rsi_windows}
+        self._avg_losses = {window: 0.0 for window in self._rsi_windows}
+        self._prev_close = np.nan
+        self._undo = None
+
+    @classmethod
+    def from_closes(cls, closes: np.ndarray, indicators: Sequence[Indicator]) -> "IncrementalIndicators":
+        """
+        Відновлює стан за історією цін закриття одним векторним проходом.
+        Остання свічка додається звичайним кроком, тож її можна одразу замінювати.
+        """
+        engine = cls(indicators)
+        closes = np.asarray(closes, dtype=np.float64)
+        history = closes[:-1]
+        if len(history):
+            engine._count = len(history)
+            tail = history[-len(engine._ring):]
+            engine._ring[:len(tail)] = tail
+            engine._position = len(tail) % len(engine._ring)
+            engine._resum()
+            intermediates = IndicatorIntermediates(history, engine.indicators)
+            for span in engine._ema_spans:
+                engine._emas[span] = intermediates.take('ema', span)[-1]
+            for window in engine._rsi_windows:
+                engine._avg_gains[window] = intermediates.take('average_gain', window)[-1]
+                engine._avg_losses[window] = intermediates.take('average_loss', window)[-1]
+            engine._prev_close = history[-1]
+        if len(closes):
+            engine.append(closes[-1])
+        return engine
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _window_values(self, window: int) -> np.ndarray:
+        available = min(window, self._count)
+        positions = (self._position - 1 - np.arange(available)) % len(self._ring)
+        return self._ring[positions]
+
+    def _resum(self):
+        # Точний перерахунок сум з буфера; опорна ціна — останнє закриття
+        if not self._count:
+            return
+        self._shift = self._ring[(self._position - 1) % len(self._ring)]
+        for window in self._windows:
+            shifted = self._window_values(window) - self._shift
+            self._sums[window] = shifted.sum()
+            self._sumsqs[window] = (shifted * shifted).sum()
+
+    def append(self, close: float) -> Dict[str, float]:
+        """
+        Додає нову свічку і повертає значення індикаторів для неї.
+        """
+        close = float(close)
+        size = len(self._ring)
+        self._undo = (self._position, self._count, self._ring[self._position], self._shift,
+                      dict(self._sums), dict(self._sumsqs), dict(self._emas),
+                      dict(self._avg_gains), dict(self._avg_losses), self._prev_close)
+
+        shifted = close - self._shift
+        for window in self._windows:
+            self._sums[window] += shifted
+            self._sumsqs[window] += shifted * shifted
+            if self._count >= window:
+                leaving = self._ring[(self._position - window) % size] - self._shift
+                self._sums[window] -= leaving
+                self._sumsqs[window] -= leaving * leaving
+        self._ring[self._position] = close
+        self._position = (self._position + 1) % size
+        self._count += 1
+        # Раз на оберт буфера суми перераховуються, щоб похибка не накопичувалась
+        if self._position == 0:
+            self._resum()
+
+        for span in self._ema_spans:
+            alpha = 2 / (span + 1)
+            self._emas[span] = close if self._count == 1 else self._emas[span] * (1 - alpha) + close * alpha
+
+        delta = close - self._prev_close if self._count > 1 else 0.0
+        gain, loss = max(delta, 0.0), max(-delta, 0.0)
+        for window in self._rsi_windows:
+            alpha = 2 / (window + 1)
+            if self._count == 1:
+                self._avg_gains[window], self._avg_losses[window] = gain, loss
+            else:
+                self._avg_gains[window] = self._avg_gains[window] * (1 - alpha) + gain * alpha
+                self._avg_losses[window] = self._avg_losses[window] * (1 - alpha) + loss * alpha
+        self._prev_close = close
+        return self.current()
+
+    def replace_last(self, close: float) -> Dict[str, float]:
+        """
+        Замінює ціну закриття останньої свічки (оновлення відкритої свічки).
+        """
+        if self._undo is None:
+            return self.append(close)
+        (position, self._count, replaced_close, self._shift, self._sums, self._sumsqs,
+         self._emas, self._avg_gains, self._avg_losses, self._prev_close) = self._undo
+        self._position = position
+        self._ring[position] = replaced_close
+        return self.append(close)
 
-    return df_copy
+    def extend(self, closes: np.ndarray) -> pd.DataFrame:
+        """
+        Додає пакет свічок; повертає значення індикаторів для кожної з них.
+        """
+        rows = [self.append(close) for close in np.asarray(closes, dtype=np.float64)]
+        return pd.DataFrame(rows, columns=self.columns)
 
-#source bybit_app_venv/bin/activate
\ No newline at end of file
+    def current(self) -> Dict[str, float]:
+        """
+        Значення індикаторів для останньої доданої свічки.
+        """
+        values = {}
+        for indicator in self.indicators:
+            window = indicator.window
+            if indicator.kind == 'SMA':
+                values[indicator.columns[0]] = (self._sums[window] / window + self._shift
+                                                if self._count >= window else np.nan)
+            elif indicator.kind == 'EMA':
+                values[indicator.columns[0]] = self._emas[window]
+            elif indicator.kind == 'BB':
+                if self._count >= window:
+                    total, total_sq = self._sums[window], self._sumsqs[window]
+                    mean = total / window + self._shift
+                    std = np.sqrt(max(0.0, (total_sq - total * total / window) / (window - 1)))
+                else:
+                    mean = std = np.nan
+                values.update(zip(indicator.columns,
+                                  (mean, mean + std * indicator.std_dev, mean - std * indicator.std_dev)))
+            elif indicator.kind == 'RSI':
+                avg_gain, avg_loss = self._avg_gains[window], self._avg_losses[window]
+                if avg_loss > 0:
+                    rsi = 100 - 100 / (1 + avg_gain / avg_loss)
+                else:
+                    rsi = 100.0 if avg_gain > 0 else np.nan
+                values[indicator.columns[0]] = rsi
+        return values
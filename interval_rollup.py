@@ -0,0 +1,163 @@
+"""
+Локальне отримання старших інтервалів зі свічок молодших інтервалів.
+
+Свічка інтервалу T складається зі свічок інтервалу S, що в неї потрапляють:
+перше open, максимальний high, мінімальний low, останнє close, сума volume
+та turnover. Межі свічок вирівнюються так само, як на Bybit: хвилинні та
+денні — від 00:00 UTC, тижневі — від понеділка, місячні — за календарем.
+"""
+import logging
+from typing import List, Tuple
+
+import numpy as np
+
+from bybit_api import interval_to_ms
+from candle_store import CandleStore, open_candle_start_ms, merge_ranges, _WEEK_ORIGIN_MS
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - [Interval Rollup] %(message)s')
+
+_DAY_MS = 24 * 60 * 60 * 1000
+
+# Інтервали, з яких можна будувати старші, від найдрібнішого до найбільшого
+ROLLUP_SOURCE_INTERVALS = ['1', '3', '5', '15', '30', '60', '120', '240', '360', '720', 'D']
+
+
+def align_to_interval(timestamps: np.ndarray, interval: str) -> np.ndarray:
+    """
+    Час відкриття свічки інтервалу, в яку потрапляє кожна мітка часу (мс).
+    """
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    if interval == 'M':
+        return timestamps.astype('datetime64[ms]').astype('datetime64[M]').astype('datetime64[ms]').astype(np.int64)
+    step = interval_to_ms(interval)
+    origin = _WEEK_ORIGIN_MS if interval == 'W' else 0
+    return (timestamps - origin) // step * step + origin
+
+
+def candle_starts(interval: str, lo_ms: int, hi_ms: int) -> np.ndarray:
+    """
+    Часи відкриття свічок інтервалу, що потрапляють у [lo_ms, hi_ms].
+    """
+    if hi_ms < lo_ms:
+        return np.empty(0, dtype=np.int64)
+    if interval == 'M':
+        first_month = np.datetime64(int(lo_ms), 'ms').astype('datetime64[M]')
+        last_month = np.datetime64(int(hi_ms), 'ms').astype('datetime64[M]')
+        months = np.arange(first_month, last_month + 1).astype('datetime64[ms]').astype(np.int64)
+        return months[(months >= lo_ms) & (months <= hi_ms)]
+
+    step = interval_to_ms(interval)
+    origin = _WEEK_ORIGIN_MS if interval == 'W' else 0
+    first = -((origin - lo_ms) // step) * step + origin  # округлення вгору до межі свічки
+    last = (hi_ms - origin) // step * step + origin
+    if last < first:
+        return np.empty(0, dtype=np.int64)
+    return np.arange(first, last + 1, step, dtype=np.int64)
+
+
+def candle_ends(starts: np.ndarray, interval: str) -> np.ndarray:
+    """
+    Останні мілісекунди свічок з часами відкриття starts (включно).
+    """
+    if interval == 'M':
+        months = starts.astype('datetime64[ms]').astype('datetime64[M]')
+        return (months + 1).astype('datetime64[ms]').astype(np.int64) - 1
+    return starts + interval_to_ms(interval) - 1
+
+
+def can_roll_up(source_interval: str, target_interval: str) -> bool:
+    """
+    Чи складається кожна свічка target_interval з цілих свічок source_interval.
+    """
+    if source_interval not in ROLLUP_SOURCE_INTERVALS or source_interval == target_interval:
+        return False
+    source_ms = interval_to_ms(source_interval)
+    if target_interval in ('W', 'M'):
+        # Тижні й місяці починаються на межі доби, тож підходить будь-який інтервал, що ділить добу
+        return _DAY_MS % source_ms == 0
+    target_ms = interval_to_ms(target_interval)
+    return target_ms > source_ms and target_ms % source_ms == 0
+
+
+def rollup_sources(target_interval: str) -> List[str]:
+    """
+    Інтервали, з яких можна отримати target_interval, від найбільшого (найменше рядків) до найдрібнішого.
+    """
+    return [source for source in reversed(ROLLUP_SOURCE_INTERVALS) if can_roll_up(source, target_interval)]
+
+
+def rollup_candles(timestamps: np.ndarray, values: np.ndarray,
+                   target_interval: str) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Агрегує впорядковані за часом свічки (timestamps, values[n, 6]) у свічки target_interval.
+    """
+    if not len(timestamps):
+        return np.empty(0, dtype=np.int64), np.empty((0, 6), dtype=np.float64)
+
+    buckets = align_to_interval(timestamps, target_interval)
+    first_rows = np.concatenate(([0], np.flatnonzero(np.diff(buckets)) + 1))
+    last_rows = np.append(first_rows[1:], len(buckets)) - 1
+
+    rolled = np.empty((len(first_rows), 6), dtype=np.float64)
+    rolled[:, 0] = values[first_rows, 0]
+    rolled[:, 1] = np.maximum.reduceat(values[:, 1], first_rows)
+    rolled[:, 2] = np.minimum.reduceat(values[:, 2], first_rows)
+    rolled[:, 3] = values[last_rows, 3]
+    rolled[:, 4] = np.add.reduceat(values[:, 4], first_rows)
+    rolled[:, 5] = np.add.reduceat(values[:, 5], first_rows)
+    return buckets[first_rows], rolled
+
+
+def _covered_runs(starts: np.ndarray, ends: np.ndarray,
+                  covered: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """
+    Об'єднує у суцільні діапазони свічки [starts[i], ends[i]], що цілком лежать в одному з covered.
+    """
+    if not len(starts) or not covered:
+        return []
+    covered_starts = np.array([start for start, _ in covered], dtype=np.int64)
+    covered_ends = np.array([end for _, end in covered], dtype=np.int64)
+    # Діапазон, що починається не пізніше за свічку, — єдиний кандидат (covered об'єднані й впорядковані)
+    candidate = np.searchsorted(covered_starts, starts, side='right') - 1
+    inside = (candidate >= 0) & (ends <= covered_ends[np.maximum(candidate, 0)])
+    return merge_ranges([(int(start), int(end)) for start, end in zip(starts[inside], ends[inside])])
+
+
+def fill_from_finer_intervals(store: CandleStore, category: str, symbol: str, interval: str,
+                              start_time_ms: int, end_time_ms: int) -> int:
+    """
+    Заповнює відсутні у сховищі свічки interval агрегацією вже збережених
+    молодших інтервалів. Свічка будується лише тоді, коли весь її проміжок
+    покритий молодшим інтервалом, тож результат збігається з біржовим;
+    ще відкрита свічка завжди лишається для API. Повертає кількість отриманих свічок.
+    """
+    sources = rollup_sources(interval)
+    if not sources:
+        return 0
+
+    open_candle_start = open_candle_start_ms(interval)
+    derived_total = 0
+    for source in sources:
+        gaps = store.missing_ranges(category, symbol, interval, start_time_ms, end_time_ms)
+        if not gaps:
+            break
+        source_covered = store.covered_ranges(category, symbol, source)
+        if not source_covered:
+            continue
+
+        for gap_start, gap_end in gaps:
+            starts = candle_starts(interval, gap_start, min(gap_end, open_candle_start - 1))
+            ends = candle_ends(starts, interval)
+            for run_start, run_end in _covered_runs(starts, ends, source_covered):
+                timestamps, values = store.load_candles(category, symbol, source, run_start, run_end)
+                if run_start == starts[0]:
+                    # До першої межі свічки в проміжку жодна свічка не починається
+                    run_start = gap_start
+                rolled_timestamps, rolled_values = rollup_candles(timestamps, values, interval)
+                store.save_candles(category, symbol, interval, rolled_timestamps, rolled_values,
+                                   [(run_start, run_end)])
+                derived_total += len(rolled_timestamps)
+                logging.info(f"fill_from_finer_intervals: {symbol} {source} → {interval}: "
+                             f"{len(timestamps)} свічок агреговано у {len(rolled_timestamps)}.")
+
+    return derived_total
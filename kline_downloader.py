@@ -0,0 +1,350 @@
+import logging
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, List, Optional, Tuple
+
+from bybit_api import (
+    KlineRequestError, get_bybit_kline_data_raw, get_request_latency_histogram, interval_to_ms, kline_page_to_array
+)
+from candle_store import CandleStore, open_candle_start_ms, subtract_ranges
+from download_checkpoint import DownloadCheckpoint
+from interval_rollup import fill_from_finer_intervals
+from rate_limiter import RateLimiter
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - [Kline Downloader] %(message)s')
+
+DEFAULT_MAX_WORKERS = 4
+# Як часто (у завершених вікнах) проміжний результат записується у сховище
+STORE_FLUSH_EVERY_WINDOWS = 20
+
+# Значення window_counts для вікон, що не повернули сторінку
+WINDOW_PENDING = -1  # не завантажене (зупинка)
+WINDOW_FAILED = -2  # запит не вдався після всіх повторів
+
+
+class IncompleteDownloadError(RuntimeError):
+    """Частина вікон не завантажилась після всіх повторів, тож отримані дані мають пропуски."""
+
+    def __init__(self, failed_windows: int, total_windows: int, detail: str = ""):
+        self.failed_windows = failed_windows
+        self.total_windows = total_windows
+        super().__init__(f"Не вдалося завантажити {failed_windows} з {total_windows} вікон "
+                         f"(помилки мережі чи API){'. ' + detail if detail else ''}")
+
+
+class KlineAccumulator:
+    """
+    Накопичувач свічок у попередньо виділених числових масивах.
+    Сторінки лише дописуються в кінець (амортизовано O(1) на свічку),
+    сортування та усунення дублікатів виконуються один раз у finalize().
+    """
+
+    def __init__(self, initial_capacity: int = 1024):
+        capacity = max(1, initial_capacity)
+        self._timestamps = np.empty(capacity, dtype=np.int64)
+        # Колонкове розміщення: кожна колонка суцільна, DataFrame будується без копіювання
+        self._values = np.empty((6, capacity), dtype=np.float64)
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _ensure_capacity(self, required: int):
+        capacity = len(self._timestamps)
+        if required <= capacity:
+            return
+        while capacity < required:
+            capacity *= 2
+        timestamps = np.empty(capacity, dtype=np.int64)
+        values = np.empty((6, capacity), dtype=np.float64)
+        timestamps[:self._size] = self._timestamps[:self._size]
+        values[:, :self._size] = self._values[:, :self._size]
+        self._timestamps, self._values = timestamps, values
+
+    def append(self, page: np.ndarray):
+        """
+        Дописує сторінку форми (n, 7): час у мс та шість числових колонок.
+        """
+        count = len(page)
+        if count == 0:
+            return
+        self._ensure_capacity(self._size + count)
+        self._timestamps[self._size:self._size + count] = page[:, 0]
+        self._values[:, self._size:self._size + count] = page[:, 1:].T
+        self._size += count
+
+    def finalize(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Повертає (timestamps, values), впорядковані за часом без дублікатів.
+        """
+        timestamps = self._timestamps[:self._size]
+        columns = self._values[:, :self._size]
+        if self._size > 1 and not np.all(timestamps[1:] > timestamps[:-1]):
+            timestamps, unique_positions = np.unique(timestamps, return_index=True)
+            columns = np.take(columns, unique_positions, axis=1)
+        return timestamps, columns.T
+
+
+def plan_kline_windows(start_time_ms: int, end_time_ms: int, interval: str, limit: int = 1000) -> List[Tuple[int, int]]:
+    """
+    Розбиває діапазон [start_time_ms, end_time_ms] на вікна, кожне з яких
+    вміщує не більше limit свічок (межі вікон включні).
+    """
+    if end_time_ms < start_time_ms:
+        return []
+
+    window_span = interval_to_ms(interval) * limit
+    windows = []
+    window_start = start_time_ms
+    while window_start <= end_time_ms:
+        window_end = min(window_start + window_span - 1, end_time_ms)
+        windows.append((window_start, window_end))
+        window_start = window_end + 1
+    return windows
+
+
+def fetch_kline_window(category: str, symbol: str, interval: str,
+                       window_start: int, window_end: int, limit: int = 1000,
+                       rate_limiter: Optional[RateLimiter] = None) -> np.ndarray:
+    """
+    Завантажує одне вікно свічок і повертає числовий масив (n, 7),
+    обмежений межами вікна, у хронологічному порядку. Якщо запит не вдався після всіх повторів,
+    кидає KlineRequestError — порожній масив означає лише відсутність свічок.
+    """
+    kline_batch = get_bybit_kline_data_raw(
+        category=category,
+        symbol=symbol,
+        interval=interval,
+        start_timestamp=window_start,
+        end_timestamp=window_end,
+        limit=limit,
+        request_timeout=15,
+        rate_limiter=rate_limiter,
+        raise_on_failure=True
+    )
+    page = kline_page_to_array(kline_batch)
+    in_window = (page[:, 0] >= window_start) & (page[:, 0] <= window_end)
+    page = page[in_window]
+    # Bybit віддає сторінку від нових свічок до старих; у хронологічному порядку
+    # вікна, що прийшли по черзі, дають зростаючий ряд і finalize() не сортує
+    if len(page) > 1 and page[0, 0] > page[-1, 0]:
+        page = page[::-1]
+    return page
+
+
+def download_kline_windows(
+    category: str,
+    symbol: str,
+    interval: str,
+    windows: List[Tuple[int, int]],
+    limit: int = 1000,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    progress_callback: Optional[Callable[[int], None]] = None,
+    message_callback: Optional[Callable[[str], None]] = None,
+    should_stop: Optional[Callable[[], bool]] = None,
+    accumulator: Optional[KlineAccumulator] = None,
+    rate_limiter: Optional[RateLimiter] = None,
+    window_callback: Optional[Callable[[int, np.ndarray], None]] = None
+) -> List[int]:
+    """
+    Паралельно завантажує вікна через обмежений пул потоків і дописує
+    кожну сторінку в accumulator (якщо задано) одразу після отримання.
+    window_callback(index, page) викликається для кожного завершеного вікна
+    (наприклад, для збереження контрольної точки).
+    Повертає кількість свічок для кожного вікна; WINDOW_PENDING — вікно не завантажене
+    (зупинка), WINDOW_FAILED — запит не вдався після всіх повторів. Невдалі вікна
+    не зупиняють решту, а повідомляються через message_callback.
+    """
+    if not windows:
+        return []
+
+    logging.info(f"download_kline_windows: {symbol} ({interval}) — {len(windows)} вікон, {max_workers} потоків.")
+
+    window_counts = [WINDOW_PENDING] * len(windows)
+    completed_windows = 0
+    failed_windows = 0
+    downloaded_candles_count = 0
+
+    executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="kline-window")
+    try:
+        futures = {
+            executor.submit(fetch_kline_window, category, symbol, interval,
+                            window_start, window_end, limit, rate_limiter): index
+            for index, (window_start, window_end) in enumerate(windows)
+        }
+
+        for future in as_completed(futures):
+            if should_stop is not None and should_stop():
+                logging.info("download_kline_windows: Отримано запит на зупинку, скасовую решту вікон.")
+                break
+
+            index = futures[future]
+            completed_windows += 1
+            try:
+                page = future.result()
+            except KlineRequestError as e:
+                window_counts[index] = WINDOW_FAILED
+                failed_windows += 1
+                logging.warning(f"download_kline_windows: Вікно {windows[index]} не завантажено: {e}")
+                if message_callback is not None:
+                    message_callback(f"Увага: вікно {index + 1}/{len(windows)} не завантажено після всіх повторів.")
+                page = None
+
+            if page is not None:
+                if accumulator is not None:
+                    accumulator.append(page)
+                window_counts[index] = len(page)
+                if window_callback is not None:
+                    window_callback(index, page)
+                downloaded_candles_count += len(page)
+
+            progress_percentage = int(completed_windows * 100 / len(windows))
+            if progress_callback is not None:
+                progress_callback(progress_percentage)
+            if message_callback is not None:
+                failed_note = f", невдалих вікон: {failed_windows}" if failed_windows else ""
+                message_callback(f"Завантаження: {progress_percentage}% ({downloaded_candles_count} свічок{failed_note})")
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+    logging.info(f"download_kline_windows: Завантажено {downloaded_candles_count} свічок з {completed_windows}/{len(windows)} вікон"
+                 f"{f', невдалих: {failed_windows}' if failed_windows else ''}.")
+    logging.info(f"download_kline_windows: Затримки HTTP — {get_request_latency_histogram().summary()}")
+    return window_counts
+
+
+def download_kline_range(
+    category: str,
+    symbol: str,
+    interval: str,
+    start_time_ms: int,
+    end_time_ms: int,
+    limit: int = 1000,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    progress_callback: Optional[Callable[[int], None]] = None,
+    message_callback: Optional[Callable[[str], None]] = None,
+    should_stop: Optional[Callable[[], bool]] = None,
+    rate_limiter: Optional[RateLimiter] = None,
+    checkpoint: Optional[DownloadCheckpoint] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Паралельно завантажує свічки за діапазон через обмежений пул потоків.
+    Повертає (timestamps, values), впорядковані за часом.
+
+    З checkpoint кожне завершене вікно записується на диск (без ще відкритої
+    свічки), а вже записані вікна попереднього обірваного запуску не
+    завантажуються повторно. Контрольна точка видаляється лише тоді, коли всі
+    вікна завантажено; після зупинки чи невдалих вікон вона лишається, і
+    IncompleteDownloadError повідомляє про невдалі вікна.
+    """
+    gaps = [(start_time_ms, end_time_ms)]
+    resumed = np.empty((0, 7), dtype=np.float64)
+    if checkpoint is not None:
+        checkpoint.prepare(start_time_ms, end_time_ms)
+        gaps = subtract_ranges(start_time_ms, end_time_ms, checkpoint.completed_ranges())
+        resumed = checkpoint.load(start_time_ms, end_time_ms)
+        if len(resumed):
+            logging.info(f"download_kline_range: Продовження з контрольної точки — {len(resumed)} свічок уже є.")
+            if message_callback is not None:
+                message_callback(f"Продовження завантаження: {len(resumed)} свічок з контрольної точки.")
+
+    windows = [window for gap_start, gap_end in gaps
+               for window in plan_kline_windows(gap_start, gap_end, interval, limit)]
+    accumulator = KlineAccumulator(len(windows) * limit + len(resumed))
+    accumulator.append(resumed)
+
+    window_callback = None
+    if checkpoint is not None:
+        # Межа відкритої свічки фіксується до запитів: свічка, що закриється під час
+        # завантаження, у сторінці ще може бути неповною
+        open_candle_start = open_candle_start_ms(interval)
+        window_callback = lambda index, page: checkpoint.record(*windows[index], page, open_candle_start)
+
+    window_counts = download_kline_windows(
+        category, symbol, interval, windows, limit, max_workers,
+        progress_callback, message_callback, should_stop, accumulator, rate_limiter, window_callback
+    )
+    failed_windows = window_counts.count(WINDOW_FAILED)
+    if checkpoint is not None and all(count >= 0 for count in window_counts):
+        checkpoint.discard()
+    if failed_windows:
+        raise IncompleteDownloadError(failed_windows, len(windows),
+                                      "Завершені вікна збережено у контрольній точці, повторний запуск дозавантажить решту"
+                                      if checkpoint is not None else "")
+    return accumulator.finalize()
+
+
+def download_kline_range_with_store(
+    store: CandleStore,
+    category: str,
+    symbol: str,
+    interval: str,
+    start_time_ms: int,
+    end_time_ms: int,
+    limit: int = 1000,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    progress_callback: Optional[Callable[[int], None]] = None,
+    message_callback: Optional[Callable[[str], None]] = None,
+    should_stop: Optional[Callable[[], bool]] = None,
+    rate_limiter: Optional[RateLimiter] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Завантажує лише ті частини діапазону, яких немає в локальному сховищі
+    (включно з ще відкритою останньою свічкою), і повертає весь діапазон зі сховища.
+    Спершу відсутні свічки будуються з молодших інтервалів, що вже є у сховищі.
+    Якщо частина вікон не завантажилась, отримане зберігається у сховищі
+    і кидається IncompleteDownloadError: повторний запуск дозавантажить решту.
+    """
+    derived = fill_from_finer_intervals(store, category, symbol, interval, start_time_ms, end_time_ms)
+    if derived and message_callback is not None:
+        message_callback(f"Отримано {derived} свічок агрегацією молодших інтервалів зі сховища.")
+
+    gaps = store.missing_ranges(category, symbol, interval, start_time_ms, end_time_ms)
+    windows = [window for gap_start, gap_end in gaps
+               for window in plan_kline_windows(gap_start, gap_end, interval, limit)]
+
+    if windows:
+        if message_callback is not None:
+            message_callback(f"Дозавантаження {len(gaps)} проміжків ({len(windows)} запитів)...")
+        # Сховище саме є контрольною точкою: завершені вікна записуються порціями
+        # під час завантаження, тож після збою чи зупинки повторний запуск
+        # дозавантажить лише решту
+        pending_windows: List[Tuple[int, int]] = []
+        pending_pages: List[np.ndarray] = []
+
+        def flush_pending():
+            if not pending_windows:
+                return
+            candles = np.concatenate(pending_pages) if pending_pages else np.empty((0, 7), dtype=np.float64)
+            store.save_candles(category, symbol, interval, candles[:, 0].astype(np.int64),
+                               candles[:, 1:], pending_windows)
+            pending_windows.clear()
+            pending_pages.clear()
+
+        def on_window_done(index: int, page: np.ndarray):
+            # Невдалі вікна сюди не потрапляють (WINDOW_FAILED), тож порожня відповідь
+            # означає, що свічок у вікні немає (до лістингу, без угод), і вікно теж
+            # позначається покритим; ще відкриту свічку save_candles не позначає
+            pending_windows.append(windows[index])
+            if len(page):
+                pending_pages.append(page)
+            if len(pending_windows) >= STORE_FLUSH_EVERY_WINDOWS:
+                flush_pending()
+
+        try:
+            window_counts = download_kline_windows(
+                category, symbol, interval, windows, limit, max_workers,
+                progress_callback, message_callback, should_stop, None, rate_limiter, on_window_done
+            )
+        finally:
+            flush_pending()
+        failed_windows = window_counts.count(WINDOW_FAILED)
+        if failed_windows:
+            raise IncompleteDownloadError(failed_windows, len(windows),
+                                          "Отримані свічки збережено у сховищі, повторний запуск дозавантажить решту")
+    else:
+        logging.info(f"download_kline_range_with_store: Діапазон {symbol} ({interval}) повністю є у сховищі.")
+        if progress_callback is not None:
+            progress_callback(100)
+
+    return store.load_candles(category, symbol, interval, start_time_ms, end_time_ms)
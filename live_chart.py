@@ -0,0 +1,217 @@
+import logging
+from typing import Dict, Optional
+
+import numpy as np
+from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+from matplotlib.collections import LineCollection, PolyCollection
+from matplotlib.colors import to_rgba
+from matplotlib.figure import Figure
+from matplotlib.ticker import FuncFormatter, MaxNLocator
+
+from live_stream import LiveKlineFrame
+from indicators import indicator_lines
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - [Live Chart] %(message)s')
+
+UP_COLOR = "#3dc985"
+DOWN_COLOR = "#ef4f60"
+VOLUME_UP_COLOR = "#247252"
+VOLUME_DOWN_COLOR = "#82333f"
+FIGURE_FACECOLOR = "#161a1e"
+AXES_FACECOLOR = "#1b1f24"
+GRID_COLOR = "#2c2e31"
+EDGE_COLOR = "#474d56"
+TEXT_COLOR = "lightgray"
+
+BODY_WIDTH = 0.6
+
+
+def _rgba(color: str) -> np.ndarray:
+    return np.array(to_rgba(color))
+
+
+class CandleChartCanvas(FigureCanvas):
+    """
+    Свічковий графік для live-режиму, що не перебудовує фігуру на кожне оновлення.
+
+    Тіла свічок (PolyCollection), тіні (LineCollection) та лінії індикаторів
+    створюються один раз; оновлення відкритої свічки змінює лише її вершини,
+    нова свічка зсуває вікно з останніх max_candles. Перемальовування
+    виконується через draw_idle, тож часті оновлення об'єднуються Qt.
+    include_volume додає панель обсягу (стовпці — ще одна PolyCollection).
+    """
+
+    def __init__(self, max_candles: int = 200, include_rsi: bool = False, title: str = "", parent=None,
+                 include_volume: bool = False):
+        self.figure = Figure(figsize=(10, 7), facecolor=FIGURE_FACECOLOR)
+        super().__init__(self.figure)
+        self.setParent(parent)
+        self.max_candles = max_candles
+        self._timestamps = np.empty(0, dtype=np.int64)
+
+        height_ratios = [4] + [1] * (include_volume + include_rsi)
+        grid = self.figure.add_gridspec(len(height_ratios), 1, height_ratios=height_ratios, hspace=0.05)
+        self.ax_price = self.figure.add_subplot(grid[0])
+        panels = iter(range(1, len(height_ratios)))
+        self.ax_volume = self.figure.add_subplot(grid[next(panels)], sharex=self.ax_price) if include_volume else None
+        self.ax_rsi = self.figure.add_subplot(grid[next(panels)], sharex=self.ax_price) if include_rsi else None
+
+        for ax in (self.ax_price, self.ax_volume, self.ax_rsi):
+            if ax is None:
+                continue
+            ax.set_facecolor(AXES_FACECOLOR)
+            ax.tick_params(colors=TEXT_COLOR, labelsize='small')
+            ax.yaxis.tick_right()
+            ax.grid(True, axis='y', linestyle='--', color=GRID_COLOR, linewidth=0.5)
+            for spine in ax.spines.values():
+                spine.set_edgecolor(EDGE_COLOR)
+                spine.set_linewidth(0.5)
+        self.ax_price.set_title(title, color=TEXT_COLOR)
+
+        self.wicks = LineCollection([], linewidths=0.8)
+        self.bodies = PolyCollection([], linewidths=0.5)
+        self.ax_price.add_collection(self.wicks)
+        self.ax_price.add_collection(self.bodies)
+        self.volume_bars = PolyCollection([], linewidths=0)
+        if self.ax_volume is not None:
+            self.ax_volume.add_collection(self.volume_bars)
+            self.ax_volume.yaxis.set_major_locator(MaxNLocator(nbins=3))
+            self.ax_volume.yaxis.set_major_formatter(FuncFormatter(lambda y, _pos: f"{y:,.0f}"))
+        # Лінії індикаторів: колонка → Line2D; кольори й стилі — з реєстру індикаторів
+        self.indicator_lines: Dict[str, object] = {}
+        self.oscillator_lines: Dict[str, object] = {}
+        if self.ax_rsi is not None:
+            self.ax_rsi.axhline(70, color='red', linestyle='--', linewidth=0.7)
+            self.ax_rsi.axhline(30, color='green', linestyle='--', linewidth=0.7)
+            self.ax_rsi.set_ylim(0, 100)
+
+        axes = [ax for ax in (self.ax_price, self.ax_volume, self.ax_rsi) if ax is not None]
+        for ax in axes[:-1]:
+            # Верхні панелі ділять вісь X з нижньою: без підписів і рисок, які лише сповільнюють малювання
+            ax.tick_params(axis='x', labelbottom=False, bottom=False)
+        bottom_ax = axes[-1]
+        bottom_ax.xaxis.set_major_locator(MaxNLocator(nbins=8, integer=True))
+        bottom_ax.xaxis.set_major_formatter(FuncFormatter(self._format_x))
+
+        self._wick_segments = np.empty((0, 2, 2))
+        self._body_verts = np.empty((0, 4, 2))
+        self._volume_verts = np.empty((0, 4, 2))
+        self._colors = np.empty((0, 4))
+        self._volume_colors = np.empty((0, 4))
+        self.figure.subplots_adjust(left=0.04, right=0.92, top=0.95, bottom=0.08)
+
+    def _format_x(self, x, _pos=None) -> str:
+        position = int(round(x))
+        if 0 <= position < len(self._timestamps):
+            return np.datetime_as_string(np.datetime64(int(self._timestamps[position]), 'ms'), unit='m')[5:].replace('T', ' ')
+        return ""
+
+    def set_frame(self, frame: LiveKlineFrame):
+        """
+        Повністю оновлює вікно графіка з останніх max_candles свічок.
+        """
+        start = max(0, len(frame) - self.max_candles)
+        self._timestamps = frame.timestamps[start:]
+        open_, high, low, close, volume = (frame.column(name)[start:]
+                                           for name in ('open', 'high', 'low', 'close', 'volume'))
+        x = np.arange(len(close), dtype=np.float64)
+        self._set_candles(x, BODY_WIDTH, open_, high, low, close, volume)
+
+        for column, color, linestyle, _ in indicator_lines(frame.columns, 'price'):
+            line = self.indicator_lines.get(column)
+            if line is None:
+                line, = self.ax_price.plot([], [], color=color, linestyle=linestyle, linewidth=0.8)
+                self.indicator_lines[column] = line
+            line.set_data(x, frame.column(column)[start:])
+        if self.ax_rsi is not None:
+            for column, color, linestyle, _ in indicator_lines(frame.columns, 'oscillator'):
+                line = self.oscillator_lines.get(column)
+                if line is None:
+                    line, = self.ax_rsi.plot([], [], color=color, linestyle=linestyle, linewidth=1.0)
+                    self.oscillator_lines[column] = line
+                line.set_data(x, frame.column(column)[start:])
+
+        self._push_collections()
+        self.ax_price.set_xlim(-1, max(self.max_candles, len(close)))
+        self._autoscale_price(frame, start)
+        self._autoscale_volume()
+        self.draw_idle()
+
+    def update_last(self, frame: LiveKlineFrame):
+        """
+        Оновлює лише останню (відкриту) свічку та кінці ліній індикаторів.
+        """
+        if not len(self._body_verts):
+            self.set_frame(frame)
+            return
+        last = len(frame) - 1
+        open_, high, low, close = (frame.column(name)[last] for name in ('open', 'high', 'low', 'close'))
+        self._wick_segments[-1, :, 1] = (low, high)
+        self._body_verts[-1, :, 1] = (open_, close, close, open_)
+        self._colors[-1] = _rgba(UP_COLOR if close >= open_ else DOWN_COLOR)
+        if self.ax_volume is not None:
+            self._volume_verts[-1, 1:3, 1] = frame.column('volume')[last]
+            self._volume_colors[-1] = _rgba(VOLUME_UP_COLOR if close >= open_ else VOLUME_DOWN_COLOR)
+
+        for column, line in (*self.indicator_lines.items(), *self.oscillator_lines.items()):
+            y = line.get_ydata()
+            y[-1] = frame.column(column)[last]
+            line.set_ydata(y)
+
+        self._push_collections()
+        self._autoscale_price(frame, max(0, len(frame) - len(self._body_verts)))
+        self._autoscale_volume()
+        self.draw_idle()
+
+    def apply_update(self, frame: LiveKlineFrame, appended: Optional[bool]):
+        if appended is None:
+            return
+        if appended:
+            self.set_frame(frame)
+        else:
+            self.update_last(frame)
+
+    def _set_candles(self, x: np.ndarray, width, open_: np.ndarray, high: np.ndarray, low: np.ndarray,
+                     close: np.ndarray, volume: np.ndarray):
+        """
+        Вершини тіл, тіней і стовпців обсягу для свічок з центрами x і шириною width
+        (число або масив — агреговані свічки можуть мати різну ширину).
+        """
+        half = np.broadcast_to(np.asarray(width, dtype=np.float64) / 2, x.shape)
+        left, right = x - half, x + half
+        self._wick_segments = np.stack([np.column_stack([x, low]), np.column_stack([x, high])], axis=1)
+        self._body_verts = np.empty((len(x), 4, 2))
+        self._body_verts[:, :, 0] = np.column_stack([left, left, right, right])
+        self._body_verts[:, :, 1] = np.column_stack([open_, close, close, open_])
+        rising = (close >= open_)[:, None]
+        self._colors = np.where(rising, _rgba(UP_COLOR), _rgba(DOWN_COLOR))
+        if self.ax_volume is not None:
+            self._volume_verts = np.zeros((len(x), 4, 2))
+            self._volume_verts[:, :, 0] = self._body_verts[:, :, 0]
+            self._volume_verts[:, 1:3, 1] = np.asarray(volume)[:, None]
+            self._volume_colors = np.where(rising, _rgba(VOLUME_UP_COLOR), _rgba(VOLUME_DOWN_COLOR))
+
+    def _push_collections(self):
+        self.wicks.set_segments(self._wick_segments)
+        self.wicks.set_color(self._colors)
+        self.bodies.set_verts(self._body_verts)
+        self.bodies.set_facecolor(self._colors)
+        self.bodies.set_edgecolor(self._colors)
+        if self.ax_volume is not None:
+            self.volume_bars.set_verts(self._volume_verts)
+            self.volume_bars.set_facecolor(self._volume_colors)
+
+    def _autoscale_price(self, frame: LiveKlineFrame, start: int):
+        lines = [frame.column(column)[start:] for column in self.indicator_lines]
+        self._set_price_limits([frame.column('low')[start:], *lines], [frame.column('high')[start:], *lines])
+
+    def _set_price_limits(self, lows: list, highs: list):
+        y_min = np.nanmin(np.concatenate(lows))
+        y_max = np.nanmax(np.concatenate(highs))
+        padding = (y_max - y_min) * 0.05 or abs(y_max) * 0.01 or 1.0
+        self.ax_price.set_ylim(y_min - padding, y_max + padding)
+
+    def _autoscale_volume(self):
+        if self.ax_volume is not None and len(self._volume_verts):
+            self.ax_volume.set_ylim(0, np.nanmax(self._volume_verts[:, 1, 1]) * 1.1 or 1.0)
+
@@ -0,0 +1,228 @@
+import os
+import json
+import time
+import logging
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from bybit_api import KLINE_VALUE_COLUMNS
+from indicators import Indicator, calculate_indicators, IncrementalIndicators
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - [Live Stream] %(message)s')
+
+DEFAULT_WS_BASE_URL = "wss://stream.bybit.com"
+_ws_base_url = os.environ.get("BYBIT_WS_URL", DEFAULT_WS_BASE_URL).rstrip("/")
+
+# Bybit закриває з'єднання без ping довше 20 секунд
+PING_INTERVAL_SECONDS = 20
+MAX_RECONNECT_DELAY_SECONDS = 30
+
+
+def set_ws_base_url(base_url: Optional[str] = None):
+    """
+    Перемикає live-клієнт на іншу адресу WebSocket; None — повернення до stream.bybit.com.
+    """
+    global _ws_base_url
+    _ws_base_url = (base_url or DEFAULT_WS_BASE_URL).rstrip("/")
+
+
+def get_ws_url(category: str) -> str:
+    return f"{_ws_base_url}/v5/public/{category}"
+
+
+def _require_websockets():
+    try:
+        from websockets.sync.client import connect
+        from websockets.exceptions import ConnectionClosed
+    except ImportError:
+        raise ImportError("Для live-режиму потрібен пакет websockets: pip install websockets")
+    return connect, ConnectionClosed
+
+
+@dataclass
+class KlineUpdate:
+    """Оновлення свічки з потоку kline (confirm=True — свічку закрито)."""
+    timestamp: int
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: float
+    turnover: float
+    confirm: bool
+
+    @property
+    def values(self) -> Tuple[float, ...]:
+        return self.open, self.high, self.low, self.close, self.volume, self.turnover
+
+
+def parse_kline_message(message: str) -> List[KlineUpdate]:
+    """
+    Розбирає повідомлення теми kline.{interval}.{symbol}; службові повідомлення дають порожній список.
+    """
+    payload = json.loads(message)
+    if not str(payload.get("topic", "")).startswith("kline."):
+        return []
+    return [
+        KlineUpdate(
+            timestamp=int(item["start"]),
+            open=float(item["open"]),
+            high=float(item["high"]),
+            low=float(item["low"]),
+            close=float(item["close"]),
+            volume=float(item["volume"]),
+            turnover=float(item["turnover"]),
+            confirm=bool(item.get("confirm", False)),
+        )
+        for item in payload.get("data", [])
+    ]
+
+
+class LiveKlineClient:
+    """
+    Підписка на публічний потік свічок Bybit з автоматичним перепідключенням.
+    """
+
+    def __init__(self, category: str, symbol: str, interval: str,
+                 on_updates: Callable[[List[KlineUpdate]], None],
+                 on_status: Optional[Callable[[str], None]] = None,
+                 url: Optional[str] = None):
+        self.category = category
+        self.symbol = symbol
+        self.interval = interval
+        self.on_updates = on_updates
+        self.on_status = on_status
+        self.url = url or get_ws_url(category)
+
+    @property
+    def topic(self) -> str:
+        return f"kline.{self.interval}.{self.symbol}"
+
+    def _status(self, text: str):
+        logging.info(f"LiveKlineClient: {text}")
+        if self.on_status is not None:
+            self.on_status(text)
+
+    def run(self, should_stop: Callable[[], bool]):
+        """
+        Блокуючий цикл отримання оновлень до should_stop().
+        """
+        connect, ConnectionClosed = _require_websockets()
+        reconnect_delay = 1.0
+
+        while not should_stop():
+            try:
+                with connect(self.url, open_timeout=10, close_timeout=2) as websocket:
+                    websocket.send(json.dumps({"op": "subscribe", "args": [self.topic]}))
+                    self._status(f"Підключено до {self.url}, тема {self.topic}")
+                    reconnect_delay = 1.0
+                    last_ping = time.monotonic()
+
+                    while not should_stop():
+                        if time.monotonic() - last_ping >= PING_INTERVAL_SECONDS:
+                            websocket.send(json.dumps({"op": "ping"}))
+                            last_ping = time.monotonic()
+                        try:
+                            message = websocket.recv(timeout=0.5)
+                        except TimeoutError:
+                            continue
+                        updates = parse_kline_message(message)
+                        if updates:
+                            self.on_updates(updates)
+
+            except (ConnectionClosed, OSError) as e:
+                if should_stop():
+                    break
+                self._status(f"З'єднання втрачено ({e}), повтор через {reconnect_delay:.0f} с")
+                deadline = time.monotonic() + reconnect_delay
+                while time.monotonic() < deadline and not should_stop():
+                    time.sleep(0.1)
+                reconnect_delay = min(MAX_RECONNECT_DELAY_SECONDS, reconnect_delay * 2)
+
+        self._status("Live-потік зупинено")
+
+
+class LiveKlineFrame:
+    """
+    Історія свічок з індикаторами, що оновлюється по одній свічці.
+
+    Дані зберігаються у колонковому буфері зі запасом місткості: оновлення
+    відкритої свічки змінює останній рядок на місці, закриття додає новий.
+    Індикатори для зміненого рядка дає IncrementalIndicators за O(1).
+    """
+
+    def __init__(self, df: pd.DataFrame, indicators: List[Indicator]):
+        closes = df['close'].to_numpy(dtype=np.float64) if len(df) else np.empty(0)
+        self.engine = IncrementalIndicators.from_closes(closes, indicators)
+        self.columns = list(KLINE_VALUE_COLUMNS) + self.engine.columns
+        self._position = {column: index for index, column in enumerate(self.columns)}
+
+        self._size = len(df)
+        capacity = max(1024, self._size * 2)
+        self._timestamps = np.empty(capacity, dtype=np.int64)
+        self._data = np.full((len(self.columns), capacity), np.nan)
+
+        if self._size:
+            if any(column not in df.columns for column in self.engine.columns):
+                df = calculate_indicators(df[KLINE_VALUE_COLUMNS], indicators)
+            self._timestamps[:self._size] = df.index.as_unit('ms').asi8
+            for column in self.columns:
+                self._data[self._position[column], :self._size] = df[column].to_numpy(dtype=np.float64)
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def last_timestamp(self) -> Optional[int]:
+        return int(self._timestamps[self._size - 1]) if self._size else None
+
+    def column(self, name: str) -> np.ndarray:
+        return self._data[self._position[name], :self._size]
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        return self._timestamps[:self._size]
+
+    def _ensure_capacity(self, required: int):
+        capacity = self._data.shape[1]
+        if required <= capacity:
+            return
+        new_capacity = max(required, capacity * 2)
+        timestamps = np.empty(new_capacity, dtype=np.int64)
+        data = np.full((len(self.columns), new_capacity), np.nan)
+        timestamps[:self._size] = self._timestamps[:self._size]
+        data[:, :self._size] = self._data[:, :self._size]
+        self._timestamps, self._data = timestamps, data
+
+    def apply(self, update: KlineUpdate) -> Optional[bool]:
+        """
+        Застосовує оновлення. Повертає True — додано нову свічку, False — оновлено
+        останню, None — застаріле оновлення проігноровано.
+        """
+        last_timestamp = self.last_timestamp
+        if last_timestamp is not None and update.timestamp < last_timestamp:
+            return None
+
+        appended = last_timestamp is None or update.timestamp > last_timestamp
+        if appended:
+            self._ensure_capacity(self._size + 1)
+            self._size += 1
+            indicator_values = self.engine.append(update.close)
+        else:
+            indicator_values = self.engine.replace_last(update.close)
+        row = self._size - 1
+        self._timestamps[row] = update.timestamp
+        self._data[:len(KLINE_VALUE_COLUMNS), row] = update.values
+        for column, value in indicator_values.items():
+            self._data[self._position[column], row] = value
+        return appended
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """
+        DataFrame поверх поточного буфера (без копіювання значень).
+        """
+        index = pd.DatetimeIndex(pd.to_datetime(self.timestamps, unit='ms'), name='timestamp')
+        return pd.DataFrame(self._data[:, :self._size].T, index=index, columns=self.columns, copy=False)
@@ -36,4 +36,7 @@ class MainWindow(FluentWindow):
         Передає актуальний DataFrame до SaveDataInterface.
         """
         logging.info(f"MainWindow: Отримано сигнал data_loaded_signal. DataFrame порожній: {df.empty}.")
-        self.save_data_interface.update_data_and_switches(df)
\ No newline at end of file
+        self.save_data_interface.update_data_and_switches(df)
+    def closeEvent(self, event):
+        self.bybit_app_interface.stop_background_threads()
+        super().closeEvent(event)
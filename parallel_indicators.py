@@ -0,0 +1,144 @@
+import os
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from indicators import (
+    Indicator, calculate_indicators, compute_indicator_columns, indicator_dtype, join_indicator_columns,
+    order_indicators
+)
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - [Parallel Indicators] %(message)s')
+
+# Процеси запускаються через spawn: fork з GUI-процесу з живими Qt-потоками небезпечний
+DEFAULT_MP_CONTEXT = "spawn"
+
+
+def _attach(name: str) -> SharedMemory:
+    """
+    Підключення до сегмента батьківського процесу. Воркери ділять resource_tracker
+    з батьком, тож повторна реєстрація до Python 3.13 нешкідлива, а видаляє
+    сегмент лише батько.
+    """
+    try:
+        return SharedMemory(name=name, track=False)
+    except TypeError:  # Python < 3.13
+        return SharedMemory(name=name)
+
+
+def _compute_in_worker(task: Tuple[str, int, int, str, int, List[Indicator]]) -> int:
+    """
+    Рахує індикатори одного фрейму: читає close з вхідного сегмента і пише
+    колонки (кожна суцільна) у свою ділянку вихідного сегмента.
+    """
+    input_name, offset, rows, output_name, output_offset, indicators = task
+    input_shm = _attach(input_name)
+    output_shm = _attach(output_name)
+    try:
+        close = np.ndarray((rows,), dtype=np.float64, buffer=input_shm.buf, offset=offset * 8)
+        columns = compute_indicator_columns(close, indicators)
+        out = np.ndarray((len(columns), rows), dtype=np.float64, buffer=output_shm.buf, offset=output_offset * 8)
+        for position, values in enumerate(columns.values()):
+            out[position] = values
+        del close, out
+        return rows
+    finally:
+        input_shm.close()
+        output_shm.close()
+
+
+class ParallelIndicatorCalculator:
+    """
+    Розрахунок індикаторів для багатьох фреймів (символів) у пулі процесів.
+
+    Ціни закриття всіх фреймів пишуться в один сегмент спільної пам'яті,
+    результати воркери пишуть у другий — DataFrame не серіалізуються.
+    Після завершення вихідний сегмент копіюється одним блоком, і колонки
+    кожного фрейму — суцільні зрізи цього блоку без подальших копій.
+    Пул створюється один раз і перевикористовується між викликами.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, mp_context: str = DEFAULT_MP_CONTEXT):
+        self.max_workers = max(1, max_workers or os.cpu_count() or 1)
+        self._mp_context = multiprocessing.get_context(mp_context)
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def __enter__(self) -> "ParallelIndicatorCalculator":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=self._mp_context)
+        return self._executor
+
+    def calculate(self, frames: Sequence[pd.DataFrame], indicators: Sequence[Indicator]) -> List[pd.DataFrame]:
+        """
+        Те саме, що [calculate_indicators(df, indicators) for df in frames], але паралельно.
+        """
+        requested = order_indicators(indicators)
+        sizes = [len(df) for df in frames]
+        work = [index for index, size in enumerate(sizes) if size]
+        if not requested or self.max_workers == 1 or len(work) < 2:
+            return [calculate_indicators(df, requested) for df in frames]
+
+        column_names = [column for indicator in requested for column in indicator.columns]
+        offsets = np.concatenate([[0], np.cumsum(sizes)]).astype(np.int64)
+        total_rows = int(offsets[-1])
+
+        input_shm = SharedMemory(create=True, size=total_rows * 8)
+        output_shm = SharedMemory(create=True, size=total_rows * len(column_names) * 8)
+        try:
+            closes = np.ndarray((total_rows,), dtype=np.float64, buffer=input_shm.buf)
+            for index in work:
+                closes[offsets[index]:offsets[index + 1]] = frames[index]['close'].to_numpy(dtype=np.float64)
+            del closes
+
+            tasks = [(input_shm.name, int(offsets[index]), sizes[index],
+                      output_shm.name, int(offsets[index]) * len(column_names), requested)
+                     for index in work]
+            # Великі фрейми першими, щоб наприкінці не чекати на один довгий
+            tasks.sort(key=lambda task: task[2], reverse=True)
+            list(self._pool().map(_compute_in_worker, tasks))
+
+            output = np.ndarray((total_rows * len(column_names),), dtype=np.float64, buffer=output_shm.buf).copy()
+        finally:
+            input_shm.close()
+            input_shm.unlink()
+            output_shm.close()
+            output_shm.unlink()
+
+        results = []
+        for index, df in enumerate(frames):
+            if not sizes[index]:
+                results.append(df)
+                continue
+            start = int(offsets[index]) * len(column_names)
+            block = output[start:start + sizes[index] * len(column_names)].reshape(len(column_names), sizes[index])
+            # Воркери пишуть float64; компактні фрейми отримують float32, як у calculate_indicators
+            block = block.astype(indicator_dtype(df['close'].dtype), copy=False)
+            results.append(join_indicator_columns(df, dict(zip(column_names, block))))
+        logging.info(f"ParallelIndicatorCalculator: {len(work)} фреймів, {total_rows} свічок, "
+                     f"{len(column_names)} колонок, {self.max_workers} процесів.")
+        return results
+
+
+def calculate_indicators_parallel(frames: Sequence[pd.DataFrame], indicators: Sequence[Indicator],
+                                  max_workers: Optional[int] = None) -> List[pd.DataFrame]:
+    """
+    Одноразовий паралельний розрахунок; для повторних викликів краще тримати ParallelIndicatorCalculator.
+    """
+    with ParallelIndicatorCalculator(max_workers) as calculator:
+        return calculator.calculate(frames, indicators)
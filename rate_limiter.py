@@ -0,0 +1,154 @@
+import random
+import threading
+import time
+import logging
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - [Rate Limiter] %(message)s')
+
+# Bybit дозволяє 600 запитів за 5 секунд з однієї IP-адреси; залишаємо запас
+DEFAULT_REQUESTS_PER_SECOND = 50.0
+
+
+class RateLimiter:
+    """
+    Потокобезпечний лімітер запитів за алгоритмом token bucket.
+    Один екземпляр задає спільний бюджет для всіх потоків, що ним користуються.
+    """
+
+    def __init__(self, requests_per_second: float = DEFAULT_REQUESTS_PER_SECOND, burst: int = None):
+        if requests_per_second <= 0:
+            raise ValueError("requests_per_second має бути додатним")
+        self.requests_per_second = float(requests_per_second)
+        self.capacity = float(burst if burst is not None else max(1, int(requests_per_second)))
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        elapsed = now - self._updated_at
+        if elapsed <= 0:
+            return
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.requests_per_second)
+        self._updated_at = now
+
+    def acquire(self):
+        """
+        Блокує потік, доки в бюджеті не з'явиться токен для одного запиту.
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait_time = (1 - self._tokens) / self.requests_per_second
+            time.sleep(wait_time)
+
+
+# retCode Bybit, що означають перевищення ліміту запитів
+RATE_LIMIT_RET_CODES = {10006, 10018}
+# HTTP-статуси перевищення ліміту (403 — тимчасове блокування IP)
+RATE_LIMIT_HTTP_STATUSES = {403, 429}
+
+
+class AdaptiveRateLimiter(RateLimiter):
+    """
+    Лімітер, що підлаштовує темп під стан лімітів біржі.
+
+    Читає заголовки X-Bapi-Limit-Status / X-Bapi-Limit-Reset-Timestamp і
+    призупиняє всі потоки до скидання ліміту, коли залишок вичерпано.
+    На відповіді про перевищення ліміту темп зменшується вдвічі, а потоки
+    чекають з експоненційною затримкою та випадковим розкидом (full jitter).
+    Після успішних запитів темп поступово повертається до максимального.
+    """
+
+    def __init__(self, requests_per_second: float = DEFAULT_REQUESTS_PER_SECOND, burst: int = None,
+                 min_requests_per_second: float = 1.0, base_backoff: float = 0.5, max_backoff: float = 60.0,
+                 low_remaining_threshold: int = 2):
+        super().__init__(requests_per_second, burst)
+        self.max_requests_per_second = self.requests_per_second
+        self.min_requests_per_second = min(min_requests_per_second, self.requests_per_second)
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.low_remaining_threshold = low_remaining_threshold
+        self._blocked_until = 0.0
+        self._consecutive_limits = 0
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                wait_time = self._blocked_until - time.monotonic()
+            if wait_time <= 0:
+                break
+            time.sleep(wait_time)
+        super().acquire()
+
+    def _block_for(self, delay: float):
+        # Викликається під self._lock
+        self._blocked_until = max(self._blocked_until, time.monotonic() + delay)
+        # Після паузи бюджет відновлюється з нуля, а не одразу на весь burst
+        self._tokens = min(self._tokens, 0.0)
+        self._updated_at = max(self._updated_at, self._blocked_until)
+
+    def backoff_delay(self, attempt: int) -> float:
+        """
+        Експоненційна затримка з повним випадковим розкидом для спроби attempt (з 0).
+        """
+        return random.uniform(0, min(self.max_backoff, self.base_backoff * (2 ** attempt)))
+
+    def update_from_headers(self, headers):
+        """
+        Враховує заголовки лімітів Bybit з відповіді.
+        """
+        remaining = headers.get("X-Bapi-Limit-Status")
+        reset_timestamp = headers.get("X-Bapi-Limit-Reset-Timestamp")
+        if remaining is None or reset_timestamp is None:
+            return
+        try:
+            remaining = int(remaining)
+            reset_delay = int(reset_timestamp) / 1000 - time.time()
+        except ValueError:
+            return
+
+        if remaining <= self.low_remaining_threshold and reset_delay > 0:
+            with self._lock:
+                self._block_for(min(reset_delay, self.max_backoff))
+            logging.warning(f"AdaptiveRateLimiter: Залишок ліміту {remaining}, пауза {reset_delay:.2f} с до скидання.")
+
+    def on_rate_limited(self, retry_after: float = None):
+        """
+        Реакція на відповідь про перевищення ліміту: зменшення темпу та пауза для всіх потоків.
+        """
+        with self._lock:
+            delay = retry_after if retry_after is not None else self.backoff_delay(self._consecutive_limits)
+            self._consecutive_limits += 1
+            self.requests_per_second = max(self.min_requests_per_second, self.requests_per_second / 2)
+            self._block_for(delay)
+            current_rate = self.requests_per_second
+        logging.warning(f"AdaptiveRateLimiter: Перевищено ліміт, пауза {delay:.2f} с, темп {current_rate:.1f} запитів/с.")
+
+    def on_success(self):
+        """
+        Після успішного запиту темп лінійно повертається до максимального.
+        """
+        with self._lock:
+            self._consecutive_limits = 0
+            if self.requests_per_second < self.max_requests_per_second:
+                self.requests_per_second = min(self.max_requests_per_second,
+                                               self.requests_per_second + self.max_requests_per_second * 0.05)
+
+
+_shared_rate_limiter = None
+_shared_rate_limiter_lock = threading.Lock()
+
+
+def get_shared_rate_limiter() -> AdaptiveRateLimiter:
+    """
+    Повертає спільний для всього процесу адаптивний лімітер.
+    """
+    global _shared_rate_limiter
+    with _shared_rate_limiter_lock:
+        if _shared_rate_limiter is None:
+            _shared_rate_limiter = AdaptiveRateLimiter()
+        return _shared_rate_limiter
@@ -11,9 +11,13 @@ from PyQt6.QtCore import Qt, pyqtSignal
 
 from qfluentwidgets import (
     BodyLabel, CardWidget, SwitchButton, PrimaryPushButton, MessageBox, 
-    LineEdit, StrongBodyLabel, CaptionLabel
+    LineEdit, StrongBodyLabel, CaptionLabel, ComboBox
 )
 
+from data_export import COMPRESSIONS, EXPORT_FORMATS, export_dataframe
+from indicators import parse_indicator_columns
+from data_filters import filter_incomplete_indicator_data
+
 # Налаштування логування
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - [SaveDataInterface] %(message)s')
 
@@ -47,17 +51,14 @@ class SaveDataInterface(QWidget):
                    ["open", "high", "low", "close"], FieldType.BASIC, True, True),
         FieldConfig("volume", "Об'єм торгів", ["volume"], FieldType.VOLUME),
         FieldConfig("turnover", "Оборот", ["turnover"], FieldType.VOLUME),
-        FieldConfig("sma_20", "SMA (20 періодів)", ["SMA_20"], FieldType.INDICATOR),
-        FieldConfig("ema_20", "EMA (20 періодів)", ["EMA_20"], FieldType.INDICATOR),
-        FieldConfig("bb_bands", "Смуги Боллінджера", 
-                   ["BBM_20_2.0", "BBU_20_2.0", "BBL_20_2.0"], FieldType.INDICATOR),
-        FieldConfig("rsi_14", "RSI (14 періодів)", ["RSI_14"], FieldType.INDICATOR),
     ]
 
     def __init__(self, parent: Optional[QWidget] = None):
         super().__init__(parent)
         self._current_data_df = pd.DataFrame()
         self.column_switches: Dict[str, Dict[str, QWidget]] = {}
+        # Поля індикаторів визначаються реєстром за колонками поточних даних
+        self.indicator_field_configs: List[FieldConfig] = []
         
         self.setObjectName("Save-Data-Interface")
         self._init_ui()
@@ -97,7 +98,7 @@ class SaveDataInterface(QWidget):
         
         self.save_button = PrimaryPushButton("Експортувати дані")
         self.save_button.setFixedSize(180, 36)
-        self.save_button.clicked.connect(self.save_data_to_csv)
+        self.save_button.clicked.connect(self.save_data)
         
         save_layout.addWidget(self.save_button)
         save_layout.addStretch()
@@ -117,13 +118,48 @@ class SaveDataInterface(QWidget):
         self.filename_input.setText("kline_data")
         self.filename_input.setPlaceholderText("Введіть ім'я файлу без розширення")
         layout.addWidget(self.filename_input)
-        
-        description = CaptionLabel("Файл буде збережено у форматі CSV з вказаним ім'ям")
-        description.setStyleSheet("color: rgba(255, 255, 255, 0.6);")
-        layout.addWidget(description)
+
+        format_layout = QHBoxLayout()
+        format_layout.setSpacing(12)
+        format_layout.addWidget(BodyLabel("Формат:"))
+        self.format_combo = ComboBox()
+        for file_format, (label, _) in EXPORT_FORMATS.items():
+            self.format_combo.addItem(label, userData=file_format)
+        format_layout.addWidget(self.format_combo)
+        format_layout.addWidget(BodyLabel("Стиснення:"))
+        self.compression_combo = ComboBox()
+        format_layout.addWidget(self.compression_combo)
+        format_layout.addStretch()
+        layout.addLayout(format_layout)
+
+        self.format_description = CaptionLabel()
+        self.format_description.setStyleSheet("color: rgba(255, 255, 255, 0.6);")
+        layout.addWidget(self.format_description)
+
+        self.format_combo.currentIndexChanged.connect(self.on_format_changed)
+        self.on_format_changed()
 
         return card
 
+    def _selected_format(self) -> str:
+        return self.format_combo.currentData() or 'csv'
+
+    def on_format_changed(self, *_):
+        """Оновлення варіантів стиснення та опису під вибраний формат"""
+        file_format = self._selected_format()
+        self.compression_combo.clear()
+        self.compression_combo.addItems(list(COMPRESSIONS.get(file_format, ())))
+        self.compression_combo.setEnabled(file_format in COMPRESSIONS and self.format_combo.isEnabled())
+
+        label, extension = EXPORT_FORMATS[file_format]
+        if file_format == 'csv':
+            self.format_description.setText(f"Файл буде збережено у форматі {label} ({extension}) з вказаним ім'ям")
+        else:
+            self.format_description.setText(
+                f"Колонковий формат {label} ({extension}): вибрані колонки записуються блоками рядків, "
+                f"тож їх можна читати вибірково за колонками та часом"
+            )
+
     def _create_fields_section(self) -> CardWidget:
         """Створення секції вибору полів"""
         card = CardWidget()
@@ -150,9 +186,41 @@ class SaveDataInterface(QWidget):
                     field_widget = self._create_field_switch(field)
                     layout.addWidget(field_widget)
 
+        indicators_label = CaptionLabel(FieldType.INDICATOR.value)
+        indicators_label.setStyleSheet("color: rgba(255, 255, 255, 0.8); font-weight: 500; margin-top: 8px;")
+        layout.addWidget(indicators_label)
+        self.indicator_fields_layout = QVBoxLayout()
+        self.indicator_fields_layout.setSpacing(16)
+        layout.addLayout(self.indicator_fields_layout)
+        self._rebuild_indicator_fields([])
+
         layout.addStretch()
         return card
 
+    def _rebuild_indicator_fields(self, columns: List[str]):
+        """Перебудова перемикачів індикаторів за колонками, знайденими реєстром"""
+        for field in self.indicator_field_configs:
+            self.column_switches.pop(field.key, None)
+        while self.indicator_fields_layout.count():
+            widget = self.indicator_fields_layout.takeAt(0).widget()
+            if widget is not None:
+                widget.deleteLater()
+
+        self.indicator_field_configs = [
+            FieldConfig(indicator.key, indicator.label, indicator.columns, FieldType.INDICATOR)
+            for indicator in parse_indicator_columns(columns)
+        ]
+        for field in self.indicator_field_configs:
+            self.indicator_fields_layout.addWidget(self._create_field_switch(field))
+
+        if not self.indicator_field_configs:
+            placeholder = CaptionLabel("Індикатори не розраховано")
+            placeholder.setStyleSheet("color: rgba(255, 255, 255, 0.6);")
+            self.indicator_fields_layout.addWidget(placeholder)
+
+    def _all_fields(self) -> List[FieldConfig]:
+        return self.FIELD_CONFIGS + self.indicator_field_configs
+
     def _create_field_switch(self, field: FieldConfig) -> QWidget:
         """Створення перемикача для поля"""
         widget = QWidget()
@@ -242,6 +310,8 @@ class SaveDataInterface(QWidget):
         
         self.filename_input.setEnabled(enabled)
         self.save_button.setEnabled(enabled)
+        self.format_combo.setEnabled(enabled)
+        self.compression_combo.setEnabled(enabled and self._selected_format() in COMPRESSIONS)
         self.filter_incomplete_data_switch.setEnabled(enabled)
         
         for switch_data in self.column_switches.values():
@@ -253,6 +323,7 @@ class SaveDataInterface(QWidget):
         self._current_data_df = df 
         logging.info("SaveDataInterface: Оновлення стану перемикачів колонок.")
         
+        self._rebuild_indicator_fields(self._current_data_df.columns.tolist())
         self.set_interface_enabled(False)
 
         if self._current_data_df.empty:
@@ -263,7 +334,7 @@ class SaveDataInterface(QWidget):
         available_columns = self._current_data_df.columns.tolist()
 
         # Оновлення стану перемикачів на основі конфігурації
-        for field in self.FIELD_CONFIGS:
+        for field in self._all_fields():
             switch_data = self.column_switches[field.key]
             switch = switch_data['switch']
             
@@ -279,15 +350,15 @@ class SaveDataInterface(QWidget):
 
     def _check_field_availability(self, field: FieldConfig, available_columns: List[str]) -> bool:
         """Перевірка доступності поля"""
-        if field.key == "bb_bands":
-            # Для смуг Боллінджера потрібні всі колонки
+        if field.field_type == FieldType.INDICATOR:
+            # Для індикаторів з кількома колонками (смуги Боллінджера) потрібні всі
             return all(col in available_columns for col in field.columns)
         
         # Для інших полів достатньо одної колонки
         return any(col in available_columns for col in field.columns)
 
-    def save_data_to_csv(self):
-        """Збереження даних у CSV файл"""
+    def save_data(self):
+        """Збереження даних у файл вибраного формату (CSV, Parquet, Feather)"""
         logging.info("SaveDataInterface: Запущено збереження даних.")
         
         if self._current_data_df.empty:
@@ -297,9 +368,11 @@ class SaveDataInterface(QWidget):
             return
 
         suggested_filename = self.filename_input.text().strip() or "kline_data"
+        file_format = self._selected_format()
+        label, extension = EXPORT_FORMATS[file_format]
         
         file_path, _ = QFileDialog.getSaveFileName(
-            self, "Зберегти дані як", f"{suggested_filename}.csv", "CSV Files (*.csv)"
+            self, "Зберегти дані як", f"{suggested_filename}{extension}", f"{label} (*{extension})"
         )
 
         if not file_path:
@@ -313,10 +386,16 @@ class SaveDataInterface(QWidget):
                 w.exec()
                 return
 
-            # Збереження файлу
-            df_to_save = self._current_data_df[columns_to_export].copy()
-            include_index = bool(self._current_data_df.index.name)
-            df_to_save.to_csv(file_path, index=include_index)
+            data_to_export = self._current_data_df
+            if self.filter_incomplete_data_switch.isChecked():
+                exported_groups = {indicator.definition.group for indicator in parse_indicator_columns(columns_to_export)}
+                data_to_export = filter_incomplete_indicator_data(
+                    data_to_export, {group: True for group in exported_groups}
+                )
+
+            # Збереження файлу: лише вибрані колонки, без копіювання DataFrame
+            export_dataframe(data_to_export, file_path, columns_to_export, file_format=file_format,
+                             compression=self.compression_combo.currentText() or None)
             
             w = MessageBox("Збереження успішне", f"Дані успішно збережено у {file_path}", self.window())
             w.exec()
@@ -332,7 +411,7 @@ class SaveDataInterface(QWidget):
         export_columns = []
         available_columns = self._current_data_df.columns.tolist()
         
-        for field in self.FIELD_CONFIGS:
+        for field in self._all_fields():
             switch = self.column_switches[field.key]['switch']
             if switch.isChecked() and switch.isEnabled():
                 field_columns = [col for col in field.columns if col in available_columns]
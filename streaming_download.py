@@ -0,0 +1,174 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from bybit_api import KLINE_VALUE_COLUMNS, KlineRequestError
+from kline_downloader import IncompleteDownloadError, fetch_kline_window, plan_kline_windows, DEFAULT_MAX_WORKERS
+from rate_limiter import RateLimiter
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - [Streaming Download] %(message)s')
+
+# ~50 000 свічок на row group при ліміті 1000 свічок на запит
+DEFAULT_WINDOWS_PER_ROW_GROUP = 50
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("Для потокового завантаження потрібен пакет pyarrow: pip install pyarrow")
+    return pyarrow, pyarrow.parquet
+
+
+def _kline_schema(pa):
+    return pa.schema(
+        [pa.field('timestamp', pa.timestamp('ms'))] +
+        [pa.field(column, pa.float64()) for column in KLINE_VALUE_COLUMNS]
+    )
+
+
+def _pages_to_table(pa, schema, pages: List[np.ndarray]):
+    candles = np.concatenate(pages) if pages else np.empty((0, 7), dtype=np.float64)
+    arrays = [pa.array(candles[:, 0].astype(np.int64), type=pa.timestamp('ms'))]
+    arrays.extend(pa.array(np.ascontiguousarray(candles[:, position + 1])) for position in range(len(KLINE_VALUE_COLUMNS)))
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def stream_kline_range_to_parquet(
+    category: str,
+    symbol: str,
+    interval: str,
+    start_time_ms: int,
+    end_time_ms: int,
+    output_path: str,
+    limit: int = 1000,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    windows_per_row_group: int = DEFAULT_WINDOWS_PER_ROW_GROUP,
+    progress_callback: Optional[Callable[[int], None]] = None,
+    message_callback: Optional[Callable[[str], None]] = None,
+    should_stop: Optional[Callable[[], bool]] = None,
+    rate_limiter: Optional[RateLimiter] = None
+) -> int:
+    """
+    Завантажує діапазон будь-якої довжини і одразу записує його у Parquet
+    послідовними row group'ами у хронологічному порядку.
+
+    Пам'ять обмежена незалежно від діапазону: одночасно у роботі не більше
+    windows_per_row_group + 2 * max_workers вікон. Повертає кількість записаних свічок.
+
+    Вікно, що не завантажилось після всіх повторів, зупиняє запис: файл містить
+    лише свічки до нього без пропусків, а кидається IncompleteDownloadError.
+    """
+    pa, pq = _require_pyarrow()
+    schema = _kline_schema(pa)
+    windows = plan_kline_windows(start_time_ms, end_time_ms, interval, limit)
+    max_pending = windows_per_row_group + 2 * max(1, max_workers)
+
+    logging.info(f"stream_kline_range_to_parquet: {symbol} ({interval}) — {len(windows)} вікон у {output_path}")
+
+    ready_pages: Dict[int, np.ndarray] = {}
+    row_group_pages: List[np.ndarray] = []
+    next_to_submit = 0
+    next_to_write = 0
+    rows_written = 0
+    last_timestamp = None
+    failed_window = None
+
+    writer = pq.ParquetWriter(output_path, schema, compression='zstd')
+    executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="stream-window")
+    try:
+        futures = {}
+        while next_to_write < len(windows):
+            if should_stop is not None and should_stop():
+                logging.info("stream_kline_range_to_parquet: Отримано запит на зупинку.")
+                break
+
+            # Нові вікна подаються лише в межах ковзного вікна від першого незаписаного
+            while next_to_submit < len(windows) and next_to_submit < next_to_write + max_pending:
+                window_start, window_end = windows[next_to_submit]
+                future = executor.submit(fetch_kline_window, category, symbol, interval,
+                                         window_start, window_end, limit, rate_limiter)
+                futures[future] = next_to_submit
+                next_to_submit += 1
+
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = futures.pop(future)
+                try:
+                    ready_pages[index] = future.result()
+                except KlineRequestError as e:
+                    logging.error(f"stream_kline_range_to_parquet: Вікно {windows[index]} не завантажено: {e}")
+                    failed_window = index if failed_window is None else min(failed_window, index)
+            if failed_window is not None:
+                # Вікна перед невдалим ще можуть бути в дорозі — дописуємо лише готові без пропусків
+                for future in list(futures):
+                    if futures[future] < failed_window:
+                        try:
+                            ready_pages[futures[future]] = future.result()
+                        except KlineRequestError:
+                            failed_window = min(failed_window, futures[future])
+
+            while next_to_write in ready_pages and (failed_window is None or next_to_write < failed_window):
+                page = ready_pages.pop(next_to_write)
+                if len(page) and last_timestamp is not None:
+                    page = page[page[:, 0] > last_timestamp]
+                if len(page):
+                    last_timestamp = page[-1, 0]
+                    row_group_pages.append(page)
+                next_to_write += 1
+
+                if len(row_group_pages) >= windows_per_row_group:
+                    table = _pages_to_table(pa, schema, row_group_pages)
+                    writer.write_table(table)
+                    rows_written += table.num_rows
+                    row_group_pages = []
+
+            progress_percentage = int(next_to_write * 100 / len(windows))
+            if progress_callback is not None:
+                progress_callback(progress_percentage)
+            if message_callback is not None:
+                message_callback(f"Потокове завантаження: {progress_percentage}% ({rows_written} свічок записано)")
+            if failed_window is not None:
+                break
+
+        if row_group_pages:
+            table = _pages_to_table(pa, schema, row_group_pages)
+            writer.write_table(table)
+            rows_written += table.num_rows
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+        writer.close()
+
+    if failed_window is not None:
+        raise IncompleteDownloadError(1, len(windows), f"Запис зупинено на вікні {failed_window + 1}: "
+                                      f"{output_path} містить лише {rows_written} свічок до нього")
+    logging.info(f"stream_kline_range_to_parquet: Записано {rows_written} свічок у {output_path}")
+    return rows_written
+
+
+def read_streamed_klines(path: str, start_time_ms: int = None, end_time_ms: int = None,
+                         columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Читає свічки, записані stream_kline_range_to_parquet, лише за потрібний
+    діапазон і колонки (зайві row group'и пропускаються за статистикою).
+    """
+    pa, pq = _require_pyarrow()
+    filters = []
+    if start_time_ms is not None:
+        filters.append(('timestamp', '>=', pd.Timestamp(start_time_ms, unit='ms')))
+    if end_time_ms is not None:
+        filters.append(('timestamp', '<=', pd.Timestamp(end_time_ms, unit='ms')))
+    read_columns = None if columns is None else ['timestamp'] + [col for col in columns if col != 'timestamp']
+
+    table = pq.read_table(path, columns=read_columns, filters=filters or None)
+    df = table.to_pandas()
+    df['timestamp'] = df['timestamp'].astype('datetime64[ns]')
+    df = df.set_index('timestamp')
+    # Читання з фільтрами може змінити порядок фрагментів
+    if not df.index.is_monotonic_increasing:
+        df = df.sort_index()
+    return df
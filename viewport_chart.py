@@ -0,0 +1,265 @@
+import time
+import logging
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from matplotlib.transforms import Bbox
+
+from data_processing import OHLCPyramid
+from indicators import indicator_lines
+from live_chart import BODY_WIDTH, TEXT_COLOR, CandleChartCanvas
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - [Viewport Chart] %(message)s')
+
+# Найменша кількість вихідних свічок у видимому вікні при наближенні
+MIN_VISIBLE_CANDLES = 20
+# Зміна ширини вікна за один крок коліщатка миші
+ZOOM_STEP = 1.25
+# Найменший інтервал між кадрами під час перетягування: події руху миші між кадрами об'єднуються
+DRAG_FRAME_INTERVAL_MS = 16
+# Пауза після останнього кроку коліщатка, після якої графік перемальовується повністю
+ZOOM_SETTLE_MS = 200
+# Підписи осі часу під час жесту перераховуються не частіше (між ними — з кешу)
+AXIS_REFRESH_MS = 100
+
+
+class ViewportChartCanvas(CandleChartCanvas):
+    """
+    Інтерактивний графік ціни, обсягу та RSI для всієї завантаженої історії.
+
+    Вісь X — номер вихідної свічки, тож видиме вікно [start, end) не залежить від
+    рівня деталізації. На кожну зміну вікна (коліщатко — масштаб навколо курсора,
+    перетягування лівою кнопкою — зсув, подвійний клік — уся історія) з OHLCPyramid
+    береться не більше max_candles агрегованих свічок і оновлюються лише дані
+    наявних колекцій та ліній; фігура, осі й лінії індикаторів створюються один
+    раз і перевикористовуються також для наступних наборів даних.
+
+    Під час перетягування й масштабування фігура не перемальовується повністю:
+    статичний фон (осі, сітка, підписи ціни) кешується один раз на жест, а кожен
+    кадр лише відновлює його і малює поверх свічки та лінії (blitting). Підписи осі
+    часу перераховуються не частіше AXIS_REFRESH_MS, межі осей Y і їхні підписи —
+    після завершення жесту (відпускання кнопки або паузи коліщатка); події руху
+    миші обробляються не частіше DRAG_FRAME_INTERVAL_MS.
+    """
+
+    def __init__(self, max_candles: int = 200, include_rsi: bool = False, title: str = "", parent=None):
+        super().__init__(max_candles, include_rsi, title, parent, include_volume=True)
+        self.pyramid: Optional[OHLCPyramid] = None
+        self.viewport: Tuple[int, int] = (0, 0)
+        self._base_timestamps = np.empty(0, dtype=np.int64)
+        # (x у пікселях, start, end) на момент натискання кнопки миші
+        self._drag: Optional[Tuple[float, int, int]] = None
+        # Кешований фон поточного жесту (None — жест не триває) і вікно, що чекає на кадр
+        self._background = None
+        # Смуга з підписами осі часу з останнього їх малювання та його час (perf_counter)
+        self._axis_strip = None
+        self._axis_drawn_at = 0.0
+        self._pending_viewport: Optional[Tuple[int, int]] = None
+        self._frame_timer = self.new_timer(interval=DRAG_FRAME_INTERVAL_MS)
+        self._frame_timer.single_shot = True
+        self._frame_timer.add_callback(self._flush_pending_viewport)
+        self._settle_timer = self.new_timer(interval=ZOOM_SETTLE_MS)
+        self._settle_timer.single_shot = True
+        self._settle_timer.add_callback(self._end_interaction)
+        self.mpl_connect('scroll_event', self._on_scroll)
+        self.mpl_connect('button_press_event', self._on_press)
+        self.mpl_connect('motion_notify_event', self._on_motion)
+        self.mpl_connect('button_release_event', self._on_release)
+        # Кешований фон має розмір фігури, тож зміна розміру завершує жест
+        self.mpl_connect('resize_event', lambda _event: self._end_interaction())
+
+    def set_pyramid(self, pyramid: OHLCPyramid, max_candles: Optional[int] = None, title: Optional[str] = None):
+        """
+        Показує новий набір даних повністю; лінії індикаторів, яких у ньому немає, прибираються.
+        """
+        self._end_interaction(redraw=False)
+        self.pyramid = pyramid
+        if max_candles:
+            self.max_candles = max_candles
+        if title is not None:
+            self.ax_price.set_title(title, color=TEXT_COLOR)
+        self._base_timestamps = pyramid.data.index.as_unit('ms').asi8 if len(pyramid) else np.empty(0, dtype=np.int64)
+
+        price_lines = indicator_lines(pyramid.data.columns, 'price')
+        self._sync_lines(self.indicator_lines, self.ax_price, price_lines, 0.8)
+        if self.ax_rsi is not None:
+            self._sync_lines(self.oscillator_lines, self.ax_rsi, indicator_lines(pyramid.data.columns, 'oscillator'), 1.0)
+
+        legend = self.ax_price.get_legend()
+        if legend is not None:
+            legend.remove()
+        if price_lines:
+            self.ax_price.legend(handles=[self.indicator_lines[column] for column, *_ in price_lines],
+                                 labels=[label for *_, label in price_lines],
+                                 loc='upper left', frameon=False, fontsize='small', labelcolor=TEXT_COLOR)
+        self.set_viewport(0, len(pyramid))
+
+    @staticmethod
+    def _sync_lines(lines: Dict[str, object], ax, specs: List[tuple], linewidth: float):
+        wanted = {column for column, *_ in specs}
+        for column in [column for column in lines if column not in wanted]:
+            lines.pop(column).remove()
+        for column, color, linestyle, _ in specs:
+            if column not in lines:
+                lines[column], = ax.plot([], [], color=color, linestyle=linestyle, linewidth=linewidth)
+
+    def set_viewport(self, start: int, end: int):
+        """
+        Показує вихідні свічки [start, end); вікно обмежується межами історії та MIN_VISIBLE_CANDLES.
+        """
+        line_values = self._update_view(start, end)
+        if line_values is None:
+            return
+        low, high, *line_values = line_values
+        self._set_price_limits([low, *line_values], [high, *line_values])
+        self._autoscale_volume()
+        self.draw_idle()
+
+    def _update_view(self, start: int, end: int) -> Optional[list]:
+        """
+        Оновлює дані колекцій і ліній та межі осі X для вікна [start, end) без малювання.
+        Повертає [low, high, *значення цінових ліній] для меж осі Y або None без даних.
+        """
+        rows = len(self.pyramid) if self.pyramid is not None else 0
+        if not rows:
+            return None
+        span = int(min(max(end - start, min(MIN_VISIBLE_CANDLES, rows)), rows))
+        start = int(min(max(start, 0), rows - span))
+        self.viewport = (start, start + span)
+
+        view = self.pyramid.view(self.max_candles, start, start + span)
+        positions = np.searchsorted(self._base_timestamps, view.index.as_unit('ms').asi8)
+        widths = np.diff(positions, append=positions[-1] + (positions[-1] - positions[-2] if len(positions) > 1 else 1))
+        widths[-1] = max(1, min(widths[-1], rows - positions[-1]))
+        x = positions + (widths - 1) / 2
+
+        low, high = view['low'].to_numpy(), view['high'].to_numpy()
+        self._set_candles(x, widths * BODY_WIDTH, view['open'].to_numpy(), high, low,
+                          view['close'].to_numpy(), view['volume'].to_numpy())
+        line_values = []
+        for column, line in self.indicator_lines.items():
+            values = view[column].to_numpy()
+            line.set_data(x, values)
+            line_values.append(values)
+        for column, line in self.oscillator_lines.items():
+            line.set_data(x, view[column].to_numpy())
+
+        self._push_collections()
+        padding = max(1.0, span * 0.01)
+        self.ax_price.set_xlim(start - 0.5 - padding, start + span - 0.5 + padding)
+        return [low, high, *line_values]
+
+    def _animated_artists(self) -> list:
+        """Артисти, що змінюються під час жесту: свічки, обсяг, лінії індикаторів і вісь часу (остання)."""
+        artists = [self.wicks, self.bodies]
+        if self.ax_volume is not None:
+            artists.append(self.volume_bars)
+        artists.extend(self.indicator_lines.values())
+        artists.extend(self.oscillator_lines.values())
+        artists.append(self.figure.axes[-1].xaxis)
+        return artists
+
+    def _begin_interaction(self):
+        """
+        Кешує фон жесту: фігура малюється один раз без анімованих артистів.
+        """
+        if self._background is not None:
+            return
+        for artist in self._animated_artists():
+            artist.set_animated(True)
+        self.draw()
+        self._background = self.copy_from_bbox(self.figure.bbox)
+
+    def _blit_viewport(self, start: int, end: int):
+        """
+        Кадр жесту: відновлює кешований фон і малює поверх лише змінні артисти;
+        межі осей Y лишаються з початку жесту.
+        """
+        self._begin_interaction()
+        if self._update_view(start, end) is None:
+            return
+        self.restore_region(self._background)
+        *artists, time_axis = self._animated_artists()
+        for artist in artists:
+            self.figure.draw_artist(artist)
+        now = time.perf_counter()
+        if self._axis_strip is None or (now - self._axis_drawn_at) * 1000 >= AXIS_REFRESH_MS:
+            self.figure.draw_artist(time_axis)
+            self._axis_strip = self.copy_from_bbox(
+                Bbox.from_extents(0, 0, self.figure.bbox.x1, time_axis.axes.bbox.y0))
+            self._axis_drawn_at = now
+        else:
+            self.restore_region(self._axis_strip)
+        self.blit(self.figure.bbox)
+
+    def _end_interaction(self, redraw: bool = True):
+        """
+        Завершує жест: артисти повертаються у звичайне малювання, а межі осей Y
+        і повний кадр перераховуються для остаточного вікна.
+        """
+        self._frame_timer.stop()
+        self._settle_timer.stop()
+        pending, self._pending_viewport = self._pending_viewport, None
+        if self._background is None and pending is None:
+            return
+        if self._background is not None:
+            self._background = None
+            self._axis_strip = None
+            for artist in self._animated_artists():
+                artist.set_animated(False)
+        if redraw:
+            self.set_viewport(*(pending or self.viewport))
+
+    def _flush_pending_viewport(self):
+        if self._pending_viewport is not None:
+            start, end = self._pending_viewport
+            self._pending_viewport = None
+            self._blit_viewport(start, end)
+
+    def _format_x(self, x, _pos=None) -> str:
+        position = int(round(x))
+        if 0 <= position < len(self._base_timestamps):
+            return np.datetime_as_string(np.datetime64(int(self._base_timestamps[position]), 'ms'), unit='m')[5:].replace('T', ' ')
+        return ""
+
+    def _on_scroll(self, event):
+        if self.pyramid is None or event.xdata is None:
+            return
+        start, end = self.viewport
+        scale = ZOOM_STEP ** -event.step
+        new_span = max(1, int(round((end - start) * scale)))
+        # Свічка під курсором лишається на місці
+        new_start = int(round(event.xdata - (event.xdata - start) * new_span / (end - start)))
+        self._blit_viewport(new_start, new_start + new_span)
+        if self._drag is None:
+            self._settle_timer.start()
+
+    def _on_press(self, event):
+        if self.pyramid is None or event.inaxes is None or event.button != 1:
+            return
+        if event.dblclick:
+            self._end_interaction(redraw=False)
+            self.set_viewport(0, len(self.pyramid))
+            return
+        self._settle_timer.stop()
+        self._drag = (event.x, *self.viewport)
+
+    def _on_motion(self, event):
+        if self._drag is None or event.x is None:
+            return
+        x0, start, end = self._drag
+        shift = int(round((event.x - x0) / self.ax_price.bbox.width * (end - start)))
+        if (start - shift, end - shift) == self.viewport:
+            return
+        # Події між кадрами лише оновлюють очікуване вікно; кадр малює таймер
+        scheduled = self._pending_viewport is not None
+        self._pending_viewport = (start - shift, end - shift)
+        if not scheduled:
+            self._frame_timer.start()
+
+    def _on_release(self, event):
+        if self._drag is None or event.button != 1:
+            return
+        self._drag = None
+        self._end_interaction()